@@ -5,12 +5,27 @@
 Functions
 ---------
 
+    partial_penetration: Calculates the partial penetration term for an array
+    of wells
+
+    transmissivity_intervals: Calculates the Transmissivity Interval (see
+    interval) from Pump Rate, Drawdown and Storage coefficient Intervals
+
+    transmissivity_arrays: Calculates the Transmissivity bounds for arrays of
+    well data in one batched call
+
     transmissivity_calculations: Calculates the Transmissivity for each entry 
     in confirmed_wells
 
     conductivity_calculations: Calculates the Hydralic Conductivity from 
     transmissivity_calculated
 
+    transmissivity_sweep: Calculates Transmissivity and Hydralic Conductivity
+    for a vector of error_bounds in one broadcast pass
+
+    monte_carlo_calculations: Calculates quantiles of Transmissivity and
+    Hydralic Conductivity by sampling the uncertain inputs of every well
+
 Notes
 -----
     This function uses imperial units. The relationship of variables and their
@@ -41,83 +56,190 @@ Citations
     Groundwater, 1985, 23, 240-246
 
 Author: Jonny Full
-Version: 7/30/2020
+Version: 10/17/2026
 -------------------------------------------------------------------------------
 """
-import math
-from scipy.special import lambertw
+import numpy as np
+from interval import Interval, monotone
+from lambert_w import lambertw_m1
+from well_batch import as_well_batch, well_interval, storage_interval
+
+MONTE_CARLO_CHUNK = 2**21 #samples evaluated at a time
+
+def partial_penetration(L, rw, b):
+    """Computes the partial penetration term (sp) for every well.
+
+    Parameters
+    ----------
+    L: ndarray[float]
+        Screen Length (ft) of each well.
+
+    rw: ndarray[float]
+        Casing Radius (ft) of each well.
+
+    b: ndarray[float]
+        Aquifer Thickness (ft) of each well.
+
+    Returns
+    -------
+    sp: ndarray[float]
+        The partial penetration term for each well. Wells without a positive
+        screen length and casing radius are assumed to fully penetrate the
+        aquifer (sp = 0).
+    """
+    L = np.asarray(L, dtype=np.float64)
+    rw = np.asarray(rw, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    valid = (L > 0) & (rw > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # There are errors in the CWI_hydro table data. This data may
+        # describes an aquifer setting where the well penetrates through
+        # multiple aquifers. If this is the case, we will assume that the
+        # well only penetrates the entire aquifer based on the data
+        # available. This can be seen with the logic below.
+        Lb = np.minimum(L/b, 1)
+        G = 2.948 - (7.363*(Lb)) + (11.447*((Lb)**2)) - (4.675*((Lb)**3))
+        sp = ((1-Lb)/Lb)*(np.log(b/rw)-G)
+    return np.where(valid, sp, 0.0)
+
+
+def transmissivity_intervals(Q, t, s, L, rw, b, S):
+    """Computes the Transmissivity Interval for every well in one batched call.
+
+    Parameters
+    ----------
+    Q: Interval
+        Pump Rate (ft^3/day).
+
+    t: ndarray[float]
+        Duration of Test (days).
+
+    s: Interval
+        Drawdown (ft).
+
+    L: ndarray[float]
+        Screen Length (ft).
+
+    rw: ndarray[float]
+        Casing Radius (ft).
+
+    b: ndarray[float]
+        Aquifer Thickness (ft).
+
+    S: Interval
+        Storage coefficient (-).
+
+    Returns
+    -------
+    T: Interval
+        The calculated Transmissivity (ft^2/day) for each well. Wells whose
+        Lambert W argument falls outside of [-1/e, 0) are NaN.
+
+    Notes
+    -----
+    T = -(Q/(4*pi*s))*W_-1(scale*s*S/Q) increases with Q and decreases with
+    s and S, so T_max comes from (Q_max, s_min, S_min) and T_min from
+    (Q_min, s_max, S_max). Each bound is one Lambert W evaluation over the
+    whole column, and T_min <= T <= T_max wherever all three are defined.
+    The nominal T uses the nominal S of the storage Interval; for a
+    WellBatch that is the geometric mean of S_MIN and S_MAX (see
+    storage_interval).
+    """
+    scale = _lambert_scale(t, L, rw, b)
+    return monotone(lambda Q, s, S: _bradbury_rothschild(Q, s, S, scale),
+                    (Q, s, S), (1, -1, -1))
+
+
+def _lambert_scale(t, L, rw, b):
+    """Returns the part of the Lambert W argument that does not depend on
+    Q, s or S."""
+    rw = np.asarray(rw, dtype=np.float64)
+    t = np.asarray(t, dtype=np.float64)
+    sp = partial_penetration(L, rw, b)
+    return (-16*np.pi/9)*np.exp(-2*sp)*(rw**2)/t
+
+
+def _bradbury_rothschild(Q, s, S, scale):
+    """Solves the Bradbury & Rothschild equation for T with Lambert W."""
+    W, _ = lambertw_m1(scale*s*S/Q)
+    return -(Q/(4*np.pi*s))*W
+
+
+def transmissivity_arrays(Q_min, Q, Q_max, t, s_min, s, s_max, L, rw, b,
+                          S_min, S_max):
+    """Computes T_min, T and T_max for every well in one batched call.
+
+    This is the array-in, array-out version of transmissivity_calculations.
+    Every argument is a float64 column with one entry per well.
+
+    Parameters
+    ----------
+    Q_min, Q, Q_max: ndarray[float]
+        Pump Rate bounds (ft^3/day).
+
+    t: ndarray[float]
+        Duration of Test (days).
+
+    s_min, s, s_max: ndarray[float]
+        Drawdown bounds (ft).
+
+    L: ndarray[float]
+        Screen Length (ft).
+
+    rw: ndarray[float]
+        Casing Radius (ft).
+
+    b: ndarray[float]
+        Aquifer Thickness (ft).
+
+    S_min, S_max: ndarray[float]
+        Storage coefficient bounds (-). T uses their geometric mean.
+
+    Returns
+    -------
+    T_min, T, T_max: ndarray[float]
+        The calculated Transmissivity bounds (ft^2/day) for each well. Wells
+        whose Lambert W argument falls outside of [-1/e, 0) are NaN.
+
+    Notes
+    -----
+    This is a thin wrapper around transmissivity_intervals.
+    """
+    T = transmissivity_intervals(Interval(Q_min, Q, Q_max), t,
+                                 Interval(s_min, s, s_max), L, rw, b,
+                                 Interval(S_min, np.sqrt(np.multiply(S_min, S_max)),
+                                          S_max))
+    return T.lower, T.nominal, T.upper
+
 
 def transmissivity_calculations(confirmed_wells):
     """Computes the Transmissivity for every well in confirmed_wells
 
     Parameters
     ----------
-    confirmed_wells: list[[list1][list2]]
-        This is a list of all pertinant information required to plot the wells
-        spacially and calculate Transmissivity.
-
-        list1 = list[UTME (int), UTMN (int), AQUIFER (str), Screen Length (float),
-                     Casing Radius (ft), Relate ID (str)]
+    confirmed_wells: WellBatch
+        This is a WellBatch (see well_batch) of all pertinant information
+        required to plot the wells spacially and calculate Transmissivity.
+        The nested list built by older versions of data_organization is
+        also accepted.
 
-        list 2 = list[Pump Rate (float), Duration (float), Drawdown (float),
-                      Relate ID (str)]
     Returns
     -------
-        transmissivity_calculated: list[float]
-        transmissivity_calculated represents the calculated Transmissivity for
-        each row in confirmed_wells.
+        transmissivity_calculated: ndarray[float], shape=(n, 3)
+        transmissivity_calculated represents the calculated Transmissivity
+        [T_min, T, T_max] for each row in confirmed_wells.
+
+    Notes
+    -----
+    This is a thin wrapper around transmissivity_intervals.
     """
-    transmissivity_calculated = [] #ft^2/day
-    S_min = [i[2][3] for i in confirmed_wells] #storativity = S temporary constant
-    S_max = [i[2][4] for i in confirmed_wells]
-    Q_min = [i[1][0] for i in confirmed_wells]
-    Q = [i[1][1] for i in confirmed_wells]
-    Q_max = [i[1][2] for i in confirmed_wells]
-    t = [i[1][3] for i in confirmed_wells]
-    s_min = [i[1][4] for i in confirmed_wells]
-    s = [i[1][5] for i in confirmed_wells]
-    s_max = [i[1][6] for i in confirmed_wells]
-    L = [i[0][3] for i in confirmed_wells]
-    rw = [i[0][4] for i in confirmed_wells]
-    b = [i[2][1] for i in confirmed_wells]
-    for i in range(len(Q_min)):
-      
-        
-        if L[i] > 0 and rw[i] > 0:
-            Lb = L[i]/b[i]
-            """
-            There are errors in the CWI_hydro table data. This data may
-            describes an aquifer setting where the well penetrates through
-            multiple aquifers. If this is the case, we will assume that the
-            well only penetrates the entire aquifer based on the data
-            available. This can be seen with the logic below.
-            """
-            if Lb > 1:
-                Lb = 1
-            G = 2.948 - (7.363*(Lb)) + (11.447*((Lb)**2)) - (4.675*((Lb)**3))
-            sp = ((1-Lb)/Lb)*(math.log(b[i]/rw[i])-G)
-        else:
-            sp = 0
-        
-        data = (-16*math.pi/9)*(1/math.exp(2*sp))*(s_min[i]*(rw[i]**2)*S_min[i]\
-                /(Q_min[i]*t[i]))
-        W_min = lambertw(data,-1)
-        T_max = -(Q_min[i]/(4*math.pi*(s_min[i])))*W_min
-        
-
-        data = (-16*math.pi/9)*(1/math.exp(2*sp))*(s[i]*(rw[i]**2)*\
-                S_max[i]/(Q[i]*t[i]))
-        W_raw = lambertw(data,-1)
-        T = -(Q[i]/(4*math.pi*(s[i])))*W_raw
-            
-        data = (-16*math.pi/9)*(1/math.exp(2*sp))*(s_max[i]*(rw[i]**2)*\
-                S_max[i]/(Q_max[i]*t[i]))
-        W_max = lambertw(data,-1)
-        T_min = -(Q_max[i]/(4*math.pi*(s_max[i])))*W_max
-        
-        T_range = [T_min, T, T_max]
-        transmissivity_calculated.append(T_range)
-    return transmissivity_calculated #break into two lists?
+    batch = as_well_batch(confirmed_wells)
+    T = transmissivity_intervals(
+        well_interval(batch, 'RATE'), batch['DURATION'],
+        well_interval(batch, 'DOWN'), batch['SCREEN_LEN'], batch['RADIUS'],
+        batch['B'], storage_interval(batch))
+    transmissivity_calculated = T.columns()
+    return transmissivity_calculated
 
 
 def conductivity_calculations(confirmed_wells, transmissivity_calculated):
@@ -125,35 +247,189 @@ def conductivity_calculations(confirmed_wells, transmissivity_calculated):
 
     Parameters
     ----------
-    transmissivity_calculated: list[float]
+    confirmed_wells: WellBatch
+        The WellBatch that transmissivity_calculated was computed from.
+
+    transmissivity_calculated: ndarray[float], shape=(n, 3)
     transmissivity_calculated represents the calculated Transmissivity for each
     row in confirmed_wells.
 
 
     Returns
     -------
-    hydro_cond: list[float]
-    hydro_cond represents the calculated hydralic conductivity for each row in
-    transmissivity_calculated.
+    hydro_cond: ndarray[float], shape=(n, 4)
+    hydro_cond represents the calculated hydralic conductivity
+    [K_min, K, K_max, Well ID] for each row in transmissivity_calculated.
 
     Notes
     -----
     Hydralic Conductivity can be calculated with the following equation:
         K = T/b
+    K increases with T and decreases with b, so K_min = T_min/b_max and
+    K_max = T_max/b_min.
     """
-    b_min = [i[2][0] for i in confirmed_wells]
-    b = [i[2][1] for i in confirmed_wells]
-    b_max = [i[2][2] for i in confirmed_wells]
-    T_min = [i[0] for i in transmissivity_calculated]
-    T = [i[1] for i in transmissivity_calculated]
-    T_max = [i[2] for i in transmissivity_calculated]
-    well_id = [i[0][5] for i in confirmed_wells]
-    hydro_cond = []
-    for i in range(len(transmissivity_calculated)):
-        well_id_data = well_id[i]
-        K_min = T_min[i] / b_max[i]
-        K_guess = T[i] / b[i]
-        K_max = T_max[i] / b_min[i]
-        K_values = [K_min, K_guess, K_max, well_id_data]
-        hydro_cond.append(K_values)
+    batch = as_well_batch(confirmed_wells)
+    T = Interval.from_columns(transmissivity_calculated)
+    K = monotone(np.divide, (T, well_interval(batch, 'B')), (1, -1))
+    hydro_cond = np.column_stack((K.columns(), batch['WELLID']))
     return hydro_cond
+
+
+def transmissivity_sweep(confirmed_wells, error_bounds):
+    """Calculates Transmissivity and Hydralic Conductivity for every well and
+    every value in a vector of error_bounds.
+
+    Parameters
+    ----------
+    confirmed_wells: WellBatch
+        The WellBatch built with error_bounds = 0 (see sensitivity), so it
+        holds the recorded values of every well that has a positive drawdown
+        and thickness.
+
+    error_bounds: sequence of float
+        The error_bounds (ft, gal/min) to evaluate.
+
+    Returns
+    -------
+    transmissivity_swept: ndarray[float], shape=(n, len(error_bounds), 3)
+        [T_min, T, T_max] of each well for each error_bounds.
+
+    conductivity_swept: ndarray[float], shape=(n, len(error_bounds), 3)
+        [K_min, K, K_max] of each well for each error_bounds.
+
+    Notes
+    -----
+    The bounds of pump_log_bounds and aquifer_thickness_bounds are rebuilt
+    from the recorded values with the error_bounds as a second axis:
+        rate = RATE -/+ 192.5*error_bounds
+        drawdown = DOWN -/+ 2*error_bounds
+        thickness = B -/+ error_bounds
+    A well that those functions would drop for an error_bounds (drawdown or
+    thickness lower bound not positive) is NaN for that error_bounds. Results
+    match running the pipeline once per error_bounds to floating-point
+    rounding.
+    """
+    batch = as_well_batch(confirmed_wells)
+    error_bounds = np.asarray(error_bounds, dtype=np.float64)[None, :]
+
+    def column(field):
+        return batch[field][:, None]
+
+    Q = Interval.around(column('RATE'), 192.5*error_bounds)
+    s = Interval.around(column('DOWN'), 2*error_bounds)
+    b = Interval.around(column('B'), error_bounds)
+    S = storage_interval(batch)[:, None]
+    T = transmissivity_intervals(Q, column('DURATION'), s, column('SCREEN_LEN'),
+                                 column('RADIUS'), column('B'), S)
+    K = monotone(np.divide, (T, b), (1, -1))
+
+    dropped = ~((s.lower > 0) & (b.lower > 0))
+    transmissivity_swept = T.columns()
+    conductivity_swept = K.columns()
+    transmissivity_swept[dropped] = np.nan
+    conductivity_swept[dropped] = np.nan
+    return transmissivity_swept, conductivity_swept
+
+
+def _row_quantiles(values, quantiles):
+    """Quantiles of every row of values, ignoring NaN (linear interpolation,
+    same as np.nanquantile)."""
+    values = np.sort(values, axis=1) #NaN sorts to the end of each row
+    count = np.sum(~np.isnan(values), axis=1)
+    result = np.full((len(values), len(quantiles)), np.nan)
+    rows = np.flatnonzero(count)
+    for column, q in enumerate(quantiles):
+        position = q*(count[rows] - 1)
+        below = np.floor(position).astype(np.intp)
+        above = np.minimum(below + 1, count[rows] - 1)
+        fraction = position - below
+        low = values[rows, below]
+        high = values[rows, above]
+        result[rows, column] = low + (high - low)*fraction
+    return result
+
+
+def monte_carlo_calculations(confirmed_wells, n_samples=10000,
+                             quantiles=(0.05, 0.5, 0.95), seed=None,
+                             chunk_size=MONTE_CARLO_CHUNK):
+    """Calculates quantiles of Transmissivity and Hydralic Conductivity by
+    sampling the uncertain inputs of every well.
+
+    Parameters
+    ----------
+    confirmed_wells: WellBatch
+        Same as transmissivity_calculations.
+
+    n_samples: int
+        Number of samples drawn for every well.
+
+    quantiles: sequence of float
+        The quantiles (0 to 1) returned for every well.
+
+    seed: int
+        Seed of the random number generator.
+
+    chunk_size: int
+        The largest number of samples (wells x n_samples) held in memory at
+        a time.
+
+    Returns
+    -------
+    transmissivity_quantiles: ndarray[float], shape=(n, len(quantiles))
+        Quantiles of Transmissivity (ft^2/day) for each well.
+
+    conductivity_quantiles: ndarray[float], shape=(n, len(quantiles))
+        Quantiles of Hydralic Conductivity (ft/day) for each well.
+
+    Notes
+    -----
+    Every input is drawn from a uniform distribution over its bounds in the
+    WellBatch:
+        Q = Pump Rate, between RATE_MIN and RATE_MAX
+        static and pumping water levels, each within half of the drawdown
+            range (DOWN_MAX - DOWN) of the recorded level, so
+            s = DOWN + (pumping error) - (static error)
+        b = Aquifer Thickness, between B_MIN and B_MAX
+        Ss = Specific Storage, between S_MIN/B and S_MAX/B, and S = Ss*b
+    The sampled b is also used for the partial penetration term and for
+    K = T/b. Samples with a drawdown or thickness that is not positive, or
+    whose Lambert W argument falls outside of [-1/e, 0), are left out of the
+    quantiles. Wells without any valid sample are NaN.
+
+    The samples of a well are the same for any chunk_size, so a seed gives
+    the same quantiles however the work is split.
+    """
+    batch = as_well_batch(confirmed_wells)
+    quantiles = np.asarray(quantiles, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    n = len(batch)
+    transmissivity_quantiles = np.full((n, len(quantiles)), np.nan)
+    conductivity_quantiles = np.full((n, len(quantiles)), np.nan)
+    block = max(chunk_size//n_samples, 1)
+
+    for start in range(0, n, block):
+        wells = batch[start:start + block]
+        #the draws of one well are next to each other in the random stream,
+        #so the samples do not depend on how the wells are split into blocks
+        draws = iter(np.moveaxis(rng.random((len(wells), 5, n_samples)), 1, 0))
+
+        def uniform(lower, upper):
+            return lower[:, None] + (upper - lower)[:, None]*next(draws)
+
+        Q = uniform(wells['RATE_MIN'], wells['RATE_MAX'])
+        level_error = (wells['DOWN_MAX'] - wells['DOWN'])/2
+        s = wells['DOWN'][:, None] + uniform(-level_error, level_error) \
+            - uniform(-level_error, level_error)
+        b = uniform(wells['B_MIN'], wells['B_MAX'])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            S = uniform(wells['S_MIN']/wells['B'], wells['S_MAX']/wells['B'])*b
+            valid = (s > 0) & (b > 0)
+            scale = _lambert_scale(wells['DURATION'][:, None],
+                                   wells['SCREEN_LEN'][:, None],
+                                   wells['RADIUS'][:, None], b)
+            T = _bradbury_rothschild(Q, s, S, scale)
+            T[~valid] = np.nan
+            K = T/b
+        transmissivity_quantiles[start:start + block] = _row_quantiles(T, quantiles)
+        conductivity_quantiles[start:start + block] = _row_quantiles(K, quantiles)
+    return transmissivity_quantiles, conductivity_quantiles
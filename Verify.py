@@ -6,10 +6,10 @@ to input a radial distance. This distance is a boundary condition for the
 sample size.
 
 Author: Jonny Full
-Version: 6/24/2020
+Version: 10/17/2026
 """
-import arcpy
 from data_location import CWIPL, allwells
+from table_reader import search_cursor
 import sys
 
 def Verify():
@@ -35,14 +35,14 @@ def Verify():
     
     """
     target_well = input("Please input a WellID number: ") #This is easier/ more simple for the user
-    with arcpy.da.SearchCursor(CWIPL , ["WELLID"], f"WELLID = {target_well}") as cursor:
+    with search_cursor(CWIPL , ["WELLID"], f"WELLID = {target_well}") as cursor:
         for row in cursor:   
             break
         else:
            print("Well ID not found.")
            sys.exit()  #Terminates the function
             
-    with arcpy.da.SearchCursor(allwells , ["WELLID"], f"WELLID = {target_well}") as cursor:
+    with search_cursor(allwells , ["WELLID"], f"WELLID = {target_well}") as cursor:
         for row in cursor:   
             break
         else:
@@ -18,16 +18,18 @@ Notes
     data tables used by this function on the user's computer.
 
 Author: Jonny Full
-Version: 9/3/2020
+Version: 10/17/2026
 -------------------------------------------------------------------------------
 """
 import arcpy
 from Verify import Verify
 from data_location import CWI_DATA
 from Transmissivity import transmissivity_calculations, conductivity_calculations
-from data_retrieve import find_wells, data_organization, pump_log,\
-aquifer_thickness, storativity_calculations
-from data_to_csv import calculated_data_to_csv, calculated_data_statistics_csv
+from data_retrieve import find_wells, data_organization,\
+retrieve_well_data, storativity_calculations
+from data_to_csv import calculated_data_statistics_csv
+from columnar import write_results, results_to_csv, results_statistics
+from point_layer import write_point_layer
 from plots import plot_histogram_transmissivity, plot_spacial_transmissivity,\
 plot_spacial_conductivity, plot_spacial_thickness
 
@@ -51,17 +53,23 @@ for row in candidate_wells:
         target_coords.append(data)
 
 #Determines values for each verfied well
-pump_log_results = pump_log(candidate_wells, error_bounds)
-thickness_data = aquifer_thickness(candidate_wells, error_bounds)
+pump_log_results, thickness_data, retrieval_timings = retrieve_well_data(
+    candidate_wells, error_bounds)
 thickness_storativity_data = storativity_calculations(candidate_wells, thickness_data)
 confirmed_wells = data_organization(candidate_wells, pump_log_results, thickness_storativity_data)
 transmissivity_calculated = transmissivity_calculations(confirmed_wells)
 conductivity_calculated = conductivity_calculations(confirmed_wells, transmissivity_calculated)
 
 feature_class_name = "TEST" #Remove later
-my_df, raw_csv_name = calculated_data_to_csv(transmissivity_calculated, conductivity_calculated,\
-                           confirmed_wells, feature_class_name)
-calculated_data_statistics_csv(my_df, feature_class_name)
+#the typed results file is the primary output; the csv files are views of it
+results_name = f"{feature_class_name}.npz"
+write_results([(confirmed_wells, transmissivity_calculated, conductivity_calculated)],
+              results_name)
+raw_csv_name, rows = results_to_csv(results_name, feature_class_name)
+calculated_data_statistics_csv(results_statistics(results_name), feature_class_name)
+
+#point layer of the results (EPSG:26915) written without arcpy
+write_point_layer(results_name, f"{feature_class_name}.gpkg")
 
 if feature_class_name is not None:
     # Delete the shape file if it already exists.
@@ -9,12 +9,12 @@ Notes:
     This function requires Data Location and Verify to run properly.
 
 Author: Jonny Full
-Version: 6/26/2020
+Version: 10/17/2026
 """
 import json
-import arcpy
 import numpy as np
 from data_location import loc, allwells
+from table_reader import search_wellids
 #from findWells import selectedWells
 def store_sheet(loc):
     """Retrieves pump test data from a spreadsheet and converts it to a json
@@ -35,6 +35,7 @@ def store_sheet(loc):
     This function only needs to be executed once for the .json file to be created.
     The spreadsheet is not currently being updated so the data set will not change.
     """
+    import arcpy #Excel conversion is only available through ArcGIS
     input_excel = loc
     sheet_name = "data"
     memory_table = "in_memory" + "\\" + "memoryTable"
@@ -58,6 +59,7 @@ def store_sheet(loc):
     return storativity
 
 def storetivity_data_check(loc):
+    import arcpy #Excel conversion is only available through ArcGIS
     input_excel = loc
     sheet_name = "data"
     memory_table = "in_memory" + "\\" + "memoryTable"
@@ -73,9 +75,9 @@ def storetivity_data_check(loc):
 
 def opie(STORE):
     USEFUL = []
-    with arcpy.da.SearchCursor(allwells, ['UTME', 'UTMN', 'AQUIFER', 'WELLID'], f"WELLID in {tuple([i[1] for i in STORE])}") as cursor:
-        for row in cursor:
-            USEFUL.append(row)
+    for row in search_wellids(allwells, ['UTME', 'UTMN', 'AQUIFER', 'WELLID'],
+                              None, [i[1] for i in STORE]):
+        USEFUL.append(row)
     return USEFUL
 
 def storativity_calculations(candidate_wells, thickness_data):
@@ -0,0 +1,166 @@
+"""Calculates Transmissivity and Hydraulic Conductivity around many target
+wells in one pass over the CWI tables.
+
+analyze_wells.py and runme.py handle one target well per run and read
+allwells, C5PL and CWI_hydro again every time. analyze_targets reads each
+table once for the whole list of targets:
+    1. allwells is read once to locate every target well.
+    2. The spatial index of every aquifer involved is loaded once and all of
+       the radius queries are answered from it.
+    3. C5PL and CWI_hydro are read once for the union of the candidate wells.
+    4. The shared rows are split back out per target and run through the
+       usual storativity, join, Transmissivity and Conductivity steps with
+       that target's error_bounds.
+
+Functions
+---------
+analyze_targets: Calculates the results for a list of (WELLID, radius,
+    error_bounds) targets.
+
+read_targets: Reads a list of targets from a csv file.
+
+main: Command line interface. Run "python bulk_analysis.py -h" for help.
+
+-------------------------------------------------------------------------------
+"""
+import argparse
+import csv
+import os
+from data_location import allwells
+from data_retrieve import locate_wells, query_candidate_wells, pump_log_raw,\
+pump_log_bounds, aquifer_thickness_raw, aquifer_thickness_bounds,\
+storativity_calculations, data_organization, read_aquifer_wells
+from data_to_csv import calculated_data_to_csv
+from spatial_index import load_aquifer_index
+from table_reader import get_reader
+from Transmissivity import transmissivity_calculations, conductivity_calculations
+
+def analyze_targets(targets):
+    """Calculates Transmissivity and Hydraulic Conductivity around every
+    target well.
+
+    Parameters
+    ----------
+    targets: list[tuple]
+        A list of (WELLID (int), radius (meters), error_bounds (ft)). The same
+        WELLID may appear more than once with different radii or bounds.
+
+    Returns
+    -------
+    results: list[dict]
+        One dictionary per target, in the order of targets, with the keys:
+        'target' = the (WELLID, radius, error_bounds) tuple
+        'candidate_wells' = same as find_wells
+        'confirmed_wells' = the WellBatch from data_organization
+        'transmissivity' = same as transmissivity_calculations
+        'conductivity' = same as conductivity_calculations
+        A target whose WELLID is not in allwells has None for every key
+        except 'target'.
+    """
+    targets = [(int(well_id), radius, error_bounds) for well_id, radius,
+               error_bounds in targets]
+    locations = locate_wells(sorted({i[0] for i in targets}))
+    source = get_reader().source(allwells)
+
+    #answers every radius query against the shared aquifer indexes
+    indexes = {}
+    candidates = []
+    for well_id, radius, error_bounds in targets:
+        if well_id not in locations:
+            candidates.append(None)
+            continue
+        utm_e, utm_n, aquifer = locations[well_id]
+        if aquifer not in indexes:
+            indexes[aquifer] = load_aquifer_index(aquifer, source,
+                                                  read_aquifer_wells)
+        candidates.append(query_candidate_wells(indexes[aquifer],
+                                                [utm_e, utm_n], radius))
+
+    #reads the pump log and thickness tables once for every well touched
+    touched = sorted({row[5] for rows in candidates if rows for row in rows})
+    pump_rows = {}
+    for row in pump_log_raw(touched):
+        pump_rows.setdefault(row[4], []).append(row)
+    thickness_rows = {}
+    for row in aquifer_thickness_raw(touched):
+        thickness_rows.setdefault(row[1], []).append(row)
+
+    results = []
+    for target, candidate_wells in zip(targets, candidates):
+        result = {'target': target, 'candidate_wells': candidate_wells,
+                  'confirmed_wells': None, 'transmissivity': None,
+                  'conductivity': None}
+        results.append(result)
+        if candidate_wells is None:
+            continue
+        error_bounds = target[2]
+        well_ids = sorted({row[5] for row in candidate_wells})
+        pump_log_results = pump_log_bounds(
+            [row for i in well_ids for row in pump_rows.get(i, ())],
+            error_bounds)
+        thickness_data = aquifer_thickness_bounds(
+            [row for i in well_ids for row in thickness_rows.get(i, ())],
+            error_bounds)
+        thickness_storativity_data = []
+        if candidate_wells:
+            thickness_storativity_data = storativity_calculations(
+                candidate_wells, thickness_data)
+        confirmed_wells = data_organization(candidate_wells, pump_log_results,
+                                            thickness_storativity_data)
+        transmissivity_calculated = transmissivity_calculations(confirmed_wells)
+        result['confirmed_wells'] = confirmed_wells
+        result['transmissivity'] = transmissivity_calculated
+        result['conductivity'] = conductivity_calculations(
+            confirmed_wells, transmissivity_calculated)
+    return results
+
+def read_targets(file_name):
+    """Reads a list of targets from a csv file.
+
+    Parameters
+    ----------
+    file_name: str
+        A csv file with the columns WELLID, radius and error_bounds. A header
+        row is optional.
+
+    Returns
+    -------
+    targets: list[tuple]
+        A list of (WELLID (int), radius (float), error_bounds (float)).
+    """
+    targets = []
+    with open(file_name, newline='') as infile:
+        for row in csv.reader(infile):
+            if not row or not row[0].strip().isdigit():
+                continue #skips the header and blank lines
+            targets.append((int(row[0]), float(row[1]), float(row[2])))
+    return targets
+
+def main(argv=None):
+    """Command line interface for analyze_targets.
+
+    Writes one csv file per target (see calculated_data_to_csv) named
+    <WELLID>_<radius>_<error_bounds>.csv into the output folder.
+    """
+    parser = argparse.ArgumentParser(
+        description="Calculate Transmissivity and Hydraulic Conductivity "
+                    "around many target wells in one pass.")
+    parser.add_argument('targets', help="csv file of WELLID, radius (m), "
+                                        "error_bounds (ft)")
+    parser.add_argument('-o', '--output', default='.',
+                        help="folder for the csv files (default: current)")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output, exist_ok=True)
+    for result in analyze_targets(read_targets(args.targets)):
+        well_id, radius, error_bounds = result['target']
+        if result['confirmed_wells'] is None:
+            print(f"Well ID {well_id} not found.")
+            continue
+        name = os.path.join(args.output, f"{well_id}_{radius:g}_{error_bounds:g}")
+        calculated_data_to_csv(result['transmissivity'], result['conductivity'],
+                               result['confirmed_wells'], name)
+        print(f"{name}.csv: {len(result['confirmed_wells'])} wells")
+
+if __name__ == '__main__':
+    main()
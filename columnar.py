@@ -0,0 +1,315 @@
+"""Binary columnar files for the calculated results.
+
+calculated_data_to_csv turns every column into a float (WELLID included) and
+writes text that ArcGIS has to parse again. ResultWriter writes the same
+results as typed columns in appendable row groups, one per batch of wells,
+and the readers can load only the columns they need or memory-map them. The
+csv file becomes an optional view made with results_to_csv.
+
+Two formats are supported:
+    .parquet = Apache Parquet, written with pyarrow when it is installed.
+    .npz = a zip archive of .npy arrays with one member per row group and
+           column (rg00000/UTME.npy, ...). It only needs NumPy.
+
+Classes
+-------
+ResultWriter: Appends batches of results to a .parquet or .npz file.
+
+Functions
+---------
+write_results: Writes every batch of a results iterable with ResultWriter.
+
+row_groups: Yields the row groups of a results file as column dictionaries.
+
+read_results: Reads a results file, or some of its columns, into arrays.
+
+results_to_csv: Writes the csv view of a results file.
+
+results_statistics: Accumulates the statistics of a results file one row
+    group at a time.
+
+Notes
+-----
+    The columns are the WellBatch fields (see well_batch) followed by T_MIN,
+    T, T_MAX, K_MIN, K and K_MAX, with the WellBatch dtypes (WELLID stays an
+    int64 and AQUIFER a string).
+
+    Uncompressed .npz members are stored, not deflated, so they can be
+    memory-mapped straight from the archive. Compressed members are read
+    into memory.
+
+-------------------------------------------------------------------------------
+"""
+import os
+import zipfile
+import numpy as np
+from data_to_csv import append_calculated_data_csv, result_columns
+from online_statistics import StatisticsAccumulator
+from well_batch import WELL_BATCH_DTYPE, as_well_batch, empty_well_batch
+
+RESULT_FIELDS = ['T_MIN', 'T', 'T_MAX', 'K_MIN', 'K', 'K_MAX']
+RESULT_DTYPE = np.dtype(WELL_BATCH_DTYPE.descr +
+                        [(i, np.float64) for i in RESULT_FIELDS])
+
+def _file_format(file_name):
+    """Returns 'parquet' or 'npz' from the extension of file_name."""
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension not in ('.parquet', '.npz'):
+        raise ValueError(f"Unknown results file type: {file_name}")
+    return extension[1:]
+
+
+class ResultWriter:
+    """Appends batches of results to a .parquet or .npz file.
+
+    Parameters
+    ----------
+    file_name: str
+        Path of the file. The extension (.parquet or .npz) picks the format.
+        An existing file is replaced.
+
+    compression: str
+        None for no compression. For Parquet any codec pyarrow supports
+        ('snappy', 'zstd', 'gzip', ...); for .npz any other value deflates
+        the members.
+
+    Notes
+    -----
+    Use it as a context manager, or call close() when done:
+        with ResultWriter('results.npz') as writer:
+            for batch in calculation_batches(...):
+                writer.write(*batch)
+    """
+
+    def __init__(self, file_name, compression=None):
+        self.file_name = file_name
+        self.format = _file_format(file_name)
+        self.row_groups = 0
+        self.rows = 0
+        if os.path.exists(file_name):
+            os.remove(file_name)
+        if self.format == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            self._schema = pa.schema([
+                (name, pa.string() if RESULT_DTYPE[name].kind == 'U'
+                 else pa.from_numpy_dtype(RESULT_DTYPE[name]))
+                for name in RESULT_DTYPE.names])
+            self._writer = pq.ParquetWriter(file_name, self._schema,
+                                            compression=compression or 'none')
+        else:
+            self._writer = zipfile.ZipFile(
+                file_name, 'w', zipfile.ZIP_STORED if compression is None
+                else zipfile.ZIP_DEFLATED, allowZip64=True)
+
+    def write(self, confirmed_wells, transmissivity_calculated,
+              conductivity_calculated):
+        """Appends one batch of wells as a new row group.
+
+        Parameters
+        ----------
+        confirmed_wells, transmissivity_calculated, conductivity_calculated:
+            Same as calculated_data_to_csv, for one batch of wells.
+        """
+        batch = as_well_batch(confirmed_wells)
+        results = np.column_stack((
+            result_columns(transmissivity_calculated, len(batch)),
+            result_columns(conductivity_calculated, len(batch))))
+        columns = {name: batch[name] for name in WELL_BATCH_DTYPE.names}
+        columns.update(zip(RESULT_FIELDS, results.T))
+
+        if self.format == 'parquet':
+            import pyarrow as pa
+            arrays = [pa.array(columns[name].tolist(), type=field.type)
+                      if RESULT_DTYPE[name].kind == 'U'
+                      else pa.array(np.ascontiguousarray(columns[name]))
+                      for name, field in zip(RESULT_DTYPE.names, self._schema)]
+            self._writer.write_table(pa.Table.from_arrays(arrays,
+                                                          schema=self._schema))
+        else:
+            group = f"rg{self.row_groups:05d}"
+            for name in RESULT_DTYPE.names:
+                column = np.ascontiguousarray(columns[name],
+                                              dtype=RESULT_DTYPE[name])
+                with self._writer.open(f"{group}/{name}.npy", 'w',
+                                       force_zip64=True) as member:
+                    np.lib.format.write_array(member, column,
+                                              allow_pickle=False)
+        self.row_groups += 1
+        self.rows += len(batch)
+
+    def close(self):
+        """Finishes the file. A file without any batch gets one empty row
+        group so it can still be read."""
+        if self._writer is None:
+            return
+        if self.row_groups == 0:
+            self.write(empty_well_batch(0), np.empty((0, 3)), np.empty((0, 3)))
+        self._writer.close()
+        self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_results(results, file_name, compression=None):
+    """Writes every batch of a results iterable with ResultWriter.
+
+    Parameters
+    ----------
+    results: iterable
+        (confirmed_wells, transmissivity_calculated, conductivity_calculated)
+        batches, e.g. from streaming.calculation_batches.
+
+    file_name, compression:
+        Same as ResultWriter.
+
+    Returns
+    -------
+    rows: int
+        The number of wells written.
+    """
+    with ResultWriter(file_name, compression) as writer:
+        for confirmed_wells, transmissivity_calculated, conductivity_calculated in results:
+            writer.write(confirmed_wells, transmissivity_calculated,
+                         conductivity_calculated)
+    return writer.rows
+
+def _npz_member(archive, handle, name, memory_map):
+    """Reads one .npy member of an .npz archive, memory-mapped if possible."""
+    info = archive.getinfo(name)
+    if not memory_map or info.compress_type != zipfile.ZIP_STORED:
+        with archive.open(name) as member:
+            return np.lib.format.read_array(member, allow_pickle=False)
+    #the member data starts after its local file header
+    handle.seek(info.header_offset + 26)
+    name_length, extra_length = np.frombuffer(handle.read(4), dtype='<u2')
+    handle.seek(info.header_offset + 30 + int(name_length) + int(extra_length))
+    version = np.lib.format.read_magic(handle)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(handle)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(handle)
+    if 0 in shape:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(handle.name, dtype=dtype, mode='r', offset=handle.tell(),
+                     shape=shape, order='F' if fortran_order else 'C')
+
+def row_groups(file_name, columns=None, memory_map=False):
+    """Yields the row groups of a results file as column dictionaries.
+
+    Parameters
+    ----------
+    file_name: str
+        Path of a file written by ResultWriter.
+
+    columns: list[str]
+        The columns to read. The default is every column.
+
+    memory_map: bool
+        True memory-maps the file instead of reading it (Parquet files and
+        uncompressed .npz files).
+
+    Yields
+    ------
+    row_group: dict
+        Maps each column name to a NumPy array with the dtype of RESULT_DTYPE.
+    """
+    columns = list(RESULT_DTYPE.names) if columns is None else list(columns)
+    if _file_format(file_name) == 'parquet':
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(file_name, memory_map=memory_map)
+        for i in range(parquet.num_row_groups):
+            table = parquet.read_row_group(i, columns=columns)
+            yield {name: table.column(name).to_numpy(zero_copy_only=False)
+                   .astype(RESULT_DTYPE[name], copy=False) for name in columns}
+        return
+    with zipfile.ZipFile(file_name) as archive, open(file_name, 'rb') as handle:
+        groups = sorted({i.split('/')[0] for i in archive.namelist()})
+        for group in groups:
+            yield {name: _npz_member(archive, handle, f"{group}/{name}.npy",
+                                     memory_map) for name in columns}
+
+def read_results(file_name, columns=None, memory_map=False):
+    """Reads a results file, or some of its columns, into arrays.
+
+    Parameters
+    ----------
+    file_name, columns, memory_map:
+        Same as row_groups. A file with a single row group is returned
+        memory-mapped when memory_map is True; several row groups are
+        joined into one array per column.
+
+    Returns
+    -------
+    results: dict
+        Maps each column name to a NumPy array.
+    """
+    groups = list(row_groups(file_name, columns, memory_map))
+    if len(groups) == 1:
+        return groups[0]
+    return {name: np.concatenate([i[name] for i in groups])
+            for name in groups[0]}
+
+def results_to_csv(file_name, feature_class_name):
+    """Writes the csv view of a results file.
+
+    The csv file has the same columns as calculated_data_to_csv and is
+    written one row group at a time. A results file always has at least one
+    row group (see ResultWriter.close), so an empty file still gives the
+    header row.
+
+    Parameters
+    ----------
+    file_name: str
+        Path of a file written by ResultWriter.
+
+    feature_class_name: str
+        Name of the csv file, without the extension.
+
+    Returns
+    -------
+    raw_csv_name: str
+        The name of the csv file written.
+
+    rows: int
+        The number of rows written.
+    """
+    raw_csv_name = f"{feature_class_name}.csv"
+    rows = 0
+    for group in row_groups(file_name):
+        batch = empty_well_batch(len(group['WELLID']))
+        for name in WELL_BATCH_DTYPE.names:
+            batch[name] = group[name]
+        transmissivity_calculated = np.column_stack([group[i] for i in RESULT_FIELDS[:3]])
+        conductivity_calculated = np.column_stack([group[i] for i in RESULT_FIELDS[3:]])
+        rows += append_calculated_data_csv(transmissivity_calculated,
+                                           conductivity_calculated, batch,
+                                           raw_csv_name, header=(rows == 0))
+    return raw_csv_name, rows
+
+def results_statistics(file_name, memory_map=True):
+    """Accumulates the statistics of a results file one row group at a time.
+
+    Parameters
+    ----------
+    file_name: str
+        Path of a file written by ResultWriter.
+
+    memory_map: bool
+        Same as row_groups.
+
+    Returns
+    -------
+    statistics: StatisticsAccumulator
+        The statistics of the T_MIN to K_MAX columns. Pass it to
+        calculated_data_statistics_csv to write the statistics csv file.
+    """
+    statistics = StatisticsAccumulator(["T_min", "T_raw", "T_max",
+                                        "K_min", "K_raw", "K_max"])
+    for group in row_groups(file_name, RESULT_FIELDS, memory_map):
+        statistics.update(np.column_stack([group[i] for i in RESULT_FIELDS]))
+    return statistics
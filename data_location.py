@@ -20,16 +20,45 @@ Variables
     THICKNESS = Attribute Table provided by Richard Soule from the
     Minnesota Department of Health. This table estimates aquifer thickness and
     saturated/unsaturated elevations in the given aquifer.
+    
+    BACKEND = Reader used for the tables above (see table_reader). 'arcpy'
+    reads them with ArcGIS. 'sqlite' reads them from SQLITE_DATABASE, a
+    SQLite database or GeoPackage with tables named allwells, C5PL and
+    CWI_hydro.
+    
+    STATEWIDE_STORE = SQLite database of precomputed statewide Transmissivity
+    and Hydraulic Conductivity values (see statewide).
+    
+    INDEX_DIR = Folder where the per-aquifer spatial indexes of allwells are
+    saved (see spatial_index). It is created the first time find_wells runs.
+    
+    The environment variables CWI_STATEWIDE_STORE and CWI_INDEX_DIR override
+    STATEWIDE_STORE and INDEX_DIR. Otherwise, when CWI_SQLITE_DATABASE is set
+    (see table_reader), both are kept in the folder of that database, so
+    batch nodes without the Windows paths below work without editing this
+    file.
 
 By: Jonny Full
-Version: 6/26/2020
+Version: 10/17/2026
 -------------------------------------------------------------------------------
 """
+import os
+
 WORKSPACE = r"C:\Users\JonnyA\Documents\ArcGIS\Projects\CWI_Current_5-19-20\CWI_Current_5-19-20.gdb"
 CWI_DATA = r"C:\Users\JonnyA\Desktop\Research\Test\water_well_information.gdb"    
 allwells = CWI_DATA + r'\allwells'
 CWIPL = CWI_DATA + r'\C5PL'
 loc = r"C:\Users\JonnyA\Desktop\Research\Current Work\PumpingTestData.xlsx"
 THICKNESS = r'C:\Users\JonnyA\Desktop\Research\Test\CWI_hydro.dbf'
+BACKEND = 'arcpy'
+SQLITE_DATABASE = r'C:\Users\JonnyA\Desktop\Research\Test\cwi_tables.gpkg'
+STATEWIDE_STORE = r'C:\Users\JonnyA\Desktop\Research\Test\statewide_results.sqlite'
+INDEX_DIR = r'C:\Users\JonnyA\Desktop\Research\Test\spatial_index'
+if 'CWI_SQLITE_DATABASE' in os.environ:
+    DATA_DIR = os.path.dirname(os.path.abspath(os.environ['CWI_SQLITE_DATABASE']))
+    STATEWIDE_STORE = os.path.join(DATA_DIR, 'statewide_results.sqlite')
+    INDEX_DIR = os.path.join(DATA_DIR, 'spatial_index')
+STATEWIDE_STORE = os.environ.get('CWI_STATEWIDE_STORE', STATEWIDE_STORE)
+INDEX_DIR = os.environ.get('CWI_INDEX_DIR', INDEX_DIR)
 
          
\ No newline at end of file
@@ -8,11 +8,24 @@ find_wells: Retrieves data regarding well location and well construction.
 This function only selects wells within an input radial distance from the
 target_well and draws water from the same aquifer as the target_well.
 
+locate_wells: Looks up the location and aquifer of a group of wells.
+
+query_candidate_wells: Returns the wells of an aquifer spatial index within
+a radial distance of a point.
+
+read_aquifer_wells: Reads location and construction data for every well in
+one aquifer. This is used to build the spatial index queried by find_wells.
+
 pump_log: Uses the wells retrieved from find_wells to select specific capacity
-data from the CWI Pump Log table.
+data from the CWI Pump Log table. This combines pump_log_raw, which reads the
+table, and pump_log_bounds, which applies the error bounds.
 
 aquifer_thickness: Uses data from find_wells to select aquifer thickness data
-from the CWI_Hydro table
+from the CWI_Hydro table. This combines aquifer_thickness_raw, which reads the
+table, and aquifer_thickness_bounds, which applies the error bounds.
+
+retrieve_well_data: Runs pump_log and aquifer_thickness concurrently when the
+table reader allows it and reports how long each one took.
 
 storativity_calculations: Uses aquifer thickness and code to determine material
 properties and determine the storage coefficent for every well observed.
@@ -27,12 +40,16 @@ Aquifer Hydraulics: A Comprehensive Guide to Hydrogeologic Data Analysis
 John Wiley & Sons, 1998, PG. 61
 
 Author: Jonny Full
-Version: 7/13/2020
+Version: 10/17/2026
 """
+import time
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from scipy import spatial
-import arcpy
 from data_location import allwells, CWIPL, THICKNESS
+from interval import Interval
+from spatial_index import load_aquifer_index
+from table_reader import get_reader, search_cursor, search_wellids
+from well_batch import gather_well_batch
 
 def find_wells(target_well, radius, error_bounds):
     """ Use the target well input by the user to find all wells within a given
@@ -72,13 +89,87 @@ def find_wells(target_well, radius, error_bounds):
     The casing diameter value (inches) is converted to a radius and from inches
     to feet.
 
+    The wells of each aquifer are read once and saved as a spatial index
+    (see spatial_index). Later calls only query the saved index until the
+    allwells table changes.
+
+    """
+    target = locate_wells([target_well])[int(target_well)]
+    data = [target[0], target[1]] #records UTM coordinates
+    index = load_aquifer_index(target[2], get_reader().source(allwells),
+                               read_aquifer_wells)
+    return query_candidate_wells(index, data, radius)
+
+def locate_wells(well_ids):
+    """Looks up the location and aquifer of a group of wells.
+
+    Parameters
+    ----------
+    well_ids: list[int]
+        The WELLIDs to look up.
+
+    Returns
+    -------
+    locations: dict
+        Maps each WELLID found in allwells to a tuple of UTM easting,
+        UTM northing and Aquifer code.
+    """
+    locations = {}
+    for row in search_wellids(allwells, ['UTME', 'UTMN', 'AQUIFER', 'WELLID'],
+                              None, well_ids):
+        locations.setdefault(row[3], tuple(row[:3]))
+    return locations
+
+def query_candidate_wells(index, data, radius):
+    """Returns the wells of an aquifer index within radius of a point.
+
+    Parameters
+    ----------
+    index: AquiferIndex
+        The spatial index of one aquifer (see spatial_index).
+
+    data: list[float]
+        UTM easting and northing of the target well.
+
+    radius: int (meters)
+        Any wells returned fall within this distance of data.
+
+    Returns
+    -------
+    candidate_wells: list
+        Same as find_wells. This list is sorted by ascending Well ID number.
+    """
+    #finds wells inside the boundary condition
+    candidate_well_index = index.tree.query_ball_point(data, radius)
+    wells = index.wells[np.sort(candidate_well_index).astype(np.intp)]
+    candidate_wells = [[utm_east, utm_north, index.aquifer, screen_len,
+                        radius_well, well_id] for utm_east, utm_north,
+                       screen_len, radius_well, well_id in wells.tolist()]
+    candidate_wells.sort(key=lambda x: x[5])#sorts by ascending WELLID number
+    return candidate_wells
+
+def read_aquifer_wells(aquifer):
+    """Reads location and construction data for every well in one aquifer.
+
+    Parameters
+    ----------
+    aquifer: str
+        The AQUIFER code of the wells to read.
+
+    Returns
+    -------
+    well_data: list
+        well_data is a list that contains the UTM easting and northing (int),
+        Aquifer code (str), screen length (float), casing radius (float),
+        and Well ID (int) of every well in the aquifer that has all of the
+        required parameters.
+
+    Notes
+    -----
+    The casing diameter value (inches) is converted to a radius and from inches
+    to feet. This function is used by spatial_index to build the saved
+    aquifer indexes that find_wells queries.
     """
-    initial_well = []
-    with arcpy.da.SearchCursor(allwells, ['UTME', 'UTMN', 'AQUIFER'],\
-                               f"WELLID = {target_well}") as cursor:
-        for row in cursor:
-            initial_well.append(row)
-    data = [initial_well[0][0], initial_well[0][1]] #records UTM coordinates
     well_data = []
     field_names = [
         "UTME",
@@ -101,9 +192,9 @@ def find_wells(target_well, radius, error_bounds):
         "(DEPTH_DRLL > 0) AND "
         "(CASE_DIAM is not NULL) AND "
         "(CASE_DIAM > 0) AND "
-        f"AQUIFER = '{initial_well[0][2]}'"
+        f"AQUIFER = '{aquifer}'"
         )
-    with arcpy.da.SearchCursor(allwells, field_names, where_clause) as cursor:
+    with search_cursor(allwells, field_names, where_clause) as cursor:
         for row in cursor:
             utm_east = row[0]
             utm_north = row[1]
@@ -118,15 +209,7 @@ def find_wells(target_well, radius, error_bounds):
             values = [utm_east, utm_north, aquifer, screen_len,\
                       radius_well, well_id]
             well_data.append(values)
-    xy = np.array([[well[0], well[1]] for well in well_data])
-    tree = spatial.cKDTree(xy)
-    #finds wells inside the boundary condition
-    candidate_well_index = tree.query_ball_point(data, radius)
-    candidate_wells = []
-    for i in candidate_well_index:
-        candidate_wells.append(well_data[i])
-    candidate_wells.sort(key=lambda x: x[5])#sorts by ascending WELLID number
-    return candidate_wells
+    return well_data
 
 def pump_log(candidate_wells, error_bounds):
 
@@ -171,7 +254,32 @@ def pump_log(candidate_wells, error_bounds):
     The test duration is converted from hours to days.
 
     """
-    pump_log_wells = []
+    raw_rows = pump_log_raw([i[5] for i in candidate_wells])
+    return pump_log_bounds(raw_rows, error_bounds)
+
+def pump_log_raw(well_ids):
+    """Reads the specific capacity tests of a group of wells from the CWI Pump
+    Log table.
+
+    Parameters
+    ----------
+    well_ids: list[int]
+        The WELLIDs to read.
+
+    Returns
+    -------
+    raw_rows: list
+        raw_rows is a list of [Pump Rate (gpm), Duration (hours), Static Water
+        Level (ft), Pumping Water Level (ft), Well ID] for every test of the
+        wells in well_ids where every field is greater than zero and not null.
+        No error bounds or unit conversions are applied.
+
+    Notes
+    -----
+    The WELLIDs are queried in bounded chunks (see table_reader.search_wellids)
+    so a single well or a very large radius both produce valid queries.
+    """
+    raw_rows = []
     requested_values = [
         "FLOW_RATE",
         "DURATION", 
@@ -189,34 +297,43 @@ def pump_log(candidate_wells, error_bounds):
         "(START_MEAS is not NULL) AND "
         "(START_MEAS > 0) AND "
         "(PUMP_MEAS is not NULL) AND "
-        "(PUMP_MEAS > 0) AND "
-        f"WELLID in {tuple([i[5] for i in candidate_wells])}"
+        "(PUMP_MEAS > 0)"
         )
 
-    with arcpy.da.SearchCursor(CWIPL, requested_values, where_clause) as cursor:
-        for row in cursor:
-            wellid = row[4]
-            #Calculates pump rate
-            pump_rate_min = row[0] - error_bounds
-            pump_rate_max = row[0] + error_bounds
-            rate_min = pump_rate_min*192.5 #converts from gal/min to ft^3/day
-            rate = row[0]*192.5 #original data
-            rate_max = pump_rate_max*192.5
-            #Calculates pump duration in days
-            dur = row[1]/24
-            #Calculates Drawdown
-            static_wl_min = row[2] - error_bounds
-            static_wl_max = row[2] + error_bounds
-            pump_wl_min = row[3] - error_bounds
-            pump_wl_max = row[3] + error_bounds
-            down_min = pump_wl_min - static_wl_max
-            down = row[3] - row[2]
-            down_max = pump_wl_max - static_wl_min
-            if down_min <= 0: #filters out entries where drawdown less\ equals 0
-                continue
-            value = [rate_min, rate, rate_max, dur, down_min, down, down_max, wellid]
-            pump_log_wells.append(value)
-        pump_log_wells.sort(key=lambda x: x[7])#sorts list by Relate ID number
+    for row in search_wellids(CWIPL, requested_values, where_clause, well_ids):
+        raw_rows.append(list(row))
+    return raw_rows
+
+def pump_log_bounds(raw_rows, error_bounds):
+    """Applies the error bounds and unit conversions to raw pump log rows.
+
+    Parameters
+    ----------
+    raw_rows: list
+        The rows returned by pump_log_raw.
+
+    error_bounds: int
+        error_bounds represents the limit on the bounds used for the
+        uncertainty surrounding the recorded values in the CWI database.
+
+    Returns
+    -------
+    pump_log_wells: list
+        Same as pump_log. This list is sorted by ascending Well ID number.
+    """
+    if not raw_rows:
+        return []
+    flow_rate, duration, start_meas, pump_meas, wellid = zip(*raw_rows)
+    rate = Interval.around(flow_rate, error_bounds)*192.5 #converts from gal/min to ft^3/day
+    dur = np.asarray(duration, dtype=np.float64)/24 #pump duration in days
+    static_wl = Interval.around(start_meas, error_bounds)
+    pump_wl = Interval.around(pump_meas, error_bounds)
+    down = pump_wl - static_wl
+    keep = down.lower > 0 #filters out entries where drawdown less\ equals 0
+    columns = np.column_stack((rate.columns(), dur, down.columns()))[keep]
+    pump_log_wells = [value + [well_id] for value, well_id in
+                      zip(columns.tolist(), np.asarray(wellid)[keep].tolist())]
+    pump_log_wells.sort(key=lambda x: x[7])#sorts list by Relate ID number
     return pump_log_wells
 
 
@@ -248,7 +365,29 @@ def aquifer_thickness(candidate_wells, error_bounds):
     thickness_aquired: list
         A list of Well ID and aquifer thickness values (float).
     """
-    thickness_aquired = []
+    raw_rows = aquifer_thickness_raw([i[5] for i in candidate_wells])
+    return aquifer_thickness_bounds(raw_rows, error_bounds)
+
+def aquifer_thickness_raw(well_ids):
+    """Reads the aquifer thickness of a group of wells from the CWI_HYDRO
+    (THICKNESS) attribute table.
+
+    Parameters
+    ----------
+    well_ids: list[int]
+        The WELLIDs to read.
+
+    Returns
+    -------
+    raw_rows: list
+        raw_rows is a list of [aquifer thickness (ft), Well ID] for every
+        well in well_ids with a thickness greater than zero.
+
+    Notes
+    -----
+    The WELLIDs are queried in bounded chunks (see table_reader.search_wellids).
+    """
+    raw_rows = []
     requested_values = [
         "AQ_THICK",
         "WELLID"
@@ -256,21 +395,102 @@ def aquifer_thickness(candidate_wells, error_bounds):
     where_clause = (
         "(WELLID is not NULL) AND "
         "(AQ_THICK is not NULL) AND "
-        "(AQ_THICK > 0) AND "
-        f"WELLID in {tuple([i[5] for i in candidate_wells])}"
+        "(AQ_THICK > 0)"
         )
-    with arcpy.da.SearchCursor(THICKNESS, requested_values, where_clause) as cursor:
-        for row in cursor:
-            thickness_min = row[0] - error_bounds
-            thickness_values = row[0]
-            thickness_max = row[0] + error_bounds
-            wellid = row[1]
-            if thickness_min <= 0 or thickness_values <= 0:
-                continue
-            info = [thickness_min, thickness_values, thickness_max, wellid]
-            thickness_aquired.append(info)
+    for row in search_wellids(THICKNESS, requested_values, where_clause,
+                              well_ids):
+        raw_rows.append(list(row))
+    return raw_rows
+
+def aquifer_thickness_bounds(raw_rows, error_bounds):
+    """Applies the error bounds to raw aquifer thickness rows.
+
+    Parameters
+    ----------
+    raw_rows: list
+        The rows returned by aquifer_thickness_raw.
+
+    error_bounds: int
+        error_bounds represents the limit on the bounds used for the
+        uncertainty surrounding the recorded values in the CWI database.
+
+    Returns
+    -------
+    thickness_aquired: list
+        Same as aquifer_thickness.
+    """
+    if not raw_rows:
+        return []
+    aq_thick, wellid = zip(*raw_rows)
+    thickness = Interval.around(aq_thick, error_bounds)
+    keep = (thickness.lower > 0) & (thickness.nominal > 0)
+    thickness_aquired = [value + [well_id] for value, well_id in
+                         zip(thickness.columns()[keep].tolist(),
+                             np.asarray(wellid)[keep].tolist())]
     return thickness_aquired
 
+def retrieve_well_data(candidate_wells, error_bounds, concurrent=None):
+    """Runs pump_log and aquifer_thickness for the same candidate_wells at the
+    same time.
+
+    pump_log and aquifer_thickness read two different tables (C5PL and
+    CWI_hydro) and do not depend on each other. When the table reader
+    allows concurrent searches (the sqlite backend) they are run on two
+    threads, which roughly halves the time spent waiting on slow network
+    shares. arcpy cursors are not shared between threads, so with the
+    default arcpy backend the two reads run one after the other and this
+    function is no faster than calling pump_log and aquifer_thickness.
+
+    Parameters
+    ----------
+    candidate_wells: list
+        Same as pump_log and aquifer_thickness.
+
+    error_bounds: int
+        error_bounds represents the limit on the bounds used for the
+        uncertainty surrounding the recorded values in the CWI database.
+
+    concurrent: bool
+        True runs the two reads on separate threads and False runs them one
+        after the other. The default (None) follows the concurrent attribute
+        of the table reader (see table_reader).
+
+    Returns
+    -------
+    pump_log_results: list
+        Same as pump_log.
+
+    thickness_data: list
+        Same as aquifer_thickness.
+
+    timings: dict
+        Wall-clock seconds spent in 'pump_log', 'aquifer_thickness' and the
+        whole stage ('total').
+    """
+    if concurrent is None:
+        concurrent = getattr(get_reader(), 'concurrent', False)
+    timings = {}
+
+    def timed(name, function):
+        start = time.perf_counter()
+        result = function(candidate_wells, error_bounds)
+        timings[name] = time.perf_counter() - start
+        return result
+
+    start = time.perf_counter()
+    if concurrent:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            pump_future = executor.submit(timed, 'pump_log', pump_log)
+            thickness_future = executor.submit(timed, 'aquifer_thickness',
+                                               aquifer_thickness)
+            pump_log_results = pump_future.result()
+            thickness_data = thickness_future.result()
+    else:
+        pump_log_results = timed('pump_log', pump_log)
+        thickness_data = timed('aquifer_thickness', aquifer_thickness)
+    timings['total'] = time.perf_counter() - start
+    return pump_log_results, thickness_data, timings
+
 def storativity_calculations(candidate_wells, thickness_data):
     """This function uses the aquifer thickness data to calculate the storage
     coefficient for each well.
@@ -327,20 +547,24 @@ def storativity_calculations(candidate_wells, thickness_data):
         Ss_max = 6.2*10**-5 #dense sands
         Ss_min = 3.9*10**-5
 
-    for row in thickness_data:
-        well_id = row[3]
-        b_min = row[0]
-        b = row[1]
-        b_max = row[2]
-        S_max = Ss_max * b
-        S_min = Ss_min * b
-        data = [b_min, b, b_max, S_min, S_max, well_id]
-        thickness_storativity_data.append(data)
-        thickness_storativity_data.sort(key=lambda x: x[5]) #sorts list by Well ID number
+    if not thickness_data:
+        return thickness_storativity_data
+    thickness = Interval.from_columns([row[:3] for row in thickness_data])
+    #only the bounds are kept; the nominal storage coefficient is their
+    #geometric mean (see well_batch.storage_interval)
+    storativity = Interval(Ss_min, (Ss_min*Ss_max)**0.5, Ss_max)*thickness.nominal
+    well_ids = [row[3] for row in thickness_data]
+    for b_row, S_min, S_max, well_id in zip(thickness.columns().tolist(),
+                                            storativity.lower.tolist(),
+                                            storativity.upper.tolist(),
+                                            well_ids):
+        thickness_storativity_data.append(b_row + [S_min, S_max, well_id])
+    thickness_storativity_data.sort(key=lambda x: x[5]) #sorts list by Well ID number
     return thickness_storativity_data
 
 
-def data_organization(candidate_wells, pump_log_results, thickness_storativity_data):
+def data_organization(candidate_wells, pump_log_results, thickness_storativity_data,
+                      report=False):
     """This function organizes the candidate_wells and the pump_log_results
     lists into one large data set.
 
@@ -372,29 +596,60 @@ def data_organization(candidate_wells, pump_log_results, thickness_storativity_d
         coefficent (float), and Well ID (int). This list is sorted by acsending
         Well ID.
 
+    report: bool
+        If True, a dictionary with the number of rows that each input dropped
+        during the join is returned along with confirmed_wells.
+
     Results
     -------
-    confirmed_wells: list[list1, list2, list3]
-        This is a list of all pertinant information required to plot the wells
-        spacially and calculate transmissivity / hydraulic conductivity.
-
-        list1 = list[UTME (int), UTMN (int), AQUIFER (str), Screen Length (float),
-                     Casing Radius (ft), Well ID (int)]
-
-        list 2 = list[Pump Rate (float), Duration (float), Drawdown (float),
-                      Well ID (int)]
+    confirmed_wells: WellBatch
+        This is a WellBatch (see well_batch) of all pertinant information
+        required to plot the wells spacially and calculate transmissivity /
+        hydraulic conductivity. Each record combines one entry of
+        candidate_wells, pump_log_results and thickness_storativity_data
+        that share the same Well ID.
+
+    join_report: dict
+        Only returned when report is True. The keys 'candidate_wells',
+        'pump_log_results' and 'thickness_storativity_data' hold the number
+        of rows from that input that did not match the other two inputs.
 
-        list 3 = list[aquifer thickness (float),
-                      miniumum storage coefficent (float), maximum storage
-                      coefficent (float), and Well ID (int)]
+    Notes
+    -----
+    The join is done with a hash index on Well ID, so it runs in linear time.
+    Duplicate Well IDs in candidate_wells or pump_log_results produce every
+    combination of their rows (a cross product). The records are ordered by
+    pump_log_results and then by candidate_wells.
     """
-    confirmed_wells = []
-    for item in pump_log_results: #there are duplicate well IDs in this table
-        for row in candidate_wells: # there are duplicate well IDs in this table
-            if row[5] != item[7]:
-                continue
-            for data in thickness_storativity_data: #there are no duplicate well IDs
-                if row[5] == item[7] == data[5]:
-                    value = [row, item, data]
-                    confirmed_wells.append(value)
-    return confirmed_wells
\ No newline at end of file
+    candidate_index = {}
+    for position, row in enumerate(candidate_wells): # there are duplicate well IDs in this table
+        candidate_index.setdefault(row[5], []).append(position)
+    thickness_index = {}
+    for position, data in enumerate(thickness_storativity_data): #there are no duplicate well IDs
+        thickness_index.setdefault(data[5], []).append(position)
+
+    candidate_rows = []
+    pump_rows = []
+    thickness_rows = []
+    for position, item in enumerate(pump_log_results): #there are duplicate well IDs in this table
+        thickness_matches = thickness_index.get(item[7])
+        if thickness_matches is None:
+            continue
+        for row in candidate_index.get(item[7], ()):
+            for data in thickness_matches:
+                candidate_rows.append(row)
+                pump_rows.append(position)
+                thickness_rows.append(data)
+    confirmed_wells = gather_well_batch(candidate_wells, pump_log_results,
+                                        thickness_storativity_data,
+                                        candidate_rows, pump_rows,
+                                        thickness_rows)
+    if not report:
+        return confirmed_wells
+    join_report = {
+        'candidate_wells': len(candidate_wells) - len(set(candidate_rows)),
+        'pump_log_results': len(pump_log_results) - len(set(pump_rows)),
+        'thickness_storativity_data':
+            len(thickness_storativity_data) - len(set(thickness_rows))
+        }
+    return confirmed_wells, join_report
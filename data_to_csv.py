@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 """
 This module was created to hold any code that transforms our data into csv files.
-This module has two functions:
+This module has the following functions:
 
 Functions
 -----------
@@ -11,17 +11,36 @@ calculated_data_to_csv: This function take the data from transmissivity
     so the user can easily interact with the data. This file will also be used
     to create a feature class.
 
+append_calculated_data_csv: Writes the same csv file as calculated_data_to_csv
+    one batch of wells at a time (see streaming).
+
+result_columns: Returns the [min, nominal, max] columns of T or K as an
+    array.
+
 calculated_data_statistics_csv: This function takes the .csv file created in
     calculated_data_to_csv and performes statistical analysis. This function
     then creates another .csv file for the user to interact with at their
     convienience.
+
+grouped_statistics: Calculates the same statistics for every aquifer and/or
+    grid cell in a single vectorized pass over the columnar results.
+
+grouped_statistics_csv: Writes the grouped statistics to a csv file.
     
 Author: Jonny Full
-Version: 9/31/2020
+Version: 10/17/2026
 """
 import numpy as np
 import pandas as pd
+from online_statistics import StatisticsAccumulator
+from well_batch import as_well_batch
 
+CSV_HEADER = ['UTME', 'UTMN', 'T_min', 'T_raw', 'T_max', 'K_min', 'K_raw',
+              'K_max', 'Well ID']
+GROUP_COLUMNS = {'T_MIN': 'T_min', 'T': 'T_raw', 'T_MAX': 'T_max',
+                 'K_MIN': 'K_min', 'K': 'K_raw', 'K_MAX': 'K_max'}
+GROUP_STATISTICS = ['count', 'mean', 'std', 'min', 'p25', 'median', 'p75',
+                    'max', 'log_mean', 'log_std']
 
 
 def calculated_data_to_csv(transmissivity_calculated, conductivity_calculated,
@@ -39,15 +58,9 @@ def calculated_data_to_csv(transmissivity_calculated, conductivity_calculated,
         conductivity_calculated represents the calculated hydraulic conductivity
         for each row intransmissivity_calculated.
         
-    confirmed_wells: list[[list1][list2]]
-        This is a list of all pertinant information required to plot the wells
-        spacially and calculate Transmissivity.
-
-        list1 = list[UTME (int), UTMN (int), AQUIFER (str), Screen Length (float),
-                     Casing Radius (ft), Relate ID (str)]
-
-        list 2 = list[Pump Rate (float), Duration (float), Drawdown (float),
-                      Relate ID (str)]
+    confirmed_wells: WellBatch
+        This is a WellBatch (see well_batch) of all pertinant information
+        required to plot the wells spacially and calculate Transmissivity.
         
     feature_class_name = string
         This is the name of the csv file. This is input by the user in GIS.
@@ -67,20 +80,67 @@ def calculated_data_to_csv(transmissivity_calculated, conductivity_calculated,
     this script through.
     
     """
-    utm_e = [i[0][0] for i  in confirmed_wells]
-    utm_n = [i[0][1] for i in confirmed_wells]
-    np.set_printoptions(suppress=True) #removes scientific notation
-    location = np.array([utm_e, utm_n])
-    location = location.transpose()
-    transmissivity_calculated = np.array(transmissivity_calculated)
-    conductivity_calculated = np.array(conductivity_calculated)
-    joined_data = np.concatenate((location, transmissivity_calculated, conductivity_calculated), axis = 1)
-    my_df = pd.DataFrame(joined_data)
-    header_list = ['UTME', 'UTMN', 'T_min', 'T_raw', 'T_max', 'K_min', 'K_raw', 'K_max', 'Well ID']
+    my_df = _calculated_data_frame(transmissivity_calculated,
+                                   conductivity_calculated, confirmed_wells)
     raw_csv_name = f"{feature_class_name}.csv"
-    my_df.to_csv(raw_csv_name, index = False, header = header_list)
+    my_df.to_csv(raw_csv_name, index = False, header = CSV_HEADER)
     return my_df, raw_csv_name
 
+def append_calculated_data_csv(transmissivity_calculated, conductivity_calculated,
+                               confirmed_wells, raw_csv_name, header):
+    """Appends one batch of results to a csv file written in the same format
+    as calculated_data_to_csv.
+
+    Parameters:
+    -----------
+    transmissivity_calculated, conductivity_calculated, confirmed_wells:
+        Same as calculated_data_to_csv, for one batch of wells.
+
+    raw_csv_name: string
+        The name of the csv file, including the .csv extension.
+
+    header: bool
+        True for the first batch. The file is then replaced and the header
+        row written; later batches are appended below it.
+
+    Returns:
+    --------
+    rows: int
+        The number of rows written.
+    """
+    my_df = _calculated_data_frame(transmissivity_calculated,
+                                   conductivity_calculated, confirmed_wells)
+    my_df.to_csv(raw_csv_name, index = False,
+                 header = CSV_HEADER if header else False,
+                 mode = 'w' if header else 'a')
+    return len(my_df)
+
+def result_columns(values, rows):
+    """Returns the [min, nominal, max] columns of T or K as an (rows, 3) array.
+
+    An empty list gives an empty (0, 3) array, and the Well ID column of
+    conductivity_calculations is dropped.
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim != 2:
+        values = values.reshape(rows, 3)
+    return values[:, :3]
+
+def _calculated_data_frame(transmissivity_calculated, conductivity_calculated,
+                           confirmed_wells):
+    """Builds the dataframe written by calculated_data_to_csv."""
+    batch = as_well_batch(confirmed_wells)
+    np.set_printoptions(suppress=True) #removes scientific notation
+    location = np.column_stack((batch['UTME'], batch['UTMN']))
+    transmissivity_calculated = result_columns(transmissivity_calculated,
+                                                len(batch))
+    conductivity_calculated = result_columns(conductivity_calculated,
+                                              len(batch))
+    joined_data = np.concatenate((location, transmissivity_calculated,
+                                  conductivity_calculated,
+                                  batch['WELLID'][:, np.newaxis]), axis = 1)
+    return pd.DataFrame(joined_data)
+
 def calculated_data_statistics_csv(my_df, feature_class_name):
     """Uses the data in my_df to create another csv file with
     statistical analysis. Each column will have the following items calculated,
@@ -89,9 +149,11 @@ def calculated_data_statistics_csv(my_df, feature_class_name):
     
     Parameters:
     -----------
-    my_df: pandas dataframe
+    my_df: pandas dataframe or StatisticsAccumulator
         A dataframe containing the location, transmissivities, and
-        hydraulic conductivities for every well in our neighborhood.
+        hydraulic conductivities for every well in our neighborhood, or a
+        StatisticsAccumulator (see online_statistics) that was updated with
+        the same values one batch at a time.
             
     feature_class_name = string
         This is the name of the csv file. This is input by the user in GIS.
@@ -104,9 +166,11 @@ def calculated_data_statistics_csv(my_df, feature_class_name):
     This .csv file also has the same primary name as the file created in 
     calculated_data_to_csv. However, this file has _statistics attached to its
     file name.
+
+    The Logrithmic Mean and Standard Deviation are log10 of the mean and of
+    the standard deviation. The percentiles are exact up to
+    online_statistics.EXACT_LIMIT wells and approximate beyond that.
     """
-    #remove Well ID and UTMs from dataframe
-    updated_df = my_df.drop([0, 1, 8], axis = 1)
     raw_csv_name_stats = f"{feature_class_name}_statistics.csv"
     header_list = ["T_min",
                    "T_raw",
@@ -114,22 +178,157 @@ def calculated_data_statistics_csv(my_df, feature_class_name):
                    "K_min",
                    "K_raw",
                    "K_max"]
-    
-    index_list = {0:'Count',
-                  1:'Mean',
-                  2:'Standard Deviation',
-                  3:'Minimum',
-                  4:'25th Percentile',
-                  5:'Median',
-                  6:'75th Percentile',
-                  7:'Maximum',
-                  8:'Logrithmic Mean',
-                  9:'Logrithmic Standard Deviation'}
-    log_mean = np.log10(updated_df.mean())
-    log_std = np.log10(updated_df.std())
-    useful_values = updated_df.describe()
-    useful_values = useful_values.append(log_mean, ignore_index = True)
-    useful_values = useful_values.append(log_std, ignore_index = True)
-    useful_values = useful_values.rename(index = index_list) #gives the index unique names
+    if isinstance(my_df, StatisticsAccumulator):
+        statistics = my_df
+    else:
+        #remove Well ID and UTMs from dataframe
+        updated_df = my_df.drop([0, 1, 8], axis = 1)
+        statistics = StatisticsAccumulator(header_list)
+        statistics.update(updated_df.to_numpy(dtype=float))
+    useful_values = statistics.summary()
     useful_values.to_csv(raw_csv_name_stats, header = header_list)
-        
\ No newline at end of file
+
+def _group_codes(results, by, cell_size):
+    """Returns the group of every row and the key columns of every group."""
+    codes = []
+    keys = []
+    if 'AQUIFER' in by:
+        aquifers, code = np.unique(np.asarray(results['AQUIFER']),
+                                   return_inverse=True)
+        codes.append(code.ravel())
+        keys.append(('AQUIFER', aquifers))
+    if 'CELL' in by:
+        if cell_size is None:
+            raise ValueError("cell_size is required to group by CELL.")
+        for name in ('UTME', 'UTMN'):
+            cells, code = np.unique(np.floor(np.asarray(results[name],
+                                                        dtype=float)/cell_size),
+                                    return_inverse=True)
+            codes.append(code.ravel())
+            keys.append((f"CELL_{name}", (cells + 0.5)*cell_size))
+    if not codes:
+        raise ValueError("by must contain 'AQUIFER' and/or 'CELL'.")
+    shape = tuple(len(i[1]) for i in keys)
+    groups, group = np.unique(np.ravel_multi_index(codes, shape),
+                              return_inverse=True)
+    key_codes = np.unravel_index(groups, shape)
+    key_columns = {name: values[code] for (name, values), code
+                   in zip(keys, key_codes)}
+    return group.ravel(), key_columns
+
+def _column_statistics(values, group, ngroups):
+    """Calculates GROUP_STATISTICS of one column for every group at once."""
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values)
+    values, group = values[valid], group[valid]
+    #sorting by value and then stably by group puts every group together in
+    #ascending order of value; small group codes are radix sorted
+    order = np.argsort(values)
+    group = group[order].astype(np.min_scalar_type(ngroups))
+    by_group = np.argsort(group, kind='stable')
+    values = values[order[by_group]]
+    group = group[by_group].astype(np.intp)
+    count = np.bincount(group, minlength=ngroups)
+    start = np.concatenate(([0], np.cumsum(count)[:-1]))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(group, weights=values, minlength=ngroups)/count
+        deviation = values - mean[group]
+        std = np.sqrt(np.bincount(group, weights=deviation*deviation,
+                                  minlength=ngroups)/(count - 1))
+    has_values = count > 0
+    last = np.where(has_values, start + count - 1, 0)
+    table = {'count': count.astype(float), 'mean': mean, 'std': std}
+    if len(values):
+        table['min'] = np.where(has_values, values[np.minimum(start, len(values) - 1)], np.nan)
+        table['max'] = np.where(has_values, values[last], np.nan)
+    else:
+        table['min'] = table['max'] = np.full(ngroups, np.nan)
+    for name, q in (('p25', 0.25), ('median', 0.5), ('p75', 0.75)):
+        #same linear interpolation as DataFrame.describe
+        position = start + q*np.maximum(count - 1, 0)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, last)
+        if len(values):
+            lower = np.minimum(lower, len(values) - 1)
+            quantile = values[lower] + (position - lower)*(values[upper] - values[lower])
+            table[name] = np.where(has_values, quantile, np.nan)
+        else:
+            table[name] = np.full(ngroups, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        table['log_mean'] = np.log10(mean)
+        table['log_std'] = np.log10(std)
+    if not has_values.all():
+        table['std'][~has_values] = np.nan
+    return [table[i] for i in GROUP_STATISTICS]
+
+def grouped_statistics(results, by=('AQUIFER',), cell_size=None):
+    """Calculates the calculated_data_statistics_csv statistics for every
+    aquifer and/or grid cell in a single vectorized pass.
+
+    Parameters:
+    -----------
+    results: dict
+        The columns of a results file, e.g. columnar.read_results(file_name,
+        memory_map=True). AQUIFER, UTME, UTMN and T_MIN to K_MAX are used.
+
+    by: list[str]
+        'AQUIFER' to group by aquifer code, 'CELL' to group by grid cell, or
+        both.
+
+    cell_size: float
+        Width and height of the square grid cells (meters), e.g. 9656 for a
+        township. Required when grouping by CELL.
+
+    Returns:
+    --------
+    grouped: pandas dataframe
+        One row per group that has wells, sorted by the group keys. The key
+        columns (AQUIFER, CELL_UTME and CELL_UTMN, the cell center) are
+        followed by <column>_<statistic> for every column T_min to K_max and
+        every statistic count, mean, std, min, p25, median, p75, max,
+        log_mean and log_std.
+
+    Notes:
+    ------
+    The statistics are the same as calculated_data_statistics_csv: the
+    standard deviation is the sample standard deviation, the percentiles are
+    exact, and log_mean and log_std are log10 of the mean and of the standard
+    deviation. Each column is sorted by (group, value) and every group is
+    then reduced with np.bincount and index arithmetic, so there is no Python
+    loop over the groups.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    group, key_columns = _group_codes(results, by, cell_size)
+    ngroups = len(next(iter(key_columns.values())))
+    grouped = dict(key_columns)
+    for name, label in GROUP_COLUMNS.items():
+        for statistic, values in zip(GROUP_STATISTICS,
+                                     _column_statistics(results[name], group,
+                                                        ngroups)):
+            grouped[f"{label}_{statistic}"] = values
+    return pd.DataFrame(grouped)
+
+def grouped_statistics_csv(results, feature_class_name, by=('AQUIFER',),
+                           cell_size=None):
+    """Writes grouped_statistics to <feature_class_name>_grouped_statistics.csv.
+
+    Parameters:
+    -----------
+    results, by, cell_size:
+        Same as grouped_statistics.
+
+    feature_class_name = string
+        This is the name of the csv file. This is input by the user in GIS.
+
+    Returns:
+    --------
+    grouped: pandas dataframe
+        Same as grouped_statistics.
+
+    raw_csv_name: string
+        The name of the csv file created.
+    """
+    grouped = grouped_statistics(results, by, cell_size)
+    raw_csv_name = f"{feature_class_name}_grouped_statistics.csv"
+    grouped.to_csv(raw_csv_name, index = False)
+    return grouped, raw_csv_name
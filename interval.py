@@ -0,0 +1,175 @@
+"""Array-backed interval type for the bounds carried through the calculations.
+
+The CWI values are only known to within error_bounds, so every quantity in
+the Transmissivity calculation has a lower bound, a nominal value and an
+upper bound. An Interval holds those three as float64 columns with one entry
+per well. The arithmetic operators propagate the bounds, so a bound
+calculation is written once as a NumPy expression instead of three times by
+hand.
+
+Classes
+-------
+Interval: Lower, nominal and upper columns with interval arithmetic.
+
+Functions
+---------
+increasing: Applies a function that increases in every argument.
+
+decreasing: Applies a function that decreases in every argument.
+
+monotone: Applies a function that increases in some arguments and decreases
+    in the others.
+
+Notes
+-----
+    The operators follow the usual interval rules, and the nominal column is
+    always the operation applied to the nominal columns:
+    a + b = [a.lower + b.lower, a + b, a.upper + b.upper]
+    a - b = [a.lower - b.upper, a - b, a.upper - b.lower]
+    a * b, a / b = the smallest and largest of the four bound combinations
+    Plain numbers and arrays act as intervals of zero width. The division
+    rule assumes the divisor does not contain zero.
+
+    increasing, decreasing and monotone evaluate a function at the corners
+    given by its monotonicity and do not sort the results. When the function
+    is not actually monotone over the whole interval, the returned lower
+    bound can exceed the upper bound.
+
+-------------------------------------------------------------------------------
+"""
+import numpy as np
+
+class Interval:
+    """Lower, nominal and upper columns with interval arithmetic.
+
+    Parameters
+    ----------
+    lower, nominal, upper: ndarray[float] or float
+        The bounds and the nominal value. They are broadcast to one shape.
+    """
+
+    __slots__ = ('lower', 'nominal', 'upper')
+
+    def __init__(self, lower, nominal, upper):
+        self.lower, self.nominal, self.upper = np.broadcast_arrays(
+            np.asarray(lower, dtype=np.float64),
+            np.asarray(nominal, dtype=np.float64),
+            np.asarray(upper, dtype=np.float64))
+
+    @classmethod
+    def around(cls, nominal, half_width):
+        """Returns [nominal - half_width, nominal, nominal + half_width]."""
+        nominal = np.asarray(nominal, dtype=np.float64)
+        return cls(nominal - half_width, nominal, nominal + half_width)
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Builds an Interval from an (n, 3) array of [lower, nominal, upper]."""
+        columns = np.asarray(columns, dtype=np.float64).reshape(-1, 3)
+        return cls(columns[:, 0], columns[:, 1], columns[:, 2])
+
+    def columns(self):
+        """Returns the (..., 3) array of [lower, nominal, upper]."""
+        return np.stack((self.lower, self.nominal, self.upper), axis=-1)
+
+    def __len__(self):
+        return len(self.nominal)
+
+    def __getitem__(self, key):
+        return Interval(self.lower[key], self.nominal[key], self.upper[key])
+
+    def __repr__(self):
+        return f"Interval(lower={self.lower}, nominal={self.nominal}, upper={self.upper})"
+
+    @staticmethod
+    def _bounds(other):
+        if isinstance(other, Interval):
+            return other.lower, other.nominal, other.upper
+        other = np.asarray(other, dtype=np.float64)
+        return other, other, other
+
+    def __add__(self, other):
+        lower, nominal, upper = self._bounds(other)
+        return Interval(self.lower + lower, self.nominal + nominal,
+                        self.upper + upper)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        lower, nominal, upper = self._bounds(other)
+        return Interval(self.lower - upper, self.nominal - nominal,
+                        self.upper - lower)
+
+    def __rsub__(self, other):
+        return Interval(*self._bounds(other)) - self
+
+    def __neg__(self):
+        return Interval(-self.upper, -self.nominal, -self.lower)
+
+    def __mul__(self, other):
+        lower, nominal, upper = self._bounds(other)
+        products = (self.lower*lower, self.lower*upper,
+                    self.upper*lower, self.upper*upper)
+        return Interval(np.minimum.reduce(products), self.nominal*nominal,
+                        np.maximum.reduce(products))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        lower, nominal, upper = self._bounds(other)
+        quotients = (self.lower/lower, self.lower/upper,
+                     self.upper/lower, self.upper/upper)
+        return Interval(np.minimum.reduce(quotients), self.nominal/nominal,
+                        np.maximum.reduce(quotients))
+
+    def __rtruediv__(self, other):
+        return Interval(*self._bounds(other)) / self
+
+
+def monotone(function, intervals, signs):
+    """Applies a function that increases in some arguments and decreases in
+    the others.
+
+    Parameters
+    ----------
+    function: callable
+        Takes one array per interval and returns an array.
+
+    intervals: list[Interval]
+        The arguments of function.
+
+    signs: list[int]
+        +1 for every argument function increases in and -1 for every
+        argument it decreases in.
+
+    Returns
+    -------
+    result: Interval
+        function evaluated at the lowest corner, the nominal values and the
+        highest corner.
+    """
+    lower = [i.lower if sign > 0 else i.upper for i, sign in zip(intervals, signs)]
+    upper = [i.upper if sign > 0 else i.lower for i, sign in zip(intervals, signs)]
+    return Interval(function(*lower),
+                    function(*[i.nominal for i in intervals]),
+                    function(*upper))
+
+def increasing(function, *intervals):
+    """Applies a function that increases in every argument.
+
+    Returns
+    -------
+    result: Interval
+        [function(lowers), function(nominals), function(uppers)].
+    """
+    return monotone(function, intervals, [1]*len(intervals))
+
+def decreasing(function, *intervals):
+    """Applies a function that decreases in every argument.
+
+    Returns
+    -------
+    result: Interval
+        [function(uppers), function(nominals), function(lowers)].
+    """
+    return monotone(function, intervals, [-1]*len(intervals))
@@ -0,0 +1,409 @@
+"""Fits variogram models and estimates log-transmissivity at unsampled
+locations with ordinary kriging.
+
+variogram.compute_variogram gives the experimental variogram of the point
+values. The functions below fit a model to it and use the model to krige
+values (usually log10 T) onto arbitrary points or a grid. Every estimate
+uses a moving neighborhood of the nearest samples found with a cKDTree, and
+the small kriging systems are solved in batches with np.linalg.solve.
+
+Functions
+---------
+spherical, exponential, gaussian: Variogram models.
+
+fit_variogram: Fits a variogram model to the output of compute_variogram.
+
+ordinary_kriging: Kriges values onto arbitrary points.
+
+krige_log_transmissivity: Kriges log10 Transmissivity onto arbitrary points.
+
+grid_points: Returns the cell centers of a regular grid.
+
+cross_validate: Leave-one-out cross-validation of ordinary kriging.
+
+cross_validate_log_transmissivity: Leave-one-out cross-validation of kriged
+    log10 Transmissivity.
+
+Notes
+-----
+    Every model takes the separation distance h and the parameters
+    (nugget, sill, range), where sill is the partial sill (the total sill
+    is nugget + sill) and range is the practical range. gamma(0) = 0.
+
+    Wells often share the same coordinates. Two different samples at the
+    same location use the limiting value gamma(0+) = nugget. With a small
+    nugget their kriging system is close to singular, so neighborhoods that
+    contain coincident samples (and any batch np.linalg.solve rejects) are
+    solved with a pseudo-inverse, which shares the weight between them.
+
+-------------------------------------------------------------------------------
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy import spatial
+from scipy.optimize import curve_fit
+
+def spherical(h, nugget, sill, vrange):
+    """Spherical variogram model."""
+    h = np.asarray(h, dtype=float)
+    r = np.minimum(h/vrange, 1)
+    return np.where(h > 0, nugget + sill*(1.5*r - 0.5*r**3), 0.0)
+
+def exponential(h, nugget, sill, vrange):
+    """Exponential variogram model (practical range)."""
+    h = np.asarray(h, dtype=float)
+    return np.where(h > 0, nugget + sill*(1 - np.exp(-3*h/vrange)), 0.0)
+
+def gaussian(h, nugget, sill, vrange):
+    """Gaussian variogram model (practical range)."""
+    h = np.asarray(h, dtype=float)
+    return np.where(h > 0, nugget + sill*(1 - np.exp(-3*(h/vrange)**2)), 0.0)
+
+VARIOGRAM_MODELS = {
+    'spherical': spherical,
+    'exponential': exponential,
+    'gaussian': gaussian
+    }
+
+BATCH_SIZE = 2048
+
+def fit_variogram(separ, gamma, count, model='spherical'):
+    """Fits a variogram model to an experimental variogram.
+
+    Parameters
+    ----------
+    separ, gamma, count: ndarray, shape=(nh,)
+        The output of compute_variogram. Bins with nan values are ignored.
+
+    model: str
+        'spherical', 'exponential' or 'gaussian'.
+
+    Returns
+    -------
+    params: tuple
+        The fitted (nugget, sill, range). The fit is weighted by the number
+        of pairs in each bin and every parameter is kept non-negative. The
+        range is capped at ten times the largest separation, beyond which the
+        models cannot be told apart from a linear variogram.
+    """
+    separ = np.asarray(separ, dtype=float)
+    gamma = np.asarray(gamma, dtype=float)
+    count = np.asarray(count, dtype=float)
+    valid = np.isfinite(separ) & np.isfinite(gamma) & (count > 0)
+    if valid.sum() < 3:
+        raise ValueError("At least three valid variogram bins are needed.")
+    separ, gamma, count = separ[valid], gamma[valid], count[valid]
+
+    function = VARIOGRAM_MODELS[model]
+    p0 = [0.1*gamma.max(), 0.9*gamma.max(), 0.5*separ.max()]
+    bounds = ([0, 0, 1e-9*separ.max()], [np.inf, np.inf, 10*separ.max()])
+    params, _ = curve_fit(function, separ, gamma, p0=p0, bounds=bounds,
+                          sigma=1/np.sqrt(count))
+    return tuple(params)
+
+def _solve_batch(xy, z, targets, neighbors, valid, function, params):
+    """Solves the ordinary kriging systems of a batch of targets.
+
+    Parameters
+    ----------
+    xy: ndarray, shape=(n, 2)
+        Sample coordinates.
+
+    z: ndarray, shape=(n,)
+        Sample values.
+
+    targets: ndarray, shape=(m, 2)
+        Coordinates of the estimates.
+
+    neighbors: ndarray[int], shape=(m, k)
+        Indices of the samples used for each target.
+
+    valid: ndarray[bool], shape=(m, k)
+        False for padding entries of neighbors (fewer than k samples found).
+
+    function, params:
+        The variogram model and its (nugget, sill, range).
+
+    Returns
+    -------
+    estimate, variance: ndarray, shape=(m,)
+        The kriging estimates and estimation variances. Targets without any
+        samples in their neighborhood are nan.
+    """
+    m, k = neighbors.shape
+    nugget = params[0]
+    points = xy[neighbors]
+
+    #sample to sample variogram, gamma(0+) for distinct coincident samples
+    distance = np.linalg.norm(points[:, :, None, :] - points[:, None, :, :],
+                              axis=-1)
+    G = function(distance, *params)
+    G[(distance == 0)] = nugget
+    diagonal = np.arange(k)
+    G[:, diagonal, diagonal] = 0
+    coincident = (distance == 0) & valid[:, :, None] & valid[:, None, :]
+    coincident[:, diagonal, diagonal] = False
+    coincident = coincident.any(axis=(1, 2))
+
+    A = np.zeros((m, k + 1, k + 1))
+    A[:, :k, :k] = G
+    A[:, :k, k] = valid
+    A[:, k, :k] = valid
+    b = np.zeros((m, k + 1))
+    b[:, :k] = function(np.linalg.norm(points - targets[:, None, :], axis=-1),
+                        *params)
+    b[:, k] = 1
+
+    #padding entries get zero weight: identity row/column, zero right side
+    pad = ~valid
+    A[:, :k, :k][pad[:, :, None] | pad[:, None, :]] = 0
+    A[:, diagonal, diagonal] += pad
+    b[:, :k][pad] = 0
+    empty = ~valid.any(axis=1)
+    A[empty, k, k] = 1
+    b[empty, k] = 0
+
+    #systems with coincident samples are (nearly) singular when the nugget is
+    #small, so they get the minimum norm solution instead
+    solution = np.empty_like(b)
+    regular = ~coincident
+    try:
+        solution[regular] = np.linalg.solve(A[regular],
+                                            b[regular][:, :, None])[:, :, 0]
+    except np.linalg.LinAlgError:
+        coincident = np.ones(m, dtype=bool)
+    solution[coincident] = np.einsum('mij,mj->mi', np.linalg.pinv(
+        A[coincident], rcond=1e-10), b[coincident])
+    weights = solution[:, :k]
+    estimate = np.einsum('mk,mk->m', weights, z[neighbors])
+    variance = np.einsum('mk,mk->m', weights, b[:, :k]) + solution[:, k]
+    estimate[empty] = np.nan
+    variance[empty] = np.nan
+    return estimate, variance
+
+def ordinary_kriging(x, y, z, xi, yi, model, params, k=16, radius=np.inf,
+                     batch_size=BATCH_SIZE):
+    """Estimates values at arbitrary points with ordinary kriging.
+
+    Parameters
+    ----------
+    x, y, z: ndarray, shape=(n,)
+        Sample coordinates (UTM meters) and values.
+
+    xi, yi: ndarray, shape=(m,)
+        Coordinates of the estimates.
+
+    model: str
+        'spherical', 'exponential' or 'gaussian'.
+
+    params: tuple
+        The (nugget, sill, range) of the model, e.g. from fit_variogram.
+
+    k: int
+        The largest number of samples in a neighborhood.
+
+    radius: float
+        Only samples within this distance of a point are used.
+
+    batch_size: int
+        Number of points solved together. This bounds the memory used by the
+        batched kriging systems.
+
+    Returns
+    -------
+    estimate, variance: ndarray, shape=(m,)
+        The kriging estimates and the kriging (estimation) variances. Points
+        with no samples within radius are nan.
+    """
+    function = VARIOGRAM_MODELS[model]
+    xy = np.stack((np.asarray(x, dtype=float), np.asarray(y, dtype=float)), 1)
+    z = np.asarray(z, dtype=float)
+    targets = np.stack((np.ravel(xi).astype(float), np.ravel(yi).astype(float)), 1)
+    k = min(k, len(z))
+    tree = spatial.cKDTree(xy)
+
+    estimate = np.full(len(targets), np.nan)
+    variance = np.full(len(targets), np.nan)
+    for start in range(0, len(targets), batch_size):
+        stop = min(start + batch_size, len(targets))
+        distance, neighbors = tree.query(targets[start:stop], k=k,
+                                         distance_upper_bound=radius)
+        distance = distance.reshape(stop - start, k)
+        neighbors = neighbors.reshape(stop - start, k)
+        valid = np.isfinite(distance)
+        neighbors = np.where(valid, neighbors, 0)
+        estimate[start:stop], variance[start:stop] = _solve_batch(
+            xy, z, targets[start:stop], neighbors, valid, function, params)
+    return estimate, variance
+
+def krige_log_transmissivity(x, y, transmissivity, xi, yi, model, params,
+                             k=16, radius=np.inf):
+    """Kriges log10 Transmissivity onto arbitrary points.
+
+    Parameters
+    ----------
+    x, y: ndarray, shape=(n,)
+        UTM coordinates of the wells.
+
+    transmissivity: ndarray, shape=(n,)
+        Transmissivity (ft^2/day) of each well. Wells with non-positive or
+        nan values are ignored.
+
+    xi, yi, model, params, k, radius:
+        Same as ordinary_kriging. params must be fitted to log10 T.
+
+    Returns
+    -------
+    log_T, variance: ndarray, shape=(m,)
+        The kriged log10 Transmissivity and its kriging variance.
+    """
+    transmissivity = np.asarray(transmissivity, dtype=float)
+    keep = np.isfinite(transmissivity) & (transmissivity > 0)
+    return ordinary_kriging(np.asarray(x)[keep], np.asarray(y)[keep],
+                            np.log10(transmissivity[keep]), xi, yi, model,
+                            params, k, radius)
+
+def grid_points(xmin, ymin, xmax, ymax, cell_size):
+    """Returns the cell centers of a regular grid.
+
+    Parameters
+    ----------
+    xmin, ymin, xmax, ymax: float
+        Extent of the grid (UTM meters). As in raster.idw_raster the grid
+        is anchored at (xmin, ymax) and a partial column on the east or
+        partial row on the south is dropped.
+
+    cell_size: float
+        Width and height of the cells.
+
+    Returns
+    -------
+    xi, yi: ndarray, shape=(nrows, ncols)
+        Cell center coordinates. Row 0 is the northern edge.
+    """
+    ncols = int(np.floor((xmax - xmin)/cell_size))
+    nrows = int(np.floor((ymax - ymin)/cell_size))
+    columns = xmin + cell_size*(np.arange(ncols) + 0.5)
+    rows = ymax - cell_size*(np.arange(nrows) + 0.5)
+    return np.meshgrid(columns, rows)
+
+def _cross_validation_block(task):
+    """Solves the leave-one-out systems of one block of wells in a worker."""
+    xy, z, targets, neighbors, valid, model, params = task
+    return _solve_batch(xy, z, targets, neighbors, valid,
+                        VARIOGRAM_MODELS[model], params)
+
+def _cross_validation_tasks(xy, z, model, params, k, radius, batch_size):
+    """Yields the leave-one-out kriging systems of every block of wells.
+
+    Each task only carries the samples its block uses, with the neighbor
+    indices renumbered to match.
+    """
+    tree = spatial.cKDTree(xy)
+    k = min(k + 1, len(z)) #one extra neighbor, the well itself is dropped
+    for start in range(0, len(z), batch_size):
+        stop = min(start + batch_size, len(z))
+        distance, neighbors = tree.query(xy[start:stop], k=k,
+                                         distance_upper_bound=radius)
+        distance = distance.reshape(stop - start, k)
+        neighbors = neighbors.reshape(stop - start, k)
+        valid = np.isfinite(distance) & \
+            (neighbors != np.arange(start, stop)[:, None])
+        neighbors = np.where(valid, neighbors, 0)
+        used, local = np.unique(neighbors, return_inverse=True)
+        yield (xy[used], z[used], xy[start:stop], local.reshape(neighbors.shape),
+               valid, model, params)
+
+def cross_validate(x, y, z, model, params, k=16, radius=np.inf,
+                   processes=None, batch_size=BATCH_SIZE):
+    """Leave-one-out cross-validation of ordinary kriging.
+
+    Every sample is estimated from its neighborhood with the sample itself
+    removed. Other samples at the same location are kept.
+
+    Parameters
+    ----------
+    x, y, z: ndarray, shape=(n,)
+        Sample coordinates (UTM meters) and values.
+
+    model, params, k, radius, batch_size:
+        Same as ordinary_kriging.
+
+    processes: int
+        Number of worker processes. The default is os.cpu_count(). With 1 the
+        blocks are solved in this process.
+
+    Returns
+    -------
+    estimate, variance: ndarray, shape=(n,)
+        The leave-one-out estimate and kriging variance of every sample.
+        Samples without any other sample within radius are nan.
+
+    statistics: dict
+        Summary of the samples with an estimate:
+        'n' = number of samples estimated
+        'ME' = mean error (estimate - z)
+        'RMSE' = root mean square error
+        'MSE_standardized' = mean standardized error, (estimate - z)/sigma
+        'RMSE_standardized' = root mean square standardized error. Close to
+            1 when the kriging variance describes the errors well.
+    """
+    xy = np.stack((np.asarray(x, dtype=float), np.asarray(y, dtype=float)), 1)
+    z = np.asarray(z, dtype=float)
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    tasks = _cross_validation_tasks(xy, z, model, params, k, radius, batch_size)
+    if processes == 1:
+        blocks = list(map(_cross_validation_block, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            blocks = list(executor.map(_cross_validation_block, tasks))
+    estimate = np.concatenate([i[0] for i in blocks] + [np.empty(0)])
+    variance = np.concatenate([i[1] for i in blocks] + [np.empty(0)])
+
+    error = estimate - z
+    done = np.isfinite(error)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        standardized = error[done]/np.sqrt(variance[done])
+    standardized = standardized[np.isfinite(standardized)]
+    statistics = {
+        'n': int(done.sum()),
+        'ME': np.mean(error[done]) if done.any() else np.nan,
+        'RMSE': np.sqrt(np.mean(error[done]**2)) if done.any() else np.nan,
+        'MSE_standardized': np.mean(standardized) if len(standardized) else np.nan,
+        'RMSE_standardized': np.sqrt(np.mean(standardized**2))
+                             if len(standardized) else np.nan
+        }
+    return estimate, variance, statistics
+
+def cross_validate_log_transmissivity(x, y, transmissivity, model, params,
+                                      k=16, radius=np.inf, processes=None):
+    """Leave-one-out cross-validation of kriged log10 Transmissivity.
+
+    Parameters
+    ----------
+    x, y: ndarray, shape=(n,)
+        UTM coordinates of the wells.
+
+    transmissivity: ndarray, shape=(n,)
+        Transmissivity (ft^2/day) of each well. Wells with non-positive or
+        nan values are left out of the cross-validation and get nan.
+
+    model, params, k, radius, processes:
+        Same as cross_validate. params must be fitted to log10 T.
+
+    Returns
+    -------
+    log_T, variance, statistics:
+        Same as cross_validate, in log10 units.
+    """
+    transmissivity = np.asarray(transmissivity, dtype=float)
+    keep = np.isfinite(transmissivity) & (transmissivity > 0)
+    estimate = np.full(len(transmissivity), np.nan)
+    variance = np.full(len(transmissivity), np.nan)
+    estimate[keep], variance[keep], statistics = cross_validate(
+        np.asarray(x)[keep], np.asarray(y)[keep],
+        np.log10(transmissivity[keep]), model, params, k, radius, processes)
+    return estimate, variance, statistics
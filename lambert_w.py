@@ -0,0 +1,105 @@
+"""Real-valued Lambert W function on the -1 branch.
+
+The Bradbury & Rothschild Method only ever needs W on the lower real branch
+(W_-1) for arguments in [-1/e, 0). scipy.special.lambertw solves the general
+complex problem and returns complex128, which then leaks into every
+downstream calculation. The functions in this file solve the real problem
+directly on float64 arrays.
+
+Functions
+---------
+lambertw_m1: Evaluates W_-1(x) for an array of arguments and flags the
+    entries that fall outside of the real domain.
+
+Notes
+-----
+    The solver works in three steps:
+    1. Near the branch point (x = -1/e) the series expansion in
+       p = -sqrt(2(1 + e*x)) is used directly.
+    2. Everywhere else an initial guess is taken from the series expansion
+       (x < -0.25) or from the asymptotic expansion about x = 0.
+    3. The initial guess is refined with Halley's method applied to
+       g(w) = w + ln(-w) - ln(-x), which avoids overflow/underflow in exp(w).
+
+Citations
+---------
+    Corless, R. M., Gonnet, G. H., Hare, D. E. G., Jeffrey, D. J. & Knuth, D. E.
+    On the Lambert W Function,
+    Advances in Computational Mathematics, 1996, 5, 329-359
+
+-------------------------------------------------------------------------------
+"""
+import numpy as np
+
+#e split into a high and low part so 1 + e*x keeps its precision near -1/e
+E_HI = 2.718281828459045
+E_LO = 1.4456468917292502e-16
+BRANCH_POINT = -1/np.e
+SERIES_CUTOFF = 1e-3 #|p| below this value uses the series without refinement
+MAX_ITERATIONS = 8
+BLOCK_SIZE = 65536
+
+def _branch_series(p):
+    """Evaluates the series expansion of W_-1 about the branch point."""
+    #Horner form of -1 + p - p^2/3 + 11/72 p^3 - 43/540 p^4 + ...
+    return -1 + p*(1 + p*(-1/3 + p*(11/72 + p*(-43/540 + p*(769/17280
+                                                             - 221/8505*p)))))
+
+def _lambertw_m1_block(xi):
+    """Solves W_-1 for a block of arguments that are all inside [-1/e, 0)."""
+    #1 + e*x evaluated in two parts to limit cancellation at the branch point
+    eta = np.maximum((E_HI*xi + 1) + E_LO*xi, 0)
+    p = -np.sqrt(2*eta)
+    guess = np.empty_like(xi)
+    far = xi >= -0.25
+    guess[~far] = _branch_series(p[~far])
+    L1 = np.log(-xi[far])
+    L2 = np.log(-L1)
+    guess[far] = L1 - L2 + L2/L1 + L2*(L2 - 2)/(2*L1**2)
+
+    #Halley refinement of g(w) = w + ln(-w) - ln(-x)
+    refine = np.abs(p) >= SERIES_CUTOFF
+    wr = guess[refine]
+    log_x = np.log(-xi[refine])
+    tolerance = 8*np.finfo(float).eps*np.maximum(np.abs(log_x), 1)
+    for _ in range(MAX_ITERATIONS):
+        g = wr + np.log(-wr) - log_x
+        if not np.any(np.abs(g) > tolerance):
+            break
+        #Halley step 2*g*g'/(2*g'^2 - g*g'') with g' = (w+1)/w, g'' = -1/w^2
+        wp1 = wr + 1
+        wr = np.minimum(wr - 2*g*wr*wp1/(2*wp1*wp1 + g), -1)
+    guess[refine] = wr
+    return guess
+
+def lambertw_m1(x):
+    """Evaluates the -1 branch of the Lambert W function for real arguments.
+
+    Parameters
+    ----------
+    x: ndarray[float]
+        Arguments of the Lambert W function. The real -1 branch is only
+        defined for -1/e <= x < 0.
+
+    Returns
+    -------
+    w: ndarray[float]
+        W_-1(x) for every entry in x. Entries outside of the domain are NaN,
+        except x = 0 which returns the limiting value of -inf.
+
+    out_of_domain: ndarray[bool]
+        True for every entry of x that is outside of [-1/e, 0).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    w = np.full(x.shape, np.nan)
+    out_of_domain = ~((x >= BRANCH_POINT) & (x < 0))
+    w[x == 0] = -np.inf
+
+    inside = np.flatnonzero(~out_of_domain)
+    flat_x = x.ravel()
+    flat_w = w.ravel()
+    #blocks keep the temporaries of the refinement loop in cache
+    for start in range(0, inside.size, BLOCK_SIZE):
+        index = inside[start:start + BLOCK_SIZE]
+        flat_w[index] = _lambertw_m1_block(flat_x[index])
+    return flat_w.reshape(x.shape), out_of_domain
@@ -0,0 +1,277 @@
+"""Batch-by-batch statistics of the calculated Transmissivity and Hydraulic
+Conductivity.
+
+calculated_data_statistics_csv used to call DataFrame.describe on every
+result at once. StatisticsAccumulator keeps the same statistics as running
+sums that are updated one batch at a time, and two accumulators (from
+separate shards or processes) can be merged.
+
+Classes
+-------
+QuantileSketch: Approximate quantiles with a bounded relative error.
+
+StatisticsAccumulator: Count, mean, variance, min, max, log10 moments and
+    quantiles of several columns.
+
+Notes
+-----
+    The moments are combined with the pairwise update of Chan, Golub &
+    LeVeque, so merging gives the same count, mean and variance as one pass
+    over all of the values (to floating-point rounding). min and max merge
+    exactly.
+
+    Quantiles are exact (the same linear interpolation as DataFrame.describe)
+    while an accumulator has seen at most exact_limit values per column.
+    Beyond that they come from a QuantileSketch, a logarithmic histogram in
+    the style of DDSketch: every returned quantile is within a relative
+    error of relative_accuracy of the value of rank round(q*(count - 1)),
+    instead of interpolating between the two neighbouring values.
+    Sketches merge without any loss.
+
+    NaN values are ignored, like describe does.
+
+Citations
+---------
+    Chan, T. F., Golub, G. H. & LeVeque, R. J.
+    Updating Formulae and a Pairwise Algorithm for Computing Sample
+    Variances, Stanford CS Technical Report STAN-CS-79-773, 1979
+
+    Masson, C., Rim, J. E. & Lee, H. K.
+    DDSketch: A Fast and Fully-Mergeable Quantile Sketch with
+    Relative-Error Guarantees, Proceedings of the VLDB Endowment, 2019,
+    12, 2195-2205
+
+-------------------------------------------------------------------------------
+"""
+import numpy as np
+import pandas as pd
+
+EXACT_LIMIT = 100000 #values per column kept for exact quantiles
+STATISTICS_INDEX = ['Count', 'Mean', 'Standard Deviation', 'Minimum',
+                    '25th Percentile', 'Median', '75th Percentile', 'Maximum',
+                    'Logrithmic Mean', 'Logrithmic Standard Deviation']
+
+class QuantileSketch:
+    """Approximate quantiles with a bounded relative error.
+
+    Parameters
+    ----------
+    relative_accuracy: float
+        The largest relative error of a returned quantile, e.g. 0.01.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy)/(1 - relative_accuracy)
+        self.count = 0
+        self.zeros = 0
+        #bucket keys and counts of the positive and (negated) negative values
+        self.positive = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+        self.negative = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+
+    @staticmethod
+    def _combine(store, keys, counts):
+        """Adds counts to the buckets of a store."""
+        keys = np.concatenate((store[0], keys))
+        counts = np.concatenate((store[1], counts))
+        keys, inverse = np.unique(keys, return_inverse=True)
+        return keys, np.bincount(inverse.ravel(), weights=counts,
+                                 minlength=len(keys)).astype(np.int64)
+
+    def _buckets(self, values):
+        keys = np.ceil(np.log(values)/np.log(self.gamma)).astype(np.int64)
+        keys, counts = np.unique(keys, return_counts=True)
+        return keys, counts.astype(np.int64)
+
+    def update(self, values):
+        """Adds an array of values. NaN values are ignored."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        self.count += len(values)
+        self.zeros += int(np.sum(values == 0))
+        if np.any(values > 0):
+            self.positive = self._combine(self.positive,
+                                          *self._buckets(values[values > 0]))
+        if np.any(values < 0):
+            self.negative = self._combine(self.negative,
+                                          *self._buckets(-values[values < 0]))
+
+    def merge(self, other):
+        """Adds every value seen by another sketch with the same accuracy."""
+        if other.gamma != self.gamma:
+            raise ValueError("Sketches with different accuracies cannot be merged.")
+        self.count += other.count
+        self.zeros += other.zeros
+        self.positive = self._combine(self.positive, *other.positive)
+        self.negative = self._combine(self.negative, *other.negative)
+
+    def quantile(self, q):
+        """Returns the approximate q quantiles (0 to 1) as an array."""
+        q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        if self.count == 0:
+            return np.full(len(q), np.nan)
+        #every bucket in ascending order of value
+        middle = lambda keys: 2*self.gamma**keys.astype(np.float64)/(self.gamma + 1)
+        values = np.concatenate((-middle(self.negative[0])[::-1], [0.0],
+                                 middle(self.positive[0])))
+        counts = np.concatenate((self.negative[1][::-1], [self.zeros],
+                                 self.positive[1]))
+        ranks = np.rint(q*(self.count - 1))
+        return values[np.searchsorted(np.cumsum(counts), ranks, side='right')]
+
+
+class StatisticsAccumulator:
+    """Count, mean, variance, min, max, log10 moments and quantiles of
+    several columns, updated one batch at a time.
+
+    Parameters
+    ----------
+    columns: list[str]
+        Names of the columns, e.g. ['T_min', 'T_raw', 'T_max', 'K_min',
+        'K_raw', 'K_max'].
+
+    relative_accuracy: float
+        Relative accuracy of the quantile sketches.
+
+    exact_limit: int
+        Quantiles stay exact while a column has at most this many values.
+    """
+
+    def __init__(self, columns, relative_accuracy=0.01, exact_limit=EXACT_LIMIT):
+        self.columns = list(columns)
+        ncol = len(self.columns)
+        self.exact_limit = exact_limit
+        self.count = np.zeros(ncol, dtype=np.int64)
+        self.mean = np.zeros(ncol)
+        self.m2 = np.zeros(ncol)
+        self.minimum = np.full(ncol, np.nan)
+        self.maximum = np.full(ncol, np.nan)
+        self.log_count = np.zeros(ncol, dtype=np.int64)
+        self.log_mean_sum = np.zeros(ncol)
+        self.log_m2 = np.zeros(ncol)
+        self.sketches = [QuantileSketch(relative_accuracy) for i in self.columns]
+        self.values = [[] for i in self.columns] #kept for exact quantiles
+
+    @staticmethod
+    def _chan(count, mean, m2, count_b, mean_b, m2_b):
+        """Merges (count, mean, M2) moments."""
+        total = count + count_b
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = mean_b - mean
+            merged_mean = np.where(total > 0, mean + delta*count_b/total, 0.0)
+            merged_m2 = np.where(total > 0,
+                                 m2 + m2_b + delta**2*count*count_b/total, 0.0)
+        return total, merged_mean, merged_m2
+
+    def update(self, values):
+        """Adds a batch of rows.
+
+        Parameters
+        ----------
+        values: ndarray[float], shape=(n, len(columns))
+            One row per well, e.g. np.column_stack((T, K)).
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(-1, len(self.columns))
+        valid = ~np.isnan(values)
+        count = valid.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, np.nansum(values, axis=0)/count, 0.0)
+            m2 = np.nansum((values - mean)**2, axis=0)
+            positive = valid & (values > 0)
+            logs = np.where(positive, np.log10(np.where(positive, values, 1)), np.nan)
+        log_count = positive.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            log_mean = np.where(log_count > 0, np.nansum(logs, axis=0)/log_count, 0.0)
+        log_m2 = np.nansum((logs - log_mean)**2, axis=0)
+
+        self.count, self.mean, self.m2 = self._chan(self.count, self.mean,
+                                                    self.m2, count, mean, m2)
+        self.log_count, self.log_mean_sum, self.log_m2 = self._chan(
+            self.log_count, self.log_mean_sum, self.log_m2, log_count,
+            log_mean, log_m2)
+        if valid.any():
+            self.minimum = np.fmin(self.minimum, np.nanmin(
+                np.where(valid, values, np.inf), axis=0))
+            self.maximum = np.fmax(self.maximum, np.nanmax(
+                np.where(valid, values, -np.inf), axis=0))
+            self.minimum[self.count == 0] = np.nan
+            self.maximum[self.count == 0] = np.nan
+        for column, sketch in enumerate(self.sketches):
+            column_values = values[valid[:, column], column]
+            sketch.update(column_values)
+            self._keep(column, [column_values])
+
+    def _keep(self, column, arrays):
+        """Keeps values for exact quantiles until exact_limit is passed."""
+        kept = self.values[column]
+        if kept is None:
+            return
+        if self.count[column] > self.exact_limit:
+            self.values[column] = None
+        else:
+            kept.extend(arrays)
+
+    def merge(self, other):
+        """Adds every value seen by another accumulator with the same columns."""
+        if other.columns != self.columns:
+            raise ValueError("Accumulators with different columns cannot be merged.")
+        self.count, self.mean, self.m2 = self._chan(
+            self.count, self.mean, self.m2, other.count, other.mean, other.m2)
+        self.log_count, self.log_mean_sum, self.log_m2 = self._chan(
+            self.log_count, self.log_mean_sum, self.log_m2, other.log_count,
+            other.log_mean_sum, other.log_m2)
+        self.minimum = np.fmin(self.minimum, other.minimum)
+        self.maximum = np.fmax(self.maximum, other.maximum)
+        for column, sketch in enumerate(self.sketches):
+            sketch.merge(other.sketches[column])
+            if other.values[column] is None:
+                self.values[column] = None
+            else:
+                self._keep(column, other.values[column])
+
+    def std(self):
+        """Sample standard deviation (ddof=1) of every column."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 1, np.sqrt(self.m2/(self.count - 1)),
+                            np.nan)
+
+    def log_mean(self):
+        """Mean of log10 of the positive values of every column."""
+        return np.where(self.log_count > 0, self.log_mean_sum, np.nan)
+
+    def log_std(self):
+        """Sample standard deviation of log10 of the positive values."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.log_count > 1,
+                            np.sqrt(self.log_m2/(self.log_count - 1)), np.nan)
+
+    def quantile(self, q):
+        """Returns the q quantiles of every column, shape=(len(q), ncol)."""
+        q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        result = np.full((len(q), len(self.columns)), np.nan)
+        for column, sketch in enumerate(self.sketches):
+            kept = self.values[column]
+            if kept is None:
+                result[:, column] = sketch.quantile(q)
+            elif self.count[column]:
+                result[:, column] = np.quantile(np.concatenate(kept), q)
+        return result
+
+    def summary(self):
+        """Returns the statistics table written by calculated_data_statistics_csv.
+
+        Returns
+        -------
+        useful_values: pandas dataframe
+            One column per accumulator column and the rows Count, Mean,
+            Standard Deviation, Minimum, 25th Percentile, Median, 75th
+            Percentile, Maximum, Logrithmic Mean (log10 of the mean) and
+            Logrithmic Standard Deviation (log10 of the standard deviation).
+        """
+        mean = np.where(self.count > 0, self.mean, np.nan)
+        std = self.std()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rows = [self.count.astype(np.float64), mean, std, self.minimum,
+                    *self.quantile([0.25, 0.5, 0.75]), self.maximum,
+                    np.log10(mean), np.log10(std)]
+        return pd.DataFrame(rows, index=STATISTICS_INDEX, columns=self.columns)
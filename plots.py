@@ -29,13 +29,14 @@ Pump_Durations_Plots:
     to my technical writeup.
     
 Author: Jonny Full
-Version: 8/6/2020
+Version: 10/17/2026
 """
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.colors import LogNorm
-import arcpy
 from data_location import CWIPL
+from table_reader import search_cursor
+from well_batch import as_well_batch
 from matplotlib.ticker import (MultipleLocator, FormatStrFormatter)
 from matplotlib.backends.backend_pdf import PdfPages
 
@@ -99,19 +100,9 @@ def plot_spacial_transmissivity(target_well, radius, confirmed_wells, transmissi
         target well. 
         Example: 10000 (meters)
         
-    confirmed_wells: list[[list1][list2][list3]]
-        This is a list of all pertinant information required to plot the wells
-        spacially and calculate Transmissivity.
-    
-        list1 = list[UTME (int), UTMN (int), AQUIFER (str), Screen Length (float), 
-                     Casing Radius (ft), Relate ID (str)
-        
-        list 2 = list[Pump Rate (float), Duration (float), Drawdown (float), 
-                     Relate ID (str)]
-        
-        list 3 = list[aquifer thickness (float),
-                      miniumum storage coefficent (float), maximum storage
-                      coefficent (float), and Well ID (int)]
+    confirmed_wells: WellBatch
+        This is a WellBatch (see well_batch) of all pertinant information
+        required to plot the wells spacially and calculate Transmissivity.
     
     transmissivity_calculated: list
         A list of Transmissivities that were calculated from confirmed_wells. 
@@ -132,8 +123,9 @@ def plot_spacial_transmissivity(target_well, radius, confirmed_wells, transmissi
     """
     plt.figure(3)
     distribute_t = []
-    x = [i[0][0] for i in confirmed_wells]
-    y = [i[0][1] for i in confirmed_wells]
+    batch = as_well_batch(confirmed_wells)
+    x = batch['UTME']
+    y = batch['UTMN']
     T = [i[0] for i in transmissivity_calculated]
     bounds = np.percentile(transmissivity_calculated, np.arange(0, 110, 10)) #calculates deciles
     #May not be necessary
@@ -173,19 +165,10 @@ def plot_spacial_conductivity(target_well, radius, confirmed_wells,\
         target well. 
         Example: 10000 (meters)
         
-    confirmed_wells: list[[list1][list2][list3]]
-        This is a list of all pertinant information required to plot the wells
-        spacially and calculate Transmissivity/Hydraulic Conductivity.
-    
-        list1 = list[UTME (int), UTMN (int), AQUIFER (str), Screen Length (float), 
-                     Casing Radius (ft), Relate ID (str)
-        
-        list 2 = list[Pump Rate (float), Duration (float), Drawdown (float), 
-                     Relate ID (str)]
-        
-        list 3 = list[aquifer thickness (float),
-                      miniumum storage coefficent (float), maximum storage
-                      coefficent (float), and Well ID (int)]
+    confirmed_wells: WellBatch
+        This is a WellBatch (see well_batch) of all pertinant information
+        required to plot the wells spacially and calculate
+        Transmissivity/Hydraulic Conductivity.
     
     conductivity_calculated: list
         A list of hydralic conductivities that were calculated from confirmed_wells. 
@@ -207,10 +190,12 @@ def plot_spacial_conductivity(target_well, radius, confirmed_wells,\
     
     plt.figure(4)
     distribute_K = []
-    x = [i[0][0] for i in confirmed_wells]
-    y = [i[0][1] for i in confirmed_wells]
+    batch = as_well_batch(confirmed_wells)
+    x = batch['UTME']
+    y = batch['UTMN']
     K = [i[0] for i in conductivity_calculated]
-    bounds = np.percentile(conductivity_calculated, np.arange(0, 110, 10)) #calculates deciles
+    bounds = np.percentile(np.asarray(conductivity_calculated)[:, :3],
+                           np.arange(0, 110, 10)) #calculates deciles
     for row in K:
         for decile, trans in enumerate(bounds):
             if trans > row:
@@ -246,19 +231,9 @@ def plot_spacial_thickness(target_well, radius, confirmed_wells, target_coords):
         target well. 
         Example: 10000 (meters)
         
-    confirmed_wells: list[[list1][list2][list3]]
-        This is a list of all pertinant information required to plot the wells
-        spacially and calculate Transmissivity.
-    
-        list 1 = list[UTME (int), UTMN (int), AQUIFER (str), Screen Length (float), 
-                     Casing Radius (ft), Relate ID (str)
-        
-        list 2 = list[Pump Rate (float), Duration (float), Drawdown (float), 
-                     Relate ID (str)]
-        
-        list 3 = list[aquifer thickness (float),
-                      miniumum storage coefficent (float), maximum storage
-                      coefficent (float), and Well ID (int)]
+    confirmed_wells: WellBatch
+        This is a WellBatch (see well_batch) of all pertinant information
+        required to plot the wells spacially and calculate Transmissivity.
     
     target_coords:list
         Contains the UTM coordinates of the original well input by the user.
@@ -274,9 +249,10 @@ def plot_spacial_thickness(target_well, radius, confirmed_wells, target_coords):
     can be identified by the purple X on the plot.
     """
     plt.figure(5)
-    x = [i[0][0] for i in confirmed_wells]
-    y = [i[0][1] for i in confirmed_wells]
-    thickness = [i[2][0] for i in confirmed_wells]
+    batch = as_well_batch(confirmed_wells)
+    x = batch['UTME']
+    y = batch['UTMN']
+    thickness = batch['B_MIN']
     plt.grid(True, zorder = 0)
     plt.scatter(x, y, c = thickness, s = 30, cmap='Greens',zorder = 3)
     cbar = plt.colorbar()
@@ -308,7 +284,7 @@ def Pump_Durations_Plots():
         "(PUMP_MEAS is not NULL) AND "
         "(PUMP_MEAS > 0)"
          )
-    with arcpy.da.SearchCursor(CWIPL, ['FLOW_RATE', 'DURATION', 'START_MEAS',\
+    with search_cursor(CWIPL, ['FLOW_RATE', 'DURATION', 'START_MEAS',\
                                        'PUMP_MEAS'], where_clause) as cursor:
         for row in cursor:
             down = row[3] - row[2]
@@ -0,0 +1,351 @@
+"""Writes the calculated results as GeoPackage or Shapefile point layers.
+
+Play.py keeps a commented-out arcpy.InsertCursor loop that inserts the wells
+one row at a time, and analyze_wells.py has XYTableToPoint commented out, so
+no spatial output is produced. The writers below build the point layers from
+a columnar results file (see columnar) without arcpy: the point geometries
+and attribute records of a whole row group are packed with NumPy and written
+in bulk.
+
+Functions
+---------
+write_geopackage: Writes a results file as a GeoPackage point layer.
+
+write_shapefile: Writes a results file as a Shapefile (.shp, .shx, .dbf,
+    .prj).
+
+write_point_layer: Writes a .gpkg or .shp point layer, chosen by the
+    extension.
+
+Notes
+-----
+    The points are the well locations (UTME, UTMN) in NAD83 / UTM zone 15N
+    (EPSG:26915). Every layer has the attributes WELLID, AQUIFER, UTME, UTMN,
+    T_MIN, T, T_MAX, K_MIN, K and K_MAX. nan values are written as nulls.
+
+    The GeoPackage is written with the sqlite3 module: the rows are inserted
+    with executemany in batches of BATCH_SIZE inside a single transaction. No
+    spatial index is created; ArcGIS and QGIS can add one.
+
+    The Shapefile is written with the headers first and patched at the end,
+    so the row groups are streamed. The dBase numbers are 24 characters wide
+    with 15 decimals, like GDAL writes them; values that do not fit, and
+    values below 0.001 that would lose significant digits, are written in
+    exponent notation.
+
+-------------------------------------------------------------------------------
+"""
+import datetime
+import os
+import sqlite3
+import numpy as np
+from columnar import RESULT_FIELDS, row_groups
+
+EPSG = 26915 #NAD83 / UTM zone 15N
+BATCH_SIZE = 50000
+POINT_FIELDS = ['WELLID', 'AQUIFER', 'UTME', 'UTMN'] + RESULT_FIELDS
+
+#OGC WKT for gpkg_spatial_ref_sys and ESRI WKT for the .prj file
+EPSG_26915_WKT = (
+    'PROJCS["NAD83 / UTM zone 15N",GEOGCS["NAD83",DATUM["North_American_Datum_1983",'
+    'SPHEROID["GRS 1980",6378137,298.257222101,AUTHORITY["EPSG","7019"]],'
+    'TOWGS84[0,0,0,0,0,0,0],AUTHORITY["EPSG","6269"]],PRIMEM["Greenwich",0,'
+    'AUTHORITY["EPSG","8901"]],UNIT["degree",0.0174532925199433,'
+    'AUTHORITY["EPSG","9122"]],AUTHORITY["EPSG","4269"]],'
+    'PROJECTION["Transverse_Mercator"],PARAMETER["latitude_of_origin",0],'
+    'PARAMETER["central_meridian",-93],PARAMETER["scale_factor",0.9996],'
+    'PARAMETER["false_easting",500000],PARAMETER["false_northing",0],'
+    'UNIT["metre",1,AUTHORITY["EPSG","9001"]],AXIS["Easting",EAST],'
+    'AXIS["Northing",NORTH],AUTHORITY["EPSG","26915"]]')
+EPSG_4326_WKT = (
+    'GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,298.257223563,'
+    'AUTHORITY["EPSG","7030"]],AUTHORITY["EPSG","6326"]],PRIMEM["Greenwich",0,'
+    'AUTHORITY["EPSG","8901"]],UNIT["degree",0.0174532925199433,'
+    'AUTHORITY["EPSG","9122"]],AUTHORITY["EPSG","4326"]]')
+ESRI_26915_WKT = (
+    'PROJCS["NAD_1983_UTM_Zone_15N",GEOGCS["GCS_North_American_1983",'
+    'DATUM["D_North_American_1983",SPHEROID["GRS_1980",6378137.0,298.257222101]],'
+    'PRIMEM["Greenwich",0.0],UNIT["Degree",0.0174532925199433]],'
+    'PROJECTION["Transverse_Mercator"],PARAMETER["False_Easting",500000.0],'
+    'PARAMETER["False_Northing",0.0],PARAMETER["Central_Meridian",-93.0],'
+    'PARAMETER["Scale_Factor",0.9996],PARAMETER["Latitude_Of_Origin",0.0],'
+    'UNIT["Meter",1.0]]')
+
+#GeoPackage geometry blob: header without envelope + little-endian WKB point
+GPKG_POINT_DTYPE = np.dtype([('magic', 'S2'), ('version', 'u1'),
+                             ('flags', 'u1'), ('srs_id', '<i4'),
+                             ('byte_order', 'u1'), ('wkb_type', '<u4'),
+                             ('x', '<f8'), ('y', '<f8')])
+SHP_RECORD_DTYPE = np.dtype([('number', '>i4'), ('length', '>i4'),
+                             ('shape_type', '<i4'), ('x', '<f8'), ('y', '<f8')])
+SHX_RECORD_DTYPE = np.dtype([('offset', '>i4'), ('length', '>i4')])
+
+#(name, dBase type, width, decimals) of every Shapefile attribute
+DBF_FIELDS = [('WELLID', b'N', 18, 0), ('AQUIFER', b'C', 4, 0)] + \
+             [(name, b'N', 24, 15) for name in ['UTME', 'UTMN'] + RESULT_FIELDS]
+
+def _groups(results):
+    """Returns the row groups of a results file name or iterable."""
+    if isinstance(results, str):
+        return row_groups(results, POINT_FIELDS)
+    return results
+
+def _gpkg_points(x, y):
+    """Packs GeoPackage point geometries, one bytes object per point."""
+    points = np.empty(len(x), dtype=GPKG_POINT_DTYPE)
+    points['magic'] = b'GP'
+    points['version'] = 0
+    points['flags'] = 1 #little-endian, no envelope
+    points['srs_id'] = EPSG
+    points['byte_order'] = 1
+    points['wkb_type'] = 1 #Point
+    points['x'] = x
+    points['y'] = y
+    blob = points.tobytes()
+    size = GPKG_POINT_DTYPE.itemsize
+    return [blob[i:i + size] for i in range(0, len(blob), size)]
+
+def write_geopackage(results, file_name, layer_name=None, batch_size=BATCH_SIZE):
+    """Writes a results file as a GeoPackage point layer.
+
+    Parameters
+    ----------
+    results: str or iterable of dict
+        Path of a file written by columnar.ResultWriter, or its row groups
+        (see columnar.row_groups).
+
+    file_name: str
+        Path of the .gpkg file. An existing file is replaced.
+
+    layer_name: str
+        Name of the feature table. The default is the file name without its
+        folder and extension.
+
+    batch_size: int
+        The number of rows passed to one executemany call.
+
+    Returns
+    -------
+    rows: int
+        The number of points written.
+    """
+    if layer_name is None:
+        layer_name = os.path.splitext(os.path.basename(file_name))[0]
+    if os.path.exists(file_name):
+        os.remove(file_name)
+    connection = sqlite3.connect(file_name)
+    rows = 0
+    extent = [np.inf, np.inf, -np.inf, -np.inf]
+    try:
+        connection.execute("PRAGMA application_id = 1196444487") #'GPKG'
+        connection.execute("PRAGMA user_version = 10300") #version 1.3
+        with connection:
+            connection.execute(
+                """CREATE TABLE gpkg_spatial_ref_sys (
+                srs_name TEXT NOT NULL, srs_id INTEGER PRIMARY KEY,
+                organization TEXT NOT NULL,
+                organization_coordsys_id INTEGER NOT NULL,
+                definition TEXT NOT NULL, description TEXT)""")
+            connection.executemany(
+                "INSERT INTO gpkg_spatial_ref_sys VALUES (?, ?, ?, ?, ?, ?)",
+                [('Undefined cartesian SRS', -1, 'NONE', -1, 'undefined', None),
+                 ('Undefined geographic SRS', 0, 'NONE', 0, 'undefined', None),
+                 ('WGS 84', 4326, 'EPSG', 4326, EPSG_4326_WKT, None),
+                 ('NAD83 / UTM zone 15N', EPSG, 'EPSG', EPSG, EPSG_26915_WKT,
+                  None)])
+            connection.execute(
+                """CREATE TABLE gpkg_contents (
+                table_name TEXT NOT NULL PRIMARY KEY, data_type TEXT NOT NULL,
+                identifier TEXT UNIQUE, description TEXT DEFAULT '',
+                last_change DATETIME NOT NULL DEFAULT
+                (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
+                min_x DOUBLE, min_y DOUBLE, max_x DOUBLE, max_y DOUBLE,
+                srs_id INTEGER,
+                CONSTRAINT fk_gc_r_srs_id FOREIGN KEY (srs_id)
+                REFERENCES gpkg_spatial_ref_sys(srs_id))""")
+            connection.execute(
+                """CREATE TABLE gpkg_geometry_columns (
+                table_name TEXT NOT NULL, column_name TEXT NOT NULL,
+                geometry_type_name TEXT NOT NULL, srs_id INTEGER NOT NULL,
+                z TINYINT NOT NULL, m TINYINT NOT NULL,
+                CONSTRAINT pk_geom_cols PRIMARY KEY (table_name, column_name),
+                CONSTRAINT fk_gc_tn FOREIGN KEY (table_name)
+                REFERENCES gpkg_contents(table_name),
+                CONSTRAINT fk_gc_srs FOREIGN KEY (srs_id)
+                REFERENCES gpkg_spatial_ref_sys (srs_id))""")
+            connection.execute(
+                f"""CREATE TABLE "{layer_name}" (
+                fid INTEGER PRIMARY KEY AUTOINCREMENT, geom POINT,
+                WELLID INTEGER, AQUIFER TEXT(4),
+                {', '.join(f'{name} DOUBLE' for name in POINT_FIELDS[2:])})""")
+            connection.execute(
+                "INSERT INTO gpkg_contents (table_name, data_type, identifier, srs_id) "
+                "VALUES (?, 'features', ?, ?)", (layer_name, layer_name, EPSG))
+            connection.execute(
+                "INSERT INTO gpkg_geometry_columns VALUES (?, 'geom', 'POINT', ?, 0, 0)",
+                (layer_name, EPSG))
+
+            insert = (f'INSERT INTO "{layer_name}" (geom, {", ".join(POINT_FIELDS)}) '
+                      f'VALUES ({", ".join("?"*(len(POINT_FIELDS) + 1))})')
+            for group in _groups(results):
+                for start in range(0, len(group['WELLID']), batch_size):
+                    stop = start + batch_size
+                    x = np.asarray(group['UTME'][start:stop], dtype=np.float64)
+                    y = np.asarray(group['UTMN'][start:stop], dtype=np.float64)
+                    if len(x) == 0:
+                        continue
+                    columns = [group[name][start:stop].tolist()
+                               for name in POINT_FIELDS]
+                    connection.executemany(insert, zip(_gpkg_points(x, y),
+                                                       *columns))
+                    extent = [min(extent[0], x.min()), min(extent[1], y.min()),
+                              max(extent[2], x.max()), max(extent[3], y.max())]
+                    rows += len(x)
+            if rows:
+                connection.execute(
+                    "UPDATE gpkg_contents SET min_x = ?, min_y = ?, max_x = ?, "
+                    "max_y = ? WHERE table_name = ?",
+                    [float(i) for i in extent] + [layer_name])
+    finally:
+        connection.close()
+    return rows
+
+def _shp_header(file_code_length, extent):
+    """Packs the 100 byte header shared by the .shp and .shx files."""
+    header = np.zeros(100, dtype=np.uint8)
+    header[0:4] = np.frombuffer(np.array([9994], '>i4').tobytes(), np.uint8)
+    header[24:28] = np.frombuffer(np.array([file_code_length], '>i4').tobytes(),
+                                  np.uint8)
+    header[28:36] = np.frombuffer(np.array([1000, 1], '<i4').tobytes(), np.uint8)
+    header[36:68] = np.frombuffer(np.array(extent, '<f8').tobytes(), np.uint8)
+    return header.tobytes()
+
+def _dbf_header(rows):
+    """Packs the dBase III header and field descriptors."""
+    today = datetime.date.today()
+    record_length = 1 + sum(width for name, kind, width, decimals in DBF_FIELDS)
+    header = bytearray(32)
+    header[0] = 3
+    header[1:4] = bytes([today.year - 1900, today.month, today.day])
+    header[4:8] = int(rows).to_bytes(4, 'little')
+    header[8:10] = (32 + 32*len(DBF_FIELDS) + 1).to_bytes(2, 'little')
+    header[10:12] = record_length.to_bytes(2, 'little')
+    for name, kind, width, decimals in DBF_FIELDS:
+        descriptor = bytearray(32)
+        descriptor[0:len(name)] = name.encode('ascii')
+        descriptor[11:12] = kind
+        descriptor[16] = width
+        descriptor[17] = decimals
+        header += descriptor
+    return bytes(header) + b'\r'
+
+def _dbf_column(values, kind, width, decimals):
+    """Formats one attribute column as fixed width dBase text."""
+    if kind == b'C':
+        return np.char.ljust(np.char.encode(np.asarray(values, dtype=str),
+                                            'ascii'), width).astype(f'S{width}')
+    values = np.asarray(values, dtype=np.float64)
+    fixed = f'%{width}.{decimals}f'
+    scientific = f'%{width}.{width - 8}e'
+    text = np.array([fixed % i for i in values.tolist()], dtype=f'S{width}')
+    #values too wide for the field, or too small to keep their precision
+    magnitude = np.abs(values)
+    exponent = (magnitude >= 10.0**(width - decimals - 2)) | \
+               ((magnitude < 1e-3) & (values != 0))
+    if exponent.any():
+        text[exponent] = [scientific % i for i in values[exponent].tolist()]
+    text[np.isnan(values)] = b'*'*width #null
+    return text
+
+def write_shapefile(results, file_name):
+    """Writes a results file as a Shapefile (.shp, .shx, .dbf and .prj).
+
+    Parameters
+    ----------
+    results: str or iterable of dict
+        Same as write_geopackage.
+
+    file_name: str
+        Path of the .shp file. The other files are written next to it and
+        existing files are replaced.
+
+    Returns
+    -------
+    rows: int
+        The number of points written.
+    """
+    base = os.path.splitext(file_name)[0]
+    record_dtype = np.dtype([('deleted', 'S1')] +
+                            [(name, f'S{width}') for name, kind, width, decimals
+                             in DBF_FIELDS])
+    rows = 0
+    extent = [np.inf, np.inf, -np.inf, -np.inf]
+    with open(base + '.shp', 'wb') as shp, open(base + '.shx', 'wb') as shx,\
+         open(base + '.dbf', 'wb') as dbf:
+        #the headers are written again once the size and extent are known
+        shp.write(bytes(100))
+        shx.write(bytes(100))
+        dbf.write(_dbf_header(0))
+        for group in _groups(results):
+            x = np.asarray(group['UTME'], dtype=np.float64)
+            y = np.asarray(group['UTMN'], dtype=np.float64)
+            if len(x) == 0:
+                continue
+            points = np.empty(len(x), dtype=SHP_RECORD_DTYPE)
+            points['number'] = np.arange(rows + 1, rows + len(x) + 1)
+            points['length'] = 10 #content length in 16-bit words
+            points['shape_type'] = 1 #Point
+            points['x'] = x
+            points['y'] = y
+            index = np.empty(len(x), dtype=SHX_RECORD_DTYPE)
+            index['offset'] = 50 + 14*np.arange(rows, rows + len(x))
+            index['length'] = 10
+            records = np.empty(len(x), dtype=record_dtype)
+            records['deleted'] = b' '
+            for name, kind, width, decimals in DBF_FIELDS:
+                records[name] = _dbf_column(group[name], kind, width, decimals)
+            shp.write(points.tobytes())
+            shx.write(index.tobytes())
+            dbf.write(records.tobytes())
+            extent = [min(extent[0], x.min()), min(extent[1], y.min()),
+                      max(extent[2], x.max()), max(extent[3], y.max())]
+            rows += len(x)
+        dbf.write(b'\x1a')
+        if rows == 0:
+            extent = [0, 0, 0, 0]
+        shp.seek(0)
+        shp.write(_shp_header(50 + 14*rows, extent))
+        shx.seek(0)
+        shx.write(_shp_header(50 + 4*rows, extent))
+        dbf.seek(0)
+        dbf.write(_dbf_header(rows))
+    with open(base + '.prj', 'w') as prj:
+        prj.write(ESRI_26915_WKT)
+    return rows
+
+def write_point_layer(results, file_name, **kwargs):
+    """Writes a .gpkg or .shp point layer, chosen by the extension of
+    file_name.
+
+    Parameters
+    ----------
+    results: str or iterable of dict
+        Same as write_geopackage.
+
+    file_name: str
+        Path of the .gpkg or .shp file.
+
+    **kwargs:
+        Passed on to write_geopackage.
+
+    Returns
+    -------
+    rows: int
+        The number of points written.
+    """
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension == '.gpkg':
+        return write_geopackage(results, file_name, **kwargs)
+    if extension == '.shp':
+        return write_shapefile(results, file_name)
+    raise ValueError(f"Unknown point layer type: {file_name}")
@@ -0,0 +1,192 @@
+"""Interpolates point values (Transmissivity, Hydraulic Conductivity) onto
+continuous rasters that are written straight to disk.
+
+plot_spacial_transmissivity only draws the wells as points. idw_raster fills
+every cell of a regular grid with an inverse-distance weighted value of the
+nearest wells. The grid is processed in tiles of rows and columns on worker
+threads (cKDTree.query releases the GIL) and each tile is written into a
+memory-mapped .npy file, so the size of the raster is limited by the disk and
+not by RAM, however wide or tall it is.
+
+Functions
+---------
+idw_raster: Interpolates point values onto a raster with inverse-distance
+    weighting.
+
+read_raster: Opens a raster written by idw_raster.
+
+Notes
+-----
+    A raster is saved as three files:
+    <name>.npy = float32 array of shape (nrows, ncols). Row 0 is the northern
+                 edge. Cells without any well within radius are nan.
+    <name>.json = extent, cell size, EPSG code and the interpolation settings.
+    <name>.wld = ESRI world file of the cell centers.
+    The coordinates are UTM zone 15N meters (EPSG:26915), the same as UTME
+    and UTMN in allwells.
+
+-------------------------------------------------------------------------------
+"""
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from scipy import spatial
+
+EPSG = 26915 #NAD83 / UTM zone 15N
+BLOCK_ROWS = 256
+BLOCK_COLS = 256
+MAX_WORKERS = 4
+
+def _idw_block(tree, values, raster, xmin, ymax, cell_size, start, stop,
+               left, right, k, power, radius, log):
+    """Interpolates the cells [start:stop, left:right] of raster in place."""
+    columns = xmin + cell_size*(np.arange(left, right) + 0.5)
+    rows = ymax - cell_size*(np.arange(start, stop) + 0.5)
+    xi, yi = np.meshgrid(columns, rows)
+    distance, neighbors = tree.query(np.stack((xi.ravel(), yi.ravel()), 1),
+                                     k=k, distance_upper_bound=radius)
+    distance = distance.reshape(-1, k)
+    neighbors = neighbors.reshape(-1, k)
+    valid = np.isfinite(distance)
+    neighbor_values = values[np.where(valid, neighbors, 0)]
+
+    #cells on top of a well take the mean of the wells at that spot
+    exact = valid & (distance == 0)
+    on_well = exact.any(axis=1)
+    with np.errstate(divide='ignore'):
+        weights = np.where(valid, distance**-float(power), 0)
+    weights[on_well] = exact[on_well]
+    total = weights.sum(axis=1)
+    with np.errstate(invalid='ignore'):
+        estimate = (weights*neighbor_values).sum(axis=1)/total
+    estimate[total == 0] = np.nan
+    if log:
+        estimate = 10**estimate
+    raster[start:stop, left:right] = estimate.reshape(stop - start,
+                                                      right - left)
+
+def idw_raster(x, y, values, xmin, ymin, xmax, ymax, cell_size, file_name,
+               k=12, power=2, radius=np.inf, log=False,
+               block_rows=BLOCK_ROWS, block_cols=BLOCK_COLS,
+               max_workers=MAX_WORKERS):
+    """Interpolates point values onto a raster with inverse-distance
+    weighting.
+
+    Parameters
+    ----------
+    x, y: ndarray, shape=(n,)
+        UTM coordinates of the wells.
+
+    values: ndarray, shape=(n,)
+        The value of each well, e.g. a column of transmissivity_calculated.
+        Wells with nan values are ignored.
+
+    xmin, ymin, xmax, ymax: float
+        Extent of the raster (UTM meters). The grid is anchored at the
+        north-west corner (xmin, ymax); when the extent is not a multiple
+        of cell_size the partial column on the east and the partial row on
+        the south are dropped, and the .json file records the extent that
+        is actually covered.
+
+    cell_size: float
+        Width and height of the cells (meters), e.g. 30 to 100.
+
+    file_name: str
+        Path of the raster without the extension. The .npy, .json and .wld
+        files are written next to each other.
+
+    k: int
+        The largest number of wells used for one cell.
+
+    power: float
+        The inverse-distance weighting exponent.
+
+    radius: float
+        Only wells within this distance of a cell are used.
+
+    log: bool
+        If True, log10 of the values is interpolated and the raster holds
+        10**result. Recommended for Transmissivity and Hydraulic
+        Conductivity, which span orders of magnitude. Non-positive values
+        are ignored.
+
+    block_rows, block_cols: int
+        Number of raster rows and columns interpolated at a time by one
+        thread. The memory of a thread is set by block_rows*block_cols*k.
+
+    max_workers: int
+        The largest number of threads.
+
+    Returns
+    -------
+    raster: numpy.memmap, shape=(nrows, ncols)
+        The raster, opened read-only from the .npy file.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    values = np.asarray(values, dtype=float)
+    keep = np.isfinite(values)
+    if log:
+        keep &= values > 0
+    x, y, values = x[keep], y[keep], values[keep]
+    if log:
+        values = np.log10(values)
+    k = max(min(k, len(values)), 1)
+    tree = spatial.cKDTree(np.stack((x, y), 1))
+
+    ncols = int(np.floor((xmax - xmin)/cell_size))
+    nrows = int(np.floor((ymax - ymin)/cell_size))
+    ymin = ymax - nrows*cell_size
+    folder = os.path.dirname(file_name)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    raster = np.lib.format.open_memmap(file_name + '.npy', mode='w+',
+                                       dtype=np.float32, shape=(nrows, ncols))
+    blocks = [(start, min(start + block_rows, nrows),
+               left, min(left + block_cols, ncols))
+              for start in range(0, nrows, block_rows)
+              for left in range(0, ncols, block_cols)]
+    if values.size == 0:
+        raster[:] = np.nan
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for _ in executor.map(lambda block: _idw_block(
+                    tree, values, raster, xmin, ymax, cell_size, *block, k,
+                    power, radius, log), blocks):
+                pass
+    raster.flush()
+    del raster
+
+    metadata = {'xmin': xmin, 'ymin': ymin, 'xmax': xmin + ncols*cell_size,
+                'ymax': ymax, 'cell_size': cell_size, 'nrows': nrows,
+                'ncols': ncols, 'epsg': EPSG, 'nodata': 'nan',
+                'method': 'idw', 'k': k, 'power': power,
+                'radius': None if np.isinf(radius) else radius, 'log': log}
+    with open(file_name + '.json', 'w') as outfile:
+        json.dump(metadata, outfile, indent=2)
+    with open(file_name + '.wld', 'w') as outfile:
+        outfile.write(f"{cell_size}\n0\n0\n{-cell_size}\n"
+                      f"{xmin + cell_size/2}\n{ymax - cell_size/2}\n")
+    return read_raster(file_name)[0]
+
+def read_raster(file_name):
+    """Opens a raster written by idw_raster.
+
+    Parameters
+    ----------
+    file_name: str
+        Path of the raster without the extension.
+
+    Returns
+    -------
+    raster: numpy.memmap, shape=(nrows, ncols)
+        The raster, memory-mapped read-only.
+
+    metadata: dict
+        The contents of the .json file.
+    """
+    with open(file_name + '.json') as infile:
+        metadata = json.load(infile)
+    mmap_mode = 'r' if metadata['nrows']*metadata['ncols'] else None
+    return np.load(file_name + '.npy', mmap_mode=mmap_mode), metadata
@@ -5,11 +5,11 @@ the user to input a Well ID or radial distance (radius). Hence, this program
 can be used for troubleshooting.
 
 Author: Jonny Full
-Version: 7/24/2020
+Version: 10/17/2026
 """
 from Transmissivity import transmissivity_calculations, conductivity_calculations
-from data_retrieve import find_wells, data_organization, pump_log,\
-aquifer_thickness, storativity_calculations
+from data_retrieve import find_wells, data_organization,\
+retrieve_well_data, storativity_calculations
 from plots import *
 
 """
@@ -35,8 +35,8 @@ def runme():
             data = [utm_e, utm_n, well_id]
             target_coords.append(data)
             
-    pump_log_results = pump_log(candidate_wells, error_bounds)
-    thickness_data = aquifer_thickness(candidate_wells, error_bounds)
+    pump_log_results, thickness_data, retrieval_timings = retrieve_well_data(
+        candidate_wells, error_bounds)
     thickness_storativity_data = storativity_calculations(candidate_wells, thickness_data)
     confirmed_wells = data_organization(candidate_wells, pump_log_results, thickness_storativity_data)
     transmissivity_calculated = transmissivity_calculations(confirmed_wells)
@@ -0,0 +1,64 @@
+"""Sweeps Transmissivity and Hydraulic Conductivity over a range of
+error_bounds with one read of the CWI tables.
+
+Running analyze_wells once per error_bounds repeats every query. The
+error_bounds only change the bounds put around the recorded values, so
+error_bounds_sweep reads the tables once with error_bounds = 0 and
+transmissivity_sweep then evaluates every error_bounds in one broadcast
+NumPy pass.
+
+Functions
+---------
+error_bounds_sweep: Calculates the results around a target well for a vector
+    of error_bounds.
+
+-------------------------------------------------------------------------------
+"""
+import numpy as np
+from data_retrieve import find_wells, retrieve_well_data,\
+storativity_calculations, data_organization
+from Transmissivity import transmissivity_sweep
+from well_batch import empty_well_batch
+
+def error_bounds_sweep(target_well, radius, error_bounds):
+    """Calculates Transmissivity and Hydraulic Conductivity around a target
+    well for every value in a vector of error_bounds.
+
+    Parameters
+    ----------
+    target_well: int
+        The WELLID of the target well.
+
+    radius: int (meters)
+        Any wells used fall within this distance of the target well and draw
+        water from the same aquifer.
+
+    error_bounds: sequence of float
+        The error_bounds to evaluate, e.g. range(1, 21).
+
+    Returns
+    -------
+    confirmed_wells: WellBatch
+        The wells with their recorded values (error_bounds = 0). Every well
+        that is confirmed for any error_bounds is included.
+
+    transmissivity_swept: ndarray[float], shape=(n, len(error_bounds), 3)
+        Same as transmissivity_sweep. Wells that the pipeline would drop for
+        an error_bounds are NaN for it.
+
+    conductivity_swept: ndarray[float], shape=(n, len(error_bounds), 3)
+        Same as transmissivity_sweep.
+    """
+    error_bounds = np.asarray(error_bounds, dtype=np.float64)
+    candidate_wells = find_wells(target_well, radius, 0)
+    if not candidate_wells:
+        return (empty_well_batch(0), np.empty((0, len(error_bounds), 3)),
+                np.empty((0, len(error_bounds), 3)))
+    pump_log_results, thickness_data, _ = retrieve_well_data(candidate_wells, 0)
+    thickness_storativity_data = storativity_calculations(candidate_wells,
+                                                          thickness_data)
+    confirmed_wells = data_organization(candidate_wells, pump_log_results,
+                                        thickness_storativity_data)
+    transmissivity_swept, conductivity_swept = transmissivity_sweep(
+        confirmed_wells, error_bounds)
+    return confirmed_wells, transmissivity_swept, conductivity_swept
@@ -0,0 +1,200 @@
+"""Persistent per-aquifer spatial index of the allwells table.
+
+find_wells used to scan every well in an aquifer and build a new cKDTree for
+every query. The functions below save the well data of each aquifer to disk
+the first time it is requested. Later requests (in the same process or a new
+one) memory-map the saved wells instead of reading the well table again and
+build the cKDTree from them, which takes a fraction of a second even for the
+largest aquifers. An index is rebuilt when the modification stamp of the
+source table changes.
+
+Functions
+---------
+source_stamp: Returns the modification stamp of a table on disk.
+
+build_aquifer_index: Reads the wells of one aquifer and saves them to the
+    index directory.
+
+load_aquifer_index: Returns the index of one aquifer, building it when it is
+    missing or out of date.
+
+Notes
+-----
+    Every aquifer is stored in its own folder inside INDEX_DIR:
+    wells.npy = structured array of UTME, UTMN, SCREEN_LEN, RADIUS, WELLID.
+                This file is memory-mapped on load.
+    manifest.json = source table, modification stamp and number of wells.
+
+    Nothing is unpickled, so loading an index never runs code from
+    INDEX_DIR. Every build writes into its own temporary folder and swaps it
+    in at the end, so processes that build the same aquifer at the same time
+    do not remove each other's files.
+
+-------------------------------------------------------------------------------
+"""
+import json
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+import numpy as np
+from scipy import spatial
+from data_location import INDEX_DIR
+
+INDEXED_WELL_DTYPE = np.dtype([
+    ('UTME', np.float64),
+    ('UTMN', np.float64),
+    ('SCREEN_LEN', np.float64),
+    ('RADIUS', np.float64),
+    ('WELLID', np.int64)
+    ])
+
+AquiferIndex = namedtuple('AquiferIndex', ['aquifer', 'wells', 'tree'])
+
+#indexes already loaded by this process: (index_dir, aquifer) -> (stamp, index)
+_loaded_indexes = {}
+
+def source_stamp(source):
+    """Returns the modification stamp of a table.
+
+    Parameters
+    ----------
+    source: str
+        Path of the table. Feature classes inside a file geodatabase do not
+        exist as files, so the closest existing parent (the .gdb folder) is
+        used instead.
+
+    Returns
+    -------
+    stamp: list[int]
+        The latest modification time (ns) and the total size (bytes) of the
+        table's files.
+    """
+    path = source
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            raise FileNotFoundError(source)
+        path = parent
+    if os.path.isdir(path):
+        entries = [entry.stat() for entry in os.scandir(path) if entry.is_file()]
+        entries.append(os.stat(path))
+    else:
+        entries = [os.stat(path)]
+    return [max(i.st_mtime_ns for i in entries), sum(i.st_size for i in entries)]
+
+def _tree(wells):
+    """Builds the cKDTree of the UTME and UTMN of indexed wells."""
+    return spatial.cKDTree(np.column_stack((wells['UTME'], wells['UTMN'])))
+
+def build_aquifer_index(aquifer, source, read_wells, index_dir=INDEX_DIR):
+    """Reads the wells of one aquifer and saves their spatial index.
+
+    Parameters
+    ----------
+    aquifer: str
+        Aquifer code of the wells being indexed.
+
+    source: str
+        Path of the table the wells are read from.
+
+    read_wells: callable
+        read_wells(aquifer) returns a list of [UTME, UTMN, AQUIFER,
+        Screen Length, Casing Radius, Well ID] for every well in the aquifer.
+
+    index_dir: str
+        Folder that holds the saved indexes.
+
+    Returns
+    -------
+    index: AquiferIndex
+        The aquifer code, the well data and the spatial tree.
+    """
+    stamp = source_stamp(source)
+    well_data = read_wells(aquifer)
+    wells = np.zeros(len(well_data), dtype=INDEXED_WELL_DTYPE)
+    if well_data:
+        wells['UTME'] = [i[0] for i in well_data]
+        wells['UTMN'] = [i[1] for i in well_data]
+        wells['SCREEN_LEN'] = [i[3] for i in well_data]
+        wells['RADIUS'] = [i[4] for i in well_data]
+        wells['WELLID'] = [i[5] for i in well_data]
+
+    #write into a folder of this build only, so a crash never leaves half an
+    #index and concurrent builds do not touch each other's files
+    folder = os.path.join(index_dir, aquifer)
+    os.makedirs(index_dir, exist_ok=True)
+    temporary = tempfile.mkdtemp(prefix=f'{aquifer}.', suffix='.tmp',
+                                 dir=index_dir)
+    np.save(os.path.join(temporary, 'wells.npy'), wells)
+    manifest = {'source': source, 'stamp': stamp, 'count': len(wells)}
+    with open(os.path.join(temporary, 'manifest.json'), 'w') as outfile:
+        json.dump(manifest, outfile)
+    stale = temporary + '.old'
+    try:
+        os.rename(folder, stale)
+    except FileNotFoundError:
+        pass
+    try:
+        os.rename(temporary, folder)
+    except OSError:
+        #another process saved the same index in between
+        shutil.rmtree(temporary, ignore_errors=True)
+    shutil.rmtree(stale, ignore_errors=True)
+
+    index = AquiferIndex(aquifer, wells, _tree(wells))
+    _loaded_indexes[(index_dir, aquifer)] = (stamp, index)
+    return index
+
+def load_aquifer_index(aquifer, source, read_wells, index_dir=INDEX_DIR):
+    """Returns the spatial index of one aquifer.
+
+    The index is taken from memory if this process already loaded it, from
+    index_dir if it was saved by an earlier run, and is otherwise built with
+    build_aquifer_index. In every case the saved modification stamp must
+    match the current stamp of the source table.
+
+    Parameters
+    ----------
+    aquifer: str
+        Aquifer code of the wells being indexed.
+
+    source: str
+        Path of the table the wells are read from.
+
+    read_wells: callable
+        read_wells(aquifer) returns a list of [UTME, UTMN, AQUIFER,
+        Screen Length, Casing Radius, Well ID] for every well in the aquifer.
+
+    index_dir: str
+        Folder that holds the saved indexes.
+
+    Returns
+    -------
+    index: AquiferIndex
+        The aquifer code, the well data (memory-mapped) and the spatial tree.
+    """
+    stamp = source_stamp(source)
+    loaded = _loaded_indexes.get((index_dir, aquifer))
+    if loaded is not None and loaded[0] == stamp:
+        return loaded[1]
+
+    folder = os.path.join(index_dir, aquifer)
+    try:
+        with open(os.path.join(folder, 'manifest.json')) as infile:
+            manifest = json.load(infile)
+    except (OSError, ValueError):
+        manifest = None
+    if manifest is None or manifest['source'] != source or \
+       manifest['stamp'] != stamp:
+        return build_aquifer_index(aquifer, source, read_wells, index_dir)
+
+    mmap_mode = 'r' if manifest['count'] else None #empty files cannot be mapped
+    try:
+        wells = np.load(os.path.join(folder, 'wells.npy'), mmap_mode=mmap_mode,
+                        allow_pickle=False)
+    except (OSError, ValueError):
+        return build_aquifer_index(aquifer, source, read_wells, index_dir)
+    index = AquiferIndex(aquifer, wells, _tree(wells))
+    _loaded_indexes[(index_dir, aquifer)] = (stamp, index)
+    return index
@@ -0,0 +1,301 @@
+"""Precomputes Transmissivity and Hydraulic Conductivity for every well in the
+state and answers radius queries from the saved results.
+
+analyze_wells.py only calculates T and K around one target well and throws
+the work away afterwards. build_store runs the same chain (retrieve ->
+storativity -> transmissivity_calculations -> conductivity_calculations)
+once for every aquifer in allwells and saves the results in an indexed
+SQLite database. query_store then answers the same question as
+analyze_wells (target well + radius, same aquifer) with an index lookup.
+
+Functions
+---------
+list_aquifers: Returns every aquifer code in allwells.
+
+build_store: Calculates and saves the results for every aquifer.
+
+query_store: Returns the saved results within a radius of a target well.
+
+main: Command line interface. Run "python statewide.py -h" for help.
+
+Notes
+-----
+    The store holds two tables:
+    wells = one row per confirmed well with every WellBatch field (see
+            well_batch) plus T_MIN, T, T_MAX, K_MIN, K, K_MAX. It is indexed
+            on (AQUIFER, UTME, UTMN) and on WELLID.
+    metadata = the error_bounds the store was built with and the source and
+               modification stamp of every input table (allwells, C5PL
+               and CWI_hydro).
+
+    build_store writes into a temporary file next to the store and only
+    replaces the store once every aquifer is saved, so a crash or an
+    interrupted build never leaves a half-written store. query_store
+    refuses a store built with other error_bounds, or when any of the input
+    tables changed after the store was built.
+
+    Because the join in data_organization only relates rows with the same
+    Well ID and every well in an aquifer gets the same storage coefficients,
+    the rows returned by query_store are the rows analyze_wells would
+    calculate for the same target, radius and error_bounds.
+
+-------------------------------------------------------------------------------
+"""
+import argparse
+import json
+import os
+import sqlite3
+import numpy as np
+from data_location import allwells, CWIPL, THICKNESS, STATEWIDE_STORE
+from data_retrieve import locate_wells, pump_log_raw, pump_log_bounds,\
+aquifer_thickness_raw, aquifer_thickness_bounds, storativity_calculations,\
+data_organization, read_aquifer_wells
+from spatial_index import load_aquifer_index, source_stamp
+from table_reader import get_reader, search_cursor
+from Transmissivity import transmissivity_calculations, conductivity_calculations
+from well_batch import WELL_BATCH_DTYPE, empty_well_batch
+
+RESULT_FIELDS = ['T_MIN', 'T', 'T_MAX', 'K_MIN', 'K', 'K_MAX']
+INPUT_TABLES = {'allwells': allwells, 'C5PL': CWIPL, 'CWI_hydro': THICKNESS}
+
+def list_aquifers():
+    """Returns every aquifer code in allwells.
+
+    Returns
+    -------
+    aquifers: list[str]
+        The distinct AQUIFER codes, sorted.
+    """
+    aquifers = set()
+    with search_cursor(allwells, ['AQUIFER'], "AQUIFER is not NULL") as cursor:
+        for row in cursor:
+            aquifers.add(row[0])
+    return sorted(aquifers)
+
+def _source_stamps():
+    """Returns the source and modification stamp of every input table."""
+    reader = get_reader()
+    stamps = {}
+    for name, table in INPUT_TABLES.items():
+        source = reader.source(table)
+        stamps[name] = [source, source_stamp(source)]
+    return stamps
+
+def _aquifer_results(aquifer, error_bounds, source):
+    """Runs the calculation chain for every well in one aquifer."""
+    index = load_aquifer_index(aquifer, source, read_aquifer_wells)
+    candidate_wells = [[utm_east, utm_north, aquifer, screen_len, radius_well,
+                        well_id] for utm_east, utm_north, screen_len,
+                       radius_well, well_id in index.wells.tolist()]
+    if not candidate_wells:
+        return empty_well_batch(0), np.empty((0, 3)), np.empty((0, 3))
+    candidate_wells.sort(key=lambda x: x[5])#sorts by ascending WELLID number
+    well_ids = [i[5] for i in candidate_wells]
+    pump_log_results = pump_log_bounds(pump_log_raw(well_ids), error_bounds)
+    thickness_data = aquifer_thickness_bounds(aquifer_thickness_raw(well_ids),
+                                              error_bounds)
+    thickness_storativity_data = storativity_calculations(candidate_wells,
+                                                          thickness_data)
+    confirmed_wells = data_organization(candidate_wells, pump_log_results,
+                                        thickness_storativity_data)
+    transmissivity_calculated = transmissivity_calculations(confirmed_wells)
+    conductivity_calculated = conductivity_calculations(confirmed_wells,
+                                                        transmissivity_calculated)
+    return confirmed_wells, transmissivity_calculated, conductivity_calculated
+
+def build_store(error_bounds, store=STATEWIDE_STORE, aquifers=None):
+    """Calculates Transmissivity and Hydraulic Conductivity for every well in
+    the state and saves them.
+
+    Parameters
+    ----------
+    error_bounds: int
+        error_bounds represents the limit on the bounds used for the
+        uncertainty surrounding the recorded values in the CWI database.
+
+    store: str
+        Path of the SQLite database the results are saved to. An existing
+        store is replaced once the new one is complete.
+
+    aquifers: list[str]
+        The aquifer codes to calculate. The default is every aquifer in
+        allwells.
+
+    Returns
+    -------
+    counts: dict
+        The number of confirmed wells saved for each aquifer.
+    """
+    #stamped before reading so changes made during the build are noticed
+    stamps = _source_stamps()
+    source = stamps['allwells'][0]
+    if aquifers is None:
+        aquifers = list_aquifers()
+    fields = list(WELL_BATCH_DTYPE.names) + RESULT_FIELDS
+    columns = ', '.join(f'"{i}"' for i in fields)
+    marks = ', '.join('?' for i in fields)
+    counts = {}
+    #build into a temporary file so the old store stays usable until the end
+    temporary = store + '.tmp'
+    if os.path.exists(temporary):
+        os.remove(temporary)
+    connection = sqlite3.connect(temporary)
+    try:
+        with connection:
+            connection.execute(f'CREATE TABLE wells ({columns})')
+            connection.execute('CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT)')
+        for aquifer in aquifers:
+            confirmed_wells, transmissivity_calculated, conductivity_calculated =\
+                _aquifer_results(aquifer, error_bounds, source)
+            rows = zip(*[confirmed_wells[i].tolist() for i in WELL_BATCH_DTYPE.names],
+                       *transmissivity_calculated.T.tolist(),
+                       *conductivity_calculated[:, :3].T.tolist())
+            with connection:
+                connection.executemany(f'INSERT INTO wells VALUES ({marks})', rows)
+            counts[aquifer] = len(confirmed_wells)
+        with connection:
+            connection.execute('CREATE INDEX wells_location ON wells (AQUIFER, UTME, UTMN)')
+            connection.execute('CREATE INDEX wells_wellid ON wells (WELLID)')
+            connection.executemany('INSERT INTO metadata VALUES (?, ?)', [
+                ('error_bounds', json.dumps(error_bounds)),
+                ('sources', json.dumps(stamps))])
+    finally:
+        connection.close()
+    os.replace(temporary, store)
+    return counts
+
+def _check_store(connection, error_bounds):
+    """Raises ValueError when a store does not match error_bounds or the
+    current input tables."""
+    try:
+        metadata = dict(connection.execute('SELECT key, value FROM metadata'))
+    except sqlite3.DatabaseError:
+        metadata = {}
+    if set(metadata) != {'error_bounds', 'sources'}:
+        raise ValueError("The statewide store is incomplete. Run "
+                         "'python statewide.py build' again.")
+    if json.loads(metadata['error_bounds']) != error_bounds:
+        raise ValueError(f"The statewide store was built with error_bounds "
+                         f"{json.loads(metadata['error_bounds'])}, not "
+                         f"{error_bounds}. Run 'python statewide.py build "
+                         f"{error_bounds}'.")
+    stored = json.loads(metadata['sources'])
+    changed = [name for name, stamp in _source_stamps().items()
+               if stored.get(name) != stamp]
+    if changed:
+        raise ValueError(f"{', '.join(changed)} changed after the statewide "
+                         "store was built. Run 'python statewide.py build' "
+                         "again.")
+
+def query_store(target_well, radius, error_bounds, store=STATEWIDE_STORE):
+    """Returns the saved results within a radius of a target well.
+
+    Parameters
+    ----------
+    target_well: int
+        The WELLID of the target well.
+
+    radius: int (meters)
+        Any wells returned fall within this distance of the target well and
+        draw water from the same aquifer.
+
+    error_bounds: int
+        The error_bounds the results were calculated with. It must match
+        the error_bounds the store was built with.
+
+    store: str
+        Path of the SQLite database written by build_store.
+
+    Returns
+    -------
+    confirmed_wells: WellBatch
+        The saved WellBatch records (see well_batch).
+
+    transmissivity_calculated: ndarray[float], shape=(n, 3)
+        Same as transmissivity_calculations.
+
+    conductivity_calculated: ndarray[float], shape=(n, 4)
+        Same as conductivity_calculations.
+
+    Notes
+    -----
+    A ValueError is raised when the store was built with other
+    error_bounds, when the modification stamp of allwells, C5PL or
+    CWI_hydro changed since the store was built, or when target_well is not
+    in allwells.
+
+    The target well is looked up in the store first and only read from
+    allwells when it is not a confirmed well itself. The candidate rows are
+    found with the (AQUIFER, UTME, UTMN) index using the square around the
+    target, then trimmed to the circle.
+    """
+    fields = list(WELL_BATCH_DTYPE.names) + RESULT_FIELDS
+    columns = ', '.join(f'"{i}"' for i in fields)
+    if not os.path.exists(store):
+        raise FileNotFoundError(store)
+    connection = sqlite3.connect(store)
+    try:
+        _check_store(connection, error_bounds)
+        target = connection.execute(
+            'SELECT UTME, UTMN, AQUIFER FROM wells WHERE WELLID = ? LIMIT 1',
+            (int(target_well),)).fetchone()
+        if target is None:
+            target = locate_wells([target_well]).get(int(target_well))
+        if target is None:
+            raise ValueError(f"Well {target_well} is not in allwells.")
+        utm_e, utm_n, aquifer = target
+        rows = connection.execute(
+            f'SELECT {columns} FROM wells WHERE AQUIFER = ? AND '
+            'UTME BETWEEN ? AND ? AND UTMN BETWEEN ? AND ? ORDER BY rowid',
+            (aquifer, utm_e - radius, utm_e + radius, utm_n - radius,
+             utm_n + radius)).fetchall()
+    finally:
+        connection.close()
+    confirmed_wells = empty_well_batch(len(rows))
+    results = np.empty((len(rows), len(RESULT_FIELDS)))
+    if rows:
+        columns = list(zip(*rows))
+        for position, field in enumerate(WELL_BATCH_DTYPE.names):
+            confirmed_wells[field] = columns[position]
+        results[:] = np.array(columns[len(WELL_BATCH_DTYPE.names):], dtype=float).T
+    inside = np.hypot(confirmed_wells['UTME'] - utm_e,
+                      confirmed_wells['UTMN'] - utm_n) <= radius
+    confirmed_wells = confirmed_wells[inside]
+    conductivity_calculated = np.column_stack((results[inside, 3:],
+                                               confirmed_wells['WELLID']))
+    return confirmed_wells, results[inside, :3], conductivity_calculated
+
+def main(argv=None):
+    """Command line interface for build_store and query_store."""
+    parser = argparse.ArgumentParser(
+        description="Precompute Transmissivity and Hydraulic Conductivity for "
+                    "every well in the state.")
+    parser.add_argument('--store', default=STATEWIDE_STORE,
+                        help="path of the SQLite store")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="calculate and save every aquifer")
+    build.add_argument('error_bounds', type=float)
+    build.add_argument('--aquifer', action='append',
+                       help="only calculate this aquifer (repeatable)")
+    query = commands.add_parser('query', help="print the wells near a target")
+    query.add_argument('target_well', type=int)
+    query.add_argument('radius', type=float)
+    query.add_argument('error_bounds', type=float)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        counts = build_store(args.error_bounds, args.store, args.aquifer)
+        for aquifer, count in counts.items():
+            print(f"{aquifer}: {count} wells")
+    else:
+        confirmed_wells, transmissivity_calculated, conductivity_calculated =\
+            query_store(args.target_well, args.radius, args.error_bounds,
+                        args.store)
+        print("WELLID, T_min, T_raw, T_max, K_min, K_raw, K_max")
+        for well_id, T, K in zip(confirmed_wells['WELLID'],
+                                 transmissivity_calculated,
+                                 conductivity_calculated):
+            print(well_id, *T, *K[:3], sep=', ')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+"""Streams wells through the calculation chain in bounded batches.
+
+analyze_wells.py builds the full candidate_wells, pump_log, thickness and
+confirmed_wells lists and a DataFrame before writing anything, so its peak
+memory grows with the number of wells. The generators below pass the wells
+through the same steps (retrieval and filtering -> bounds -> storativity ->
+join -> Transmissivity -> Conductivity -> output file) one batch at a time, so
+the memory of the calculation chain is set by batch_size instead (see Notes
+for what is not).
+
+Functions
+---------
+candidate_batches: Yields the wells of an aquifer index in batches of whole
+    WELLIDs.
+
+calculation_batches: Runs every batch of candidate wells through the
+    calculation chain.
+
+stream_target: Streams the wells within a radius of a target well to an npz
+    or Parquet results file (or a csv file).
+
+stream_aquifers: Streams every well of one or more aquifers to an npz or
+    Parquet results file (or a csv file).
+
+Notes
+-----
+    The join in data_organization only relates rows that share a WELLID.
+    candidate_batches never splits the rows of one WELLID between batches, and
+    the pump log and thickness rows are read for exactly the WELLIDs of a
+    batch, so the streamed rows are the rows the whole-list pipeline
+    produces, batch by batch in ascending WELLID order. The values agree to
+    the last bit or so; NumPy can round differently for arrays of different
+    lengths.
+
+    Peak memory is not bounded by batch_size alone. The first time an
+    aquifer is used its spatial index is built, and read_aquifer_wells holds
+    the location and construction fields of every well of that aquifer in
+    memory while it does. Later runs memory-map the saved index (see
+    spatial_index). candidate_batches also sorts the positions of every
+    selected well, one integer per well. What batch_size bounds is the rest:
+    the candidate, pump log, thickness and joined rows and the calculated
+    results, which the whole-list pipeline holds for every well at once.
+
+-------------------------------------------------------------------------------
+"""
+import numpy as np
+from data_location import allwells
+from data_retrieve import locate_wells, pump_log_raw, pump_log_bounds,\
+aquifer_thickness_raw, aquifer_thickness_bounds, storativity_calculations,\
+data_organization, read_aquifer_wells
+from columnar import write_results
+from data_to_csv import append_calculated_data_csv
+from spatial_index import load_aquifer_index
+from table_reader import get_reader
+from Transmissivity import transmissivity_calculations, conductivity_calculations
+
+BATCH_SIZE = 5000
+
+def candidate_batches(index, rows=None, batch_size=BATCH_SIZE):
+    """Yields the wells of an aquifer index in batches of whole WELLIDs.
+
+    Parameters
+    ----------
+    index: AquiferIndex
+        The spatial index of one aquifer (see spatial_index).
+
+    rows: ndarray[int]
+        Positions of the wells in index.wells to stream. The default is every
+        well in the aquifer.
+
+    batch_size: int
+        The number of wells in a batch. A batch is extended past batch_size
+        only to keep every row of its last WELLID.
+
+    Yields
+    ------
+    candidate_wells: list
+        Same as find_wells, for one batch. Batches follow each other in
+        ascending WELLID order.
+    """
+    well_ids = np.asarray(index.wells['WELLID'])
+    if rows is None:
+        rows = np.arange(len(well_ids))
+    rows = np.asarray(rows, dtype=np.intp)
+    rows = rows[np.argsort(well_ids[rows], kind='stable')]
+    sorted_ids = well_ids[rows]
+    start = 0
+    while start < len(rows):
+        stop = min(start + batch_size, len(rows))
+        if stop < len(rows):
+            #moves the cut to the end of the last WELLID in the batch
+            stop = np.searchsorted(sorted_ids, sorted_ids[stop - 1], side='right')
+        wells = index.wells[np.sort(rows[start:stop])]
+        candidate_wells = [[utm_east, utm_north, index.aquifer, screen_len,
+                            radius_well, well_id] for utm_east, utm_north,
+                           screen_len, radius_well, well_id in wells.tolist()]
+        candidate_wells.sort(key=lambda x: x[5])#sorts by ascending WELLID number
+        yield candidate_wells
+        start = stop
+
+def calculation_batches(batches, error_bounds):
+    """Runs every batch of candidate wells through the calculation chain.
+
+    Parameters
+    ----------
+    batches: iterable of list
+        Batches of candidate wells, e.g. from candidate_batches.
+
+    error_bounds: int
+        error_bounds represents the limit on the bounds used for the
+        uncertainty surrounding the recorded values in the CWI database.
+
+    Yields
+    ------
+    (confirmed_wells, transmissivity_calculated, conductivity_calculated):
+        Same as data_organization, transmissivity_calculations and
+        conductivity_calculations, for one batch. Batches without any
+        confirmed well are skipped.
+    """
+    for candidate_wells in batches:
+        if not candidate_wells:
+            continue
+        well_ids = sorted({row[5] for row in candidate_wells})
+        pump_log_results = pump_log_bounds(pump_log_raw(well_ids), error_bounds)
+        thickness_data = aquifer_thickness_bounds(aquifer_thickness_raw(well_ids),
+                                                  error_bounds)
+        thickness_storativity_data = storativity_calculations(candidate_wells,
+                                                              thickness_data)
+        confirmed_wells = data_organization(candidate_wells, pump_log_results,
+                                            thickness_storativity_data)
+        if len(confirmed_wells) == 0:
+            continue
+        transmissivity_calculated = transmissivity_calculations(confirmed_wells)
+        conductivity_calculated = conductivity_calculations(
+            confirmed_wells, transmissivity_calculated)
+        yield confirmed_wells, transmissivity_calculated, conductivity_calculated
+
+def _write(results, feature_class_name, file_format):
+    """Appends every batch of results to <feature_class_name>.<file_format>."""
+    if file_format != 'csv':
+        file_name = f"{feature_class_name}.{file_format}"
+        return file_name, write_results(results, file_name)
+    raw_csv_name = f"{feature_class_name}.csv"
+    rows = 0
+    for confirmed_wells, transmissivity_calculated, conductivity_calculated in results:
+        rows += append_calculated_data_csv(transmissivity_calculated,
+                                           conductivity_calculated,
+                                           confirmed_wells, raw_csv_name,
+                                           header=(rows == 0))
+    if rows == 0:
+        append_calculated_data_csv([], [], [], raw_csv_name, header=True)
+    return raw_csv_name, rows
+
+def stream_target(target_well, radius, error_bounds, feature_class_name,
+                  batch_size=BATCH_SIZE, file_format='npz'):
+    """Streams the wells within a radius of a target well to a results file.
+
+    This produces the same rows as find_wells -> retrieve_well_data ->
+    storativity_calculations -> data_organization ->
+    transmissivity_calculations -> conductivity_calculations ->
+    calculated_data_to_csv, in ascending WELLID order.
+
+    Parameters
+    ----------
+    target_well: int
+        The WELLID of the target well.
+
+    radius: int (meters)
+        Any wells used fall within this distance of the target well and draw
+        water from the same aquifer.
+
+    error_bounds: int
+        error_bounds represents the limit on the bounds used for the
+        uncertainty surrounding the recorded values in the CWI database.
+
+    feature_class_name: str
+        Name of the output file, without the extension.
+
+    batch_size: int
+        The number of candidate wells processed at a time.
+
+    file_format: str
+        'npz' or 'parquet' for a typed columnar file with one row group per
+        batch (see columnar), or 'csv' to write the calculated_data_to_csv
+        text straight away. The csv view of a columnar file can be made later
+        with columnar.results_to_csv.
+
+    Returns
+    -------
+    file_name: str
+        The name of the file written.
+
+    rows: int
+        The number of confirmed wells written.
+    """
+    utm_e, utm_n, aquifer = locate_wells([target_well])[int(target_well)]
+    index = load_aquifer_index(aquifer, get_reader().source(allwells),
+                               read_aquifer_wells)
+    rows = index.tree.query_ball_point([utm_e, utm_n], radius)
+    batches = candidate_batches(index, rows, batch_size)
+    return _write(calculation_batches(batches, error_bounds),
+                  feature_class_name, file_format)
+
+def stream_aquifers(aquifers, error_bounds, feature_class_name,
+                    batch_size=BATCH_SIZE, file_format='npz'):
+    """Streams every well of one or more aquifers to a results file.
+
+    Parameters
+    ----------
+    aquifers: list[str]
+        The aquifer codes to calculate, e.g. statewide.list_aquifers().
+
+    error_bounds, feature_class_name, batch_size, file_format:
+        Same as stream_target.
+
+    Returns
+    -------
+    file_name, rows:
+        Same as stream_target.
+    """
+    source = get_reader().source(allwells)
+
+    def batches():
+        for aquifer in aquifers:
+            index = load_aquifer_index(aquifer, source, read_aquifer_wells)
+            yield from candidate_batches(index, batch_size=batch_size)
+
+    return _write(calculation_batches(batches(), error_bounds),
+                  feature_class_name, file_format)
@@ -0,0 +1,272 @@
+"""Pluggable readers for the CWI attribute tables.
+
+Every function that reads allwells, C5PL or CWI_hydro goes through
+search_cursor instead of calling arcpy.da.SearchCursor directly. The reader
+behind search_cursor can be the ArcGIS cursor or a local SQLite/GeoPackage
+database, so the pipeline also runs on machines without arcpy.
+
+Classes
+-------
+ArcpyReader: Reads tables with arcpy.da.SearchCursor.
+
+SQLiteReader: Reads tables from a SQLite database or GeoPackage. The field
+    list becomes the SELECT list and the where clause runs natively in SQLite.
+
+Functions
+---------
+get_reader: Returns the reader used by search_cursor.
+
+set_reader: Replaces the reader used by search_cursor.
+
+search_cursor: Drop-in replacement for arcpy.da.SearchCursor.
+
+search_wellids: Streams the rows of a table that belong to a list of WELLIDs.
+    The list is split into bounded chunks that are issued concurrently when
+    the reader allows it.
+
+copy_table_to_sqlite: Copies the fields of a table into a SQLite database
+    so it can be read with SQLiteReader.
+
+Notes
+-----
+    The reader is chosen from BACKEND in data_location ('arcpy' or 'sqlite').
+    The environment variables CWI_BACKEND and CWI_SQLITE_DATABASE override
+    BACKEND and SQLITE_DATABASE, which is convenient on batch nodes that do
+    not share the Windows paths in data_location.
+
+    SQLiteReader finds a table by the last part of its path without the file
+    extension, e.g. allwells, C5PL and CWI_hydro.
+
+-------------------------------------------------------------------------------
+"""
+import os
+import re
+import sqlite3
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from data_location import BACKEND, SQLITE_DATABASE
+
+WELLID_CHUNK_SIZE = 900 #stays under SQLite's default limit of 999 parameters
+MAX_WORKERS = 4
+
+class ArcpyReader:
+    """Reads tables with arcpy.da.SearchCursor."""
+
+    concurrent = False #arcpy cursors are not shared between threads
+
+    def source(self, table):
+        """Returns the path whose modification stamp identifies table."""
+        return table
+
+    @staticmethod
+    def wellid_clause(well_ids):
+        """Returns a WELLID in (...) clause and its (empty) parameters."""
+        return f"WELLID in ({', '.join(str(int(i)) for i in well_ids)})", ()
+
+    @contextmanager
+    def search(self, table, field_names, where_clause=None, parameters=()):
+        """Yields the rows of table as tuples of field_names."""
+        import arcpy
+        with arcpy.da.SearchCursor(table, field_names, where_clause) as cursor:
+            yield cursor
+
+
+class SQLiteReader:
+    """Reads tables from a SQLite database or GeoPackage.
+
+    Parameters
+    ----------
+    database: str
+        Path of the SQLite database or GeoPackage.
+    """
+
+    concurrent = True #every search opens its own connection
+
+    def __init__(self, database):
+        self.database = database
+
+    def source(self, table):
+        """Returns the path whose modification stamp identifies table."""
+        return self.database
+
+    @staticmethod
+    def wellid_clause(well_ids):
+        """Returns a parameterised WELLID in (?, ...) clause and its values."""
+        marks = ', '.join('?' for i in well_ids)
+        return f"WELLID in ({marks})", tuple(int(i) for i in well_ids)
+
+    @staticmethod
+    def table_name(table):
+        """Returns the SQLite table name of a data_location path."""
+        name = re.split(r'[\\/]', table)[-1]
+        return os.path.splitext(name)[0]
+
+    @contextmanager
+    def search(self, table, field_names, where_clause=None, parameters=()):
+        """Yields the rows of table as tuples of field_names."""
+        fields = ', '.join(f'"{i}"' for i in field_names)
+        query = f'SELECT {fields} FROM "{self.table_name(table)}"'
+        if where_clause:
+            query += f' WHERE {where_clause}'
+        connection = sqlite3.connect(self.database, check_same_thread=False)
+        try:
+            yield connection.execute(query, parameters)
+        finally:
+            connection.close()
+
+
+def _default_reader():
+    """Builds the reader selected in data_location or the environment."""
+    backend = os.environ.get('CWI_BACKEND', BACKEND).lower()
+    if backend == 'arcpy':
+        return ArcpyReader()
+    if backend in ('sqlite', 'geopackage', 'gpkg'):
+        return SQLiteReader(os.environ.get('CWI_SQLITE_DATABASE', SQLITE_DATABASE))
+    raise ValueError(f"Unknown table backend: {backend}")
+
+_reader = None
+
+def get_reader():
+    """Returns the reader used by search_cursor."""
+    global _reader
+    if _reader is None:
+        _reader = _default_reader()
+    return _reader
+
+def set_reader(reader):
+    """Replaces the reader used by search_cursor.
+
+    Parameters
+    ----------
+    reader: ArcpyReader, SQLiteReader or any object with the same methods
+        The reader used for every following table read.
+    """
+    global _reader
+    _reader = reader
+
+def search_cursor(table, field_names, where_clause=None):
+    """Drop-in replacement for arcpy.da.SearchCursor.
+
+    Parameters
+    ----------
+    table: str
+        Path of the table in data_location.
+
+    field_names: list[str]
+        Fields returned for every row, in order.
+
+    where_clause: str
+        SQL where clause used to filter the rows.
+
+    Returns
+    -------
+    cursor: context manager
+        Yields an iterable of tuples, one per row.
+    """
+    return get_reader().search(table, field_names, where_clause)
+
+def search_wellids(table, field_names, where_clause, well_ids,
+                   chunk_size=WELLID_CHUNK_SIZE, max_workers=MAX_WORKERS):
+    """Streams the rows of a table that belong to a list of WELLIDs.
+
+    Parameters
+    ----------
+    table: str
+        Path of the table in data_location.
+
+    field_names: list[str]
+        Fields returned for every row, in order.
+
+    where_clause: str
+        SQL where clause applied in addition to the WELLID selection. May be
+        None.
+
+    well_ids: list[int]
+        The WELLIDs to select. Duplicates are ignored.
+
+    chunk_size: int
+        The largest number of WELLIDs in one query.
+
+    max_workers: int
+        The largest number of queries issued at the same time when the
+        reader allows concurrent searches.
+
+    Yields
+    ------
+    row: tuple
+        One tuple of field_names per selected row.
+
+    Notes
+    -----
+    The WELLIDs are sorted and split into chunks so no query grows past a
+    fixed length. Rows are yielded chunk by chunk in ascending WELLID order of
+    the chunks, and every WELLID falls in exactly one chunk, so the rows of a
+    single well keep the order the table returns them in.
+
+    With concurrent searches at most 2*max_workers chunks are read ahead of
+    the chunk being yielded, so memory does not grow with len(well_ids).
+    """
+    reader = get_reader()
+    well_ids = sorted({int(i) for i in well_ids})
+    chunks = [well_ids[i:i + chunk_size] for i in range(0, len(well_ids),
+                                                           chunk_size)]
+
+    def read_chunk(chunk):
+        clause, parameters = reader.wellid_clause(chunk)
+        if where_clause:
+            clause = f"({where_clause}) AND {clause}"
+        with reader.search(table, field_names, clause, parameters) as cursor:
+            return [tuple(row) for row in cursor]
+
+    if len(chunks) <= 1 or not getattr(reader, 'concurrent', False):
+        for chunk in chunks:
+            yield from read_chunk(chunk)
+        return
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            if len(pending) >= 2*max_workers:
+                yield from pending.popleft().result()
+            pending.append(executor.submit(read_chunk, chunk))
+        while pending:
+            yield from pending.popleft().result()
+
+def copy_table_to_sqlite(table, field_names, database, reader=None):
+    """Copies a table into a SQLite database for use with SQLiteReader.
+
+    Parameters
+    ----------
+    table: str
+        Path of the table in data_location.
+
+    field_names: list[str]
+        Fields to copy.
+
+    database: str
+        Path of the SQLite database. It is created if it does not exist and
+        an existing table of the same name is replaced.
+
+    reader: ArcpyReader, SQLiteReader
+        Reader of the source table. The default is an ArcpyReader.
+
+    Notes
+    -----
+    An index is created on WELLID when it is one of the copied fields.
+    """
+    reader = ArcpyReader() if reader is None else reader
+    name = SQLiteReader.table_name(table)
+    fields = ', '.join(f'"{i}"' for i in field_names)
+    marks = ', '.join('?' for i in field_names)
+    connection = sqlite3.connect(database)
+    try:
+        with connection:
+            connection.execute(f'DROP TABLE IF EXISTS "{name}"')
+            connection.execute(f'CREATE TABLE "{name}" ({fields})')
+            with reader.search(table, field_names) as cursor:
+                connection.executemany(
+                    f'INSERT INTO "{name}" ({fields}) VALUES ({marks})', cursor)
+            if 'WELLID' in field_names:
+                connection.execute(f'CREATE INDEX "{name}_WELLID" ON "{name}" ("WELLID")')
+    finally:
+        connection.close()
@@ -0,0 +1,77 @@
+"""Puts the repository folder on sys.path so the tests can import the flat
+top-level modules, and provides a small synthetic copy of the CWI tables."""
+import os
+import sqlite3
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+AQUIFERS = ['CJDN', 'QBAA', 'CTCG']
+
+
+def make_cwi_database(path, n=3000, seed=0):
+    """Writes allwells, C5PL and CWI_hydro tables for n wells to path."""
+    rng = np.random.default_rng(seed)
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE allwells (UTME, UTMN, AQUIFER, '
+                       'CASE_DEPTH, DEPTH_DRLL, CASE_DIAM, WELLID)')
+    connection.execute('CREATE TABLE C5PL (FLOW_RATE, DURATION, START_MEAS, '
+                       'PUMP_MEAS, WELLID)')
+    connection.execute('CREATE TABLE CWI_hydro (AQ_THICK, WELLID)')
+    allwells = []
+    pump_log = []
+    thickness = []
+    for well_id in range(1, n + 1):
+        case_depth = float(rng.uniform(20, 100))
+        allwells.append((int(rng.integers(4.0e5, 4.2e5)),
+                         int(rng.integers(4.90e6, 4.92e6)),
+                         str(rng.choice(AQUIFERS)), case_depth,
+                         case_depth + float(rng.uniform(20, 150)),
+                         [4, 6, 8, 12, None][rng.integers(5)], well_id))
+        #some wells have no pump test and some have two
+        for _ in range(int(rng.choice([0, 1, 1, 2]))):
+            static = float(rng.uniform(5, 100))
+            pump_log.append((float(rng.uniform(10, 500)),
+                             int(rng.choice([1, 2, 4, 8, 24])), static,
+                             static + float(rng.uniform(1, 80)), well_id))
+        if rng.random() < 0.8:
+            thickness.append((float(rng.uniform(20, 300)), well_id))
+    connection.executemany('INSERT INTO allwells VALUES (?, ?, ?, ?, ?, ?, ?)',
+                           allwells)
+    connection.executemany('INSERT INTO C5PL VALUES (?, ?, ?, ?, ?)', pump_log)
+    connection.executemany('INSERT INTO CWI_hydro VALUES (?, ?)', thickness)
+    connection.commit()
+    connection.close()
+    return path
+
+
+@pytest.fixture(scope='session')
+def cwi_database(tmp_path_factory):
+    """Path of a synthetic SQLite copy of the CWI tables."""
+    return make_cwi_database(str(tmp_path_factory.mktemp('cwi')/'cwi.sqlite'))
+
+
+@pytest.fixture
+def sqlite_reader(cwi_database):
+    """Reads the synthetic CWI tables with SQLiteReader during one test."""
+    import table_reader
+    previous = table_reader._reader
+    reader = table_reader.SQLiteReader(cwi_database)
+    table_reader.set_reader(reader)
+    yield reader
+    table_reader.set_reader(previous)
+
+
+@pytest.fixture
+def index_dir(tmp_path, monkeypatch):
+    """Saves the spatial indexes built during one test under tmp_path."""
+    import functools
+    import spatial_index
+    folder = str(tmp_path/'spatial_index')
+    load = functools.partial(spatial_index.load_aquifer_index, index_dir=folder)
+    for name in ['data_retrieve', 'statewide', 'streaming', 'bulk_analysis']:
+        monkeypatch.setattr(f'{name}.load_aquifer_index', load)
+    return folder
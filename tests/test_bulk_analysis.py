@@ -0,0 +1,56 @@
+"""Tests for bulk_analysis."""
+import os
+import numpy as np
+from bulk_analysis import analyze_targets, main, read_targets
+from data_retrieve import find_wells, pump_log, aquifer_thickness,\
+storativity_calculations, data_organization
+from Transmissivity import transmissivity_calculations, conductivity_calculations
+
+
+def _live(target_well, radius, error_bounds):
+    """Runs the analyze_wells pipeline for one target."""
+    candidate_wells = find_wells(target_well, radius, error_bounds)
+    pump_log_results = pump_log(candidate_wells, error_bounds)
+    thickness_data = aquifer_thickness(candidate_wells, error_bounds)
+    confirmed_wells = data_organization(
+        candidate_wells, pump_log_results,
+        storativity_calculations(candidate_wells, thickness_data))
+    T = transmissivity_calculations(confirmed_wells)
+    return (candidate_wells, confirmed_wells, T,
+            conductivity_calculations(confirmed_wells, T))
+
+
+def test_matches_per_target_pipeline(sqlite_reader, index_dir):
+    #neighbors of well 5 in its own aquifer, so the radii overlap
+    neighbors = [row[5] for row in find_wells(5, 2000, 5) if row[5] != 5][:2]
+    targets = [(5, 3000, 5), (neighbors[0], 2500, 5), (neighbors[1], 3000, 10),
+               (5, 1500, 10), (2900, 5000, 0), (10**9, 3000, 5),
+               (5, 3000, 5)]
+    results = analyze_targets(targets)
+    assert [i['target'] for i in results] == targets
+    shared = {row[5] for row in results[0]['candidate_wells']}
+    assert shared & {row[5] for row in results[1]['candidate_wells']} - {5}
+    for target, result in zip(targets, results):
+        if target[0] == 10**9:
+            assert result['candidate_wells'] is None
+            assert result['confirmed_wells'] is None
+            continue
+        candidate_wells, confirmed_wells, T, K = _live(*target)
+        assert len(confirmed_wells) > 0
+        assert result['candidate_wells'] == candidate_wells
+        np.testing.assert_array_equal(result['confirmed_wells'],
+                                      confirmed_wells)
+        np.testing.assert_array_equal(result['transmissivity'], T)
+        np.testing.assert_array_equal(result['conductivity'], K)
+
+
+def test_command_line(sqlite_reader, index_dir, tmp_path, capsys):
+    targets = str(tmp_path/'targets.csv')
+    with open(targets, 'w') as outfile:
+        outfile.write("WELLID,radius,error_bounds\n5,3000,5\n\n"
+                      "1000000000,3000,5\n")
+    assert read_targets(targets) == [(5, 3000.0, 5.0), (10**9, 3000.0, 5.0)]
+    output = str(tmp_path/'out')
+    main([targets, '-o', output])
+    assert os.listdir(output) == ['5_3000_5.csv']
+    assert 'Well ID 1000000000 not found.' in capsys.readouterr().out
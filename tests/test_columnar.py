@@ -0,0 +1,59 @@
+"""Tests for columnar."""
+import numpy as np
+import pytest
+from columnar import RESULT_FIELDS, ResultWriter, read_results,\
+results_statistics, results_to_csv, write_results
+from data_to_csv import CSV_HEADER, calculated_data_to_csv
+from well_batch import empty_well_batch
+
+
+def _batch(n, seed=0):
+    rng = np.random.default_rng(seed)
+    batch = empty_well_batch(n)
+    batch['UTME'] = rng.uniform(4e5, 5e5, n)
+    batch['UTMN'] = rng.uniform(4.9e6, 5e6, n)
+    batch['AQUIFER'] = 'CJDN'
+    batch['WELLID'] = np.arange(n) + 1000
+    T = np.sort(rng.uniform(10, 1000, (n, 3)), axis=1)
+    K = T/50
+    return batch, T, K
+
+
+@pytest.mark.parametrize('extension', ['npz', 'parquet'])
+def test_round_trip(tmp_path, extension):
+    if extension == 'parquet':
+        pytest.importorskip('pyarrow')
+    file_name = str(tmp_path/f"results.{extension}")
+    batch, T, K = _batch(30)
+    rows = write_results([(batch[:10], T[:10], K[:10]),
+                          (batch[10:], T[10:], K[10:])], file_name)
+    assert rows == 30
+    results = read_results(file_name, memory_map=True)
+    np.testing.assert_array_equal(results['WELLID'], batch['WELLID'])
+    np.testing.assert_array_equal(results['AQUIFER'], batch['AQUIFER'])
+    assert results['WELLID'].dtype == np.int64
+    np.testing.assert_array_equal(
+        np.column_stack([results[i] for i in RESULT_FIELDS]),
+        np.column_stack((T, K)))
+
+
+def test_csv_view_matches_calculated_data_to_csv(tmp_path):
+    batch, T, K = _batch(12)
+    file_name = str(tmp_path/"results.npz")
+    write_results([(batch[:5], T[:5], K[:5]), (batch[5:], T[5:], K[5:])],
+                  file_name)
+    view, rows = results_to_csv(file_name, str(tmp_path/"view"))
+    direct = calculated_data_to_csv(T, K, batch, str(tmp_path/"direct"))[1]
+    assert rows == 12
+    with open(view) as a, open(direct) as b:
+        assert a.read() == b.read()
+
+
+def test_empty_results_file(tmp_path):
+    file_name = str(tmp_path/"empty.npz")
+    ResultWriter(file_name).close()
+    raw_csv_name, rows = results_to_csv(file_name, str(tmp_path/"empty"))
+    assert rows == 0
+    with open(raw_csv_name) as infile:
+        assert infile.read().strip() == ",".join(CSV_HEADER)
+    assert results_statistics(file_name).count.sum() == 0
@@ -0,0 +1,89 @@
+"""Tests for data_retrieve."""
+import numpy as np
+import pytest
+from data_retrieve import aquifer_thickness, data_organization, find_wells,\
+pump_log, retrieve_well_data
+from well_batch import as_well_batch
+
+
+def _nested_loop_join(candidate_wells, pump_log_results,
+                      thickness_storativity_data):
+    """The triple loop data_organization used before the hash join."""
+    confirmed_wells = []
+    for item in pump_log_results:
+        for row in candidate_wells:
+            if row[5] != item[7]:
+                continue
+            for data in thickness_storativity_data:
+                if row[5] == item[7] == data[5]:
+                    confirmed_wells.append([row, item, data])
+    return as_well_batch(confirmed_wells)
+
+
+def _inputs(seed=0):
+    rng = np.random.default_rng(seed)
+    #duplicate and missing Well IDs in every table
+    candidate_ids = rng.integers(0, 60, 80)
+    pump_ids = rng.integers(0, 60, 90)
+    thickness_ids = rng.choice(60, 45, replace=False)
+    candidate_wells = [[float(rng.uniform(1e5, 7e5)), float(rng.uniform(4.8e6, 5.4e6)),
+                        'CJDN', float(rng.uniform(5, 60)),
+                        float(rng.uniform(0.1, 0.5)), int(i)]
+                       for i in sorted(candidate_ids)]
+    pump_log_results = [[float(rng.uniform(500, 900)), float(rng.uniform(900, 1100)),
+                         float(rng.uniform(1100, 1500)), float(rng.uniform(0.1, 1)),
+                         float(rng.uniform(5, 10)), float(rng.uniform(10, 20)),
+                         float(rng.uniform(20, 30)), int(i)]
+                        for i in sorted(pump_ids)]
+    thickness_storativity_data = [[float(rng.uniform(50, 100)), float(rng.uniform(100, 150)),
+                                   float(rng.uniform(150, 200)), 1e-4, 2e-4, int(i)]
+                                  for i in sorted(thickness_ids)]
+    return candidate_wells, pump_log_results, thickness_storativity_data
+
+
+def test_matches_nested_loop_join():
+    inputs = _inputs()
+    expected = _nested_loop_join(*inputs)
+    result = data_organization(*inputs)
+    assert len(expected) > 0
+    np.testing.assert_array_equal(result, expected)
+
+
+def test_report_counts_unmatched_rows():
+    candidate_wells, pump_log_results, thickness_storativity_data = _inputs(1)
+    confirmed_wells, join_report = data_organization(
+        candidate_wells, pump_log_results, thickness_storativity_data,
+        report=True)
+    matched = set(confirmed_wells['WELLID'].tolist())
+    assert join_report['candidate_wells'] == \
+        sum(row[5] not in matched for row in candidate_wells)
+    assert join_report['pump_log_results'] == \
+        sum(row[7] not in matched for row in pump_log_results)
+    assert join_report['thickness_storativity_data'] == \
+        sum(row[5] not in matched for row in thickness_storativity_data)
+
+
+def test_empty_inputs():
+    candidate_wells, pump_log_results, thickness_storativity_data = _inputs()
+    for inputs in [([], pump_log_results, thickness_storativity_data),
+                   (candidate_wells, [], thickness_storativity_data),
+                   (candidate_wells, pump_log_results, []),
+                   ([], [], [])]:
+        confirmed_wells = data_organization(*inputs)
+        assert len(confirmed_wells) == 0
+        assert confirmed_wells.dtype == _nested_loop_join(*inputs).dtype
+
+
+@pytest.mark.parametrize('target_well, radius', [(5, 3000), (2900, 20000)])
+def test_retrieve_well_data_matches_serial(sqlite_reader, index_dir,
+                                           target_well, radius):
+    candidate_wells = find_wells(target_well, radius, 5)
+    expected = (pump_log(candidate_wells, 5),
+                aquifer_thickness(candidate_wells, 5))
+    assert len(expected[0]) > 0 and len(expected[1]) > 0
+    for concurrent in [True, False, None]:
+        pump_log_results, thickness_data, timings = retrieve_well_data(
+            candidate_wells, 5, concurrent)
+        assert pump_log_results == expected[0]
+        assert thickness_data == expected[1]
+        assert set(timings) == {'pump_log', 'aquifer_thickness', 'total'}
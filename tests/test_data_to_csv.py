@@ -0,0 +1,46 @@
+"""Tests for data_to_csv.grouped_statistics."""
+import numpy as np
+import pandas as pd
+import pytest
+from data_to_csv import GROUP_COLUMNS, grouped_statistics
+
+
+def _results(n, seed=0):
+    rng = np.random.default_rng(seed)
+    results = {'AQUIFER': rng.choice(['CJDN', 'QBAA', 'OPDC'], n),
+               'UTME': rng.uniform(2e5, 3e5, n),
+               'UTMN': rng.uniform(4.9e6, 5.0e6, n)}
+    for name in GROUP_COLUMNS:
+        results[name] = 10**rng.normal(2, 1, n)
+    results['T'][:50] = np.nan
+    results['K'][results['AQUIFER'] == 'OPDC'] = np.nan
+    return results
+
+
+def test_matches_groupby_describe():
+    results = _results(5000)
+    grouped = grouped_statistics(results, ('AQUIFER', 'CELL'), 25000)
+    frame = pd.DataFrame(results)
+    frame['CELL_UTME'] = (np.floor(frame['UTME']/25000) + 0.5)*25000
+    frame['CELL_UTMN'] = (np.floor(frame['UTMN']/25000) + 0.5)*25000
+    keys = ['AQUIFER', 'CELL_UTME', 'CELL_UTMN']
+    pd.testing.assert_frame_equal(grouped[keys],
+                                  frame[keys].drop_duplicates().sort_values(keys)
+                                  .reset_index(drop=True))
+    statistics = ['count', 'mean', 'std', 'min', 'p25', 'median', 'p75', 'max']
+    for name, label in GROUP_COLUMNS.items():
+        described = frame.groupby(keys)[name].describe()
+        np.testing.assert_allclose(
+            grouped[[f"{label}_{i}" for i in statistics]].to_numpy(),
+            described.to_numpy(), rtol=1e-12, equal_nan=True)
+
+
+def test_cell_size_required():
+    with pytest.raises(ValueError):
+        grouped_statistics(_results(10), 'CELL')
+
+
+def test_empty_results():
+    results = {name: values[:0] for name, values in _results(10).items()}
+    grouped = grouped_statistics(results, 'AQUIFER')
+    assert len(grouped) == 0
@@ -0,0 +1,32 @@
+"""Tests for interval."""
+import numpy as np
+from interval import Interval, decreasing, increasing, monotone
+
+
+def test_arithmetic_bounds():
+    a = Interval([1.0, -2.0], [2.0, 0.0], [3.0, 1.0])
+    b = Interval([2.0, 1.0], [3.0, 2.0], [4.0, 4.0])
+    np.testing.assert_allclose((a + b).columns(), [[3, 5, 7], [-1, 2, 5]])
+    np.testing.assert_allclose((a - b).columns(), [[-3, -1, 1], [-6, -2, 0]])
+    np.testing.assert_allclose((a*b).columns(), [[2, 6, 12], [-8, 0, 4]])
+    np.testing.assert_allclose((a/b).columns(), [[0.25, 2/3, 1.5], [-2, 0, 1]])
+    np.testing.assert_allclose((-a).columns(), [[-3, -2, -1], [-1, 0, 2]])
+    np.testing.assert_allclose((1 - a).columns(), [[-2, -1, 0], [0, 1, 3]])
+
+
+def test_from_columns_round_trip():
+    columns = np.arange(12.0).reshape(4, 3)
+    interval = Interval.from_columns(columns)
+    assert len(interval) == 4
+    np.testing.assert_array_equal(interval.columns(), columns)
+    np.testing.assert_array_equal(interval[1:3].columns(), columns[1:3])
+
+
+def test_monotone_corners():
+    x = Interval(1.0, 2.0, 3.0)
+    y = Interval(10.0, 20.0, 30.0)
+    np.testing.assert_allclose(increasing(np.add, x, y).columns(), [11, 22, 33])
+    np.testing.assert_allclose(decreasing(lambda x, y: -x - y, x, y).columns(),
+                               [-33, -22, -11])
+    np.testing.assert_allclose(monotone(np.subtract, (x, y), (1, -1)).columns(),
+                               [-29, -18, -7])
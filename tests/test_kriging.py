@@ -0,0 +1,93 @@
+"""Tests for kriging."""
+import numpy as np
+import pytest
+from kriging import cross_validate, fit_variogram, ordinary_kriging, spherical
+
+PARAMS = (0.1, 1.0, 400.0)
+
+
+def _samples(n, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(0, 1000, n)
+    y = rng.uniform(0, 1000, n)
+    z = np.sin(x/200) + np.cos(y/300) + rng.normal(scale=0.2, size=n)
+    return x, y, z
+
+
+def _dense_kriging(x, y, z, xi, yi, params):
+    """Solves one ordinary kriging system with every sample."""
+    xy = np.column_stack((x, y))
+    n = len(z)
+    matrix = np.ones((n + 1, n + 1))
+    matrix[n, n] = 0
+    matrix[:n, :n] = spherical(np.hypot(*(xy[:, None] - xy[None]).T), *params)
+    right = np.ones(n + 1)
+    right[:n] = spherical(np.hypot(x - xi, y - yi), *params)
+    weights = np.linalg.solve(matrix, right)
+    return weights[:n] @ z, weights @ right
+
+
+def test_matches_dense_system():
+    x, y, z = _samples(40)
+    xi = np.array([10.0, 500.0, 990.0])
+    yi = np.array([20.0, 480.0, 5.0])
+    estimate, variance = ordinary_kriging(x, y, z, xi, yi, 'spherical',
+                                          PARAMS, k=40)
+    for i in range(len(xi)):
+        expected = _dense_kriging(x, y, z, xi[i], yi[i], PARAMS)
+        np.testing.assert_allclose([estimate[i], variance[i]], expected,
+                                   rtol=1e-9)
+
+
+def test_exact_at_samples():
+    x, y, z = _samples(60, seed=1)
+    estimate, variance = ordinary_kriging(x, y, z, x[:10], y[:10],
+                                          'spherical', (0.0, 1.0, 400.0))
+    np.testing.assert_allclose(estimate, z[:10], atol=1e-9)
+    np.testing.assert_allclose(variance, 0, atol=1e-9)
+
+
+def test_no_samples_within_radius():
+    x, y, z = _samples(20, seed=2)
+    estimate, variance = ordinary_kriging(x, y, z, [1e6], [1e6], 'spherical',
+                                          PARAMS, radius=100)
+    assert np.isnan(estimate).all() and np.isnan(variance).all()
+
+
+def test_fit_variogram_recovers_model():
+    separ = np.linspace(25, 975, 20)
+    gamma = spherical(separ, *PARAMS)
+    params = fit_variogram(separ, gamma, np.full(20, 100), 'spherical')
+    np.testing.assert_allclose(params, PARAMS, rtol=1e-6)
+
+
+def test_fit_variogram_needs_three_bins():
+    with pytest.raises(ValueError):
+        fit_variogram([1.0, 2.0, np.nan], [0.1, 0.2, 0.3], [5, 5, 5])
+
+
+def test_cross_validate_matches_leave_one_out():
+    x, y, z = _samples(50, seed=3)
+    x[1], y[1] = x[0], y[0] #coincident samples are kept
+    estimate, variance, statistics = cross_validate(x, y, z, 'spherical',
+                                                    PARAMS, k=8, processes=1,
+                                                    batch_size=16)
+    for i in range(len(z)):
+        keep = np.arange(len(z)) != i
+        expected = ordinary_kriging(x[keep], y[keep], z[keep], x[i:i + 1],
+                                    y[i:i + 1], 'spherical', PARAMS, k=8)
+        np.testing.assert_allclose([estimate[i], variance[i]],
+                                   np.ravel(expected), rtol=1e-9)
+    assert statistics['n'] == len(z)
+    np.testing.assert_allclose(statistics['RMSE'],
+                               np.sqrt(np.mean((estimate - z)**2)))
+
+
+def test_cross_validate_does_not_depend_on_processes():
+    x, y, z = _samples(80, seed=4)
+    serial = cross_validate(x, y, z, 'spherical', PARAMS, processes=1,
+                            batch_size=16)
+    parallel = cross_validate(x, y, z, 'spherical', PARAMS, processes=2,
+                              batch_size=16)
+    np.testing.assert_array_equal(serial[0], parallel[0])
+    np.testing.assert_array_equal(serial[1], parallel[1])
@@ -0,0 +1,38 @@
+"""Tests for lambert_w."""
+import numpy as np
+from lambert_w import BRANCH_POINT, lambertw_m1
+
+
+def test_known_values():
+    x = np.array([-0.36, -0.3, -0.2, -0.1, -1e-3, -1e-10, -1e-300])
+    expected = np.array([-1.2227701339785066, -1.7813370234216275,
+                         -2.5426413577735265, -3.577152063957297,
+                         -9.11800647040274, -26.295238819246926,
+                         -697.3227762954601])
+    w, out_of_domain = lambertw_m1(x)
+    np.testing.assert_allclose(w, expected, rtol=1e-14)
+    assert not out_of_domain.any()
+
+
+def test_branch_point():
+    w, out_of_domain = lambertw_m1(BRANCH_POINT)
+    assert w == -1
+    assert not out_of_domain
+
+
+def test_near_branch_point():
+    #W_-1 is -1 - sqrt(2(1 + e*x)) to first order, so compare w*exp(w) with x
+    x = BRANCH_POINT + np.logspace(-16, -2, 57)
+    w, out_of_domain = lambertw_m1(x)
+    assert not out_of_domain.any()
+    assert np.all(w <= -1)
+    assert np.all(np.diff(w) <= 0)
+    np.testing.assert_allclose(w*np.exp(w), x, rtol=1e-15, atol=0)
+
+
+def test_out_of_domain():
+    w, out_of_domain = lambertw_m1([-0.5, np.nextafter(BRANCH_POINT, -1),
+                                    0.0, 0.1, np.nan])
+    np.testing.assert_array_equal(out_of_domain, [True, True, True, True, True])
+    assert np.isnan(w[[0, 1, 3, 4]]).all()
+    assert w[2] == -np.inf
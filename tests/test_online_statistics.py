@@ -0,0 +1,61 @@
+"""Tests for online_statistics."""
+import numpy as np
+import pandas as pd
+from online_statistics import QuantileSketch, StatisticsAccumulator
+
+COLUMNS = ['T_min', 'T_raw', 'T_max']
+
+
+def _values(n, seed=0):
+    rng = np.random.default_rng(seed)
+    values = 10**rng.normal(2, 1, size=(n, len(COLUMNS)))
+    values[::17, 1] = np.nan
+    return values
+
+
+def test_summary_matches_describe():
+    values = _values(5000)
+    statistics = StatisticsAccumulator(COLUMNS)
+    for batch in np.array_split(values, 7):
+        statistics.update(batch)
+    summary = statistics.summary()
+    described = pd.DataFrame(values, columns=COLUMNS).describe()
+    np.testing.assert_allclose(summary.iloc[:8].to_numpy(), described.to_numpy(),
+                               rtol=1e-10)
+    np.testing.assert_allclose(summary.loc['Logrithmic Mean'],
+                               np.log10(described.loc['mean']), rtol=1e-12)
+
+
+def test_merge_matches_single_pass():
+    values = _values(3000, seed=1)
+    single = StatisticsAccumulator(COLUMNS)
+    single.update(values)
+    left = StatisticsAccumulator(COLUMNS)
+    right = StatisticsAccumulator(COLUMNS)
+    left.update(values[:1000])
+    right.update(values[1000:])
+    left.merge(right)
+    pd.testing.assert_frame_equal(left.summary(), single.summary(),
+                                  rtol=1e-10)
+
+
+def test_sketch_relative_accuracy():
+    values = _values(200000, seed=2)
+    statistics = StatisticsAccumulator(COLUMNS, relative_accuracy=0.01,
+                                       exact_limit=1000)
+    for batch in np.array_split(values, 20):
+        statistics.update(batch)
+    for column in range(len(COLUMNS)):
+        column_values = np.sort(values[~np.isnan(values[:, column]), column])
+        for q in (0.25, 0.5, 0.75):
+            exact = column_values[int(np.rint(q*(len(column_values) - 1)))]
+            approximate = statistics.quantile(q)[0, column]
+            assert abs(approximate - exact) <= 0.01*exact
+
+
+def test_sketch_signed_values():
+    sketch = QuantileSketch(0.01)
+    sketch.update([-100.0, -1.0, 0.0, 0.0, 1.0, 100.0, np.nan])
+    assert sketch.count == 6
+    quantiles = sketch.quantile([0, 0.5, 1])
+    np.testing.assert_allclose(quantiles, [-100, 0, 100], rtol=0.01)
@@ -0,0 +1,91 @@
+"""Tests for point_layer."""
+import sqlite3
+import numpy as np
+from point_layer import DBF_FIELDS, GPKG_POINT_DTYPE, POINT_FIELDS, \
+SHP_RECORD_DTYPE, write_geopackage, write_point_layer, write_shapefile
+
+
+def _groups(sizes, seed=0):
+    rng = np.random.default_rng(seed)
+    groups = []
+    start = 0
+    for size in sizes:
+        group = {'WELLID': np.arange(start, start + size, dtype=np.int64),
+                 'AQUIFER': rng.choice(['CJDN', 'QBAA'], size),
+                 'UTME': rng.uniform(2e5, 7e5, size),
+                 'UTMN': rng.uniform(4.8e6, 5.4e6, size)}
+        for name in POINT_FIELDS[4:]:
+            group[name] = 10**rng.normal(0, 3, size)
+        group['K'][::7] = np.nan
+        groups.append(group)
+        start += size
+    return groups
+
+
+def _column(groups, name):
+    return np.concatenate([group[name] for group in groups])
+
+
+def test_geopackage(tmp_path):
+    groups = _groups([5, 0, 12])
+    file_name = str(tmp_path/'wells.gpkg')
+    assert write_geopackage(groups, file_name, batch_size=4) == 17
+    connection = sqlite3.connect(file_name)
+    rows = connection.execute(
+        f'SELECT geom, {", ".join(POINT_FIELDS)} FROM wells ORDER BY fid').fetchall()
+    extent = connection.execute(
+        "SELECT min_x, min_y, max_x, max_y, srs_id FROM gpkg_contents").fetchone()
+    connection.close()
+    points = np.frombuffer(b''.join(row[0] for row in rows), GPKG_POINT_DTYPE)
+    np.testing.assert_array_equal(points['x'], _column(groups, 'UTME'))
+    np.testing.assert_array_equal(points['y'], _column(groups, 'UTMN'))
+    for position, name in enumerate(POINT_FIELDS, 1):
+        values = [row[position] for row in rows]
+        expected = _column(groups, name)
+        if name == 'AQUIFER':
+            assert values == expected.tolist()
+        else:
+            values = np.array([np.nan if i is None else i for i in values])
+            np.testing.assert_array_equal(values, expected)
+    x, y = _column(groups, 'UTME'), _column(groups, 'UTMN')
+    assert extent == (x.min(), y.min(), x.max(), y.max(), 26915)
+
+
+def test_shapefile(tmp_path):
+    groups = _groups([9, 3])
+    assert write_point_layer(groups, str(tmp_path/'wells.shp')) == 12
+    shp = (tmp_path/'wells.shp').read_bytes()
+    assert int.from_bytes(shp[24:28], 'big')*2 == len(shp)
+    points = np.frombuffer(shp[100:], SHP_RECORD_DTYPE)
+    np.testing.assert_array_equal(points['number'], np.arange(1, 13))
+    np.testing.assert_array_equal(points['x'], _column(groups, 'UTME'))
+    shx = (tmp_path/'wells.shx').read_bytes()
+    offsets = np.frombuffer(shx[100:], '>i4')[::2]
+    np.testing.assert_array_equal(offsets*2, 100 + 28*np.arange(12))
+
+    dbf = (tmp_path/'wells.dbf').read_bytes()
+    assert int.from_bytes(dbf[4:8], 'little') == 12
+    header_length = int.from_bytes(dbf[8:10], 'little')
+    record_length = int.from_bytes(dbf[10:12], 'little')
+    records = dbf[header_length:header_length + 12*record_length]
+    position = 1
+    for name, kind, width, decimals in DBF_FIELDS:
+        values = [records[i*record_length + position:
+                          i*record_length + position + width].strip()
+                  for i in range(12)]
+        expected = _column(groups, name)
+        if kind == b'C':
+            assert [i.decode() for i in values] == expected.tolist()
+        else:
+            values = np.array([np.nan if i.startswith(b'*') else float(i)
+                               for i in values])
+            #15 decimals keep at least 12 significant digits above 1e-3
+            np.testing.assert_allclose(values, expected, rtol=1e-12)
+        position += width
+    assert dbf[-1:] == b'\x1a'
+
+
+def test_empty(tmp_path):
+    assert write_geopackage([], str(tmp_path/'empty.gpkg')) == 0
+    assert write_shapefile([], str(tmp_path/'empty.shp')) == 0
+    assert len((tmp_path/'empty.shp').read_bytes()) == 100
@@ -0,0 +1,111 @@
+"""Tests for raster."""
+import numpy as np
+import pytest
+from kriging import grid_points
+from raster import idw_raster, read_raster
+
+#extent that is not a multiple of the cell size in either direction
+EXTENT = (1000.0, 2000.0, 1975.0, 2830.0)
+CELL = 50.0
+
+
+def _wells(n=60, seed=0):
+    rng = np.random.default_rng(seed)
+    xmin, ymin, xmax, ymax = EXTENT
+    x = rng.uniform(xmin, xmax, n)
+    y = rng.uniform(ymin, ymax, n)
+    #put two wells on cell centers so those cells sit exactly on a well;
+    #more would tie for the k-th nearest well on other cells
+    x[:2] = xmin + CELL*(np.array([3, 14]) + 0.5)
+    y[:2] = ymax - CELL*(np.array([2, 11]) + 0.5)
+    values = 10**rng.uniform(0, 3, n)
+    return x, y, values
+
+
+def _brute_force(x, y, values, xi, yi, k, power, radius):
+    """IDW of one cell from every well, nearest first."""
+    distance = np.hypot(x - xi, y - yi)
+    order = np.argsort(distance, kind='stable')[:k]
+    order = order[distance[order] < radius]
+    if order.size == 0:
+        return np.nan
+    if distance[order[0]] == 0:
+        return values[order][distance[order] == 0].mean()
+    weights = distance[order]**-float(power)
+    return (weights*values[order]).sum()/weights.sum()
+
+
+def test_grid_is_anchored_at_the_north_west_corner(tmp_path):
+    x, y, values = _wells()
+    name = str(tmp_path/'t')
+    raster = idw_raster(x, y, values, *EXTENT, CELL, name)
+    _, metadata = read_raster(name)
+    xmin, ymin, xmax, ymax = EXTENT
+    assert raster.shape == (16, 19)
+    assert metadata['xmin'] == xmin and metadata['ymax'] == ymax
+    assert metadata['xmax'] == xmin + 19*CELL
+    assert metadata['ymin'] == ymax - 16*CELL
+    assert (metadata['nrows'], metadata['ncols']) == raster.shape
+    with open(name + '.wld') as infile:
+        world = [float(line) for line in infile]
+    assert world == [CELL, 0, 0, -CELL, xmin + CELL/2, ymax - CELL/2]
+
+    #kriging.grid_points returns the centers of the same cells
+    xi, yi = grid_points(*EXTENT, CELL)
+    assert xi.shape == raster.shape
+    assert xi[0, 0] == world[4] and yi[0, 0] == world[5]
+    np.testing.assert_array_equal(xi[0], world[4] + CELL*np.arange(19))
+    np.testing.assert_array_equal(yi[:, 0], world[5] - CELL*np.arange(16))
+
+
+@pytest.mark.parametrize('radius', [np.inf, 120.0])
+def test_matches_brute_force(tmp_path, radius):
+    x, y, values = _wells()
+    raster = idw_raster(x, y, values, *EXTENT, CELL, str(tmp_path/'t'), k=5,
+                        radius=radius)
+    xi, yi = grid_points(*EXTENT, CELL)
+    expected = np.array([_brute_force(x, y, values, a, b, 5, 2, radius)
+                         for a, b in zip(xi.ravel(), yi.ravel())])
+    np.testing.assert_allclose(raster.ravel(), expected.astype(np.float32),
+                               rtol=1e-6)
+    if np.isfinite(radius):
+        assert np.isnan(raster).any()
+
+
+def test_exact_at_a_well_and_nan_outside_radius(tmp_path):
+    xmin, ymin, xmax, ymax = EXTENT
+    x = np.array([xmin + 2.5*CELL, xmin + 2.5*CELL])
+    y = np.array([ymax - 3.5*CELL, ymax - 3.5*CELL])
+    values = np.array([10.0, 30.0])
+    raster = idw_raster(x, y, values, *EXTENT, CELL, str(tmp_path/'t'),
+                        radius=2*CELL + 1)
+    #coincident wells share the cell they sit on
+    assert raster[3, 2] == 20
+    assert np.isfinite(raster[3, 4]) and np.isnan(raster[3, 5])
+    assert np.isnan(raster[0, 18]) and np.isnan(raster[15, 0])
+    assert np.isfinite(raster).sum() == 13
+
+
+def test_log_interpolation(tmp_path):
+    x, y, values = _wells()
+    xi, yi = grid_points(*EXTENT, CELL)
+    raster = idw_raster(x, y, values, *EXTENT, CELL, str(tmp_path/'t'), k=4,
+                        log=True)
+    expected = 10**np.array([_brute_force(x, y, np.log10(values), a, b, 4, 2,
+                                          np.inf)
+                             for a, b in zip(xi.ravel(), yi.ravel())])
+    np.testing.assert_allclose(raster.ravel(), expected, rtol=1e-5)
+
+
+def test_independent_of_blocks(tmp_path):
+    x, y, values = _wells(200, seed=1)
+    whole = idw_raster(x, y, values, *EXTENT, CELL, str(tmp_path/'whole'),
+                       radius=150)
+    tiled = idw_raster(x, y, values, *EXTENT, CELL, str(tmp_path/'tiled'),
+                       radius=150, block_rows=3, block_cols=7, max_workers=3)
+    np.testing.assert_array_equal(whole, tiled)
+
+
+def test_no_wells(tmp_path):
+    raster = idw_raster([], [], [], *EXTENT, CELL, str(tmp_path/'t'))
+    assert raster.shape == (16, 19) and np.isnan(raster).all()
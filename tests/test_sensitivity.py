@@ -0,0 +1,61 @@
+"""Tests for sensitivity."""
+import numpy as np
+import pytest
+from data_retrieve import find_wells, pump_log, aquifer_thickness,\
+storativity_calculations, data_organization
+from sensitivity import error_bounds_sweep
+from Transmissivity import transmissivity_calculations, conductivity_calculations
+
+ERROR_BOUNDS = [0, 5, 10]
+KEYS = ['WELLID', 'RATE', 'DURATION', 'DOWN', 'B']
+
+
+def _live(target_well, radius, error_bounds):
+    """Runs the analyze_wells pipeline for one target and error_bounds."""
+    candidate_wells = find_wells(target_well, radius, error_bounds)
+    pump_log_results = pump_log(candidate_wells, error_bounds)
+    thickness_data = aquifer_thickness(candidate_wells, error_bounds)
+    confirmed_wells = data_organization(
+        candidate_wells, pump_log_results,
+        storativity_calculations(candidate_wells, thickness_data))
+    T = transmissivity_calculations(confirmed_wells)
+    return confirmed_wells, T, conductivity_calculations(confirmed_wells, T)
+
+
+def _order(confirmed_wells):
+    """Sorts the rows by the recorded values, which do not depend on the
+    error_bounds."""
+    return np.lexsort([confirmed_wells[i] for i in reversed(KEYS)])
+
+
+@pytest.mark.parametrize('target_well, radius', [(5, 3000), (2900, 5000)])
+def test_sweep_matches_separate_runs(sqlite_reader, index_dir, target_well,
+                                     radius):
+    confirmed_wells, T, K = error_bounds_sweep(target_well, radius,
+                                               ERROR_BOUNDS)
+    order = _order(confirmed_wells)
+    confirmed_wells, T, K = confirmed_wells[order], T[order], K[order]
+    assert T.shape == K.shape == (len(confirmed_wells), len(ERROR_BOUNDS), 3)
+    for column, error_bounds in enumerate(ERROR_BOUNDS):
+        live_wells, live_T, live_K = _live(target_well, radius, error_bounds)
+        order = _order(live_wells)
+        live_wells, live_T, live_K = live_wells[order], live_T[order],\
+            live_K[order]
+        #the wells the pipeline drops for this error_bounds are NaN
+        kept = ~np.isnan(T[:, column]).all(axis=1)
+        assert 0 < len(live_wells) == kept.sum()
+        for name in KEYS:
+            np.testing.assert_array_equal(confirmed_wells[name][kept],
+                                          live_wells[name])
+        np.testing.assert_allclose(T[kept, column], live_T[:, :3], rtol=1e-12)
+        np.testing.assert_allclose(K[kept, column], live_K[:, :3], rtol=1e-12)
+    #wider bounds never shrink the interval
+    kept = np.isfinite(T[:, 2]).all(axis=1)
+    assert (T[kept, 2, 0] <= T[kept, 1, 0]).all()
+    assert (T[kept, 1, 2] <= T[kept, 2, 2]).all()
+
+
+def test_sweep_of_the_target_alone(sqlite_reader, index_dir):
+    confirmed_wells, T, K = error_bounds_sweep(5, 0.001, ERROR_BOUNDS)
+    assert set(confirmed_wells['WELLID']) <= {5}
+    assert T.shape[1:] == K.shape[1:] == (len(ERROR_BOUNDS), 3)
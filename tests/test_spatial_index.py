@@ -0,0 +1,98 @@
+"""Tests for spatial_index."""
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import spatial_index
+from spatial_index import build_aquifer_index, load_aquifer_index
+
+
+def _reader(n, seed=0):
+    """Returns a read_wells function and a list of the aquifers it read."""
+    rng = np.random.default_rng(seed)
+    rows = [[float(rng.uniform(0, 1000)), float(rng.uniform(0, 1000)), 'CJDN',
+             float(rng.uniform(5, 50)), float(rng.uniform(0.1, 0.5)), k]
+            for k in range(n)]
+    calls = []
+
+    def read_wells(aquifer):
+        calls.append(aquifer)
+        return rows
+    return read_wells, calls, rows
+
+
+def _source(tmp_path, text='v1'):
+    source = str(tmp_path/'allwells.sqlite')
+    with open(source, 'w') as outfile:
+        outfile.write(text)
+    return source
+
+
+def test_saved_index_is_memory_mapped(tmp_path):
+    index_dir = str(tmp_path/'index')
+    source = _source(tmp_path)
+    read_wells, calls, rows = _reader(500)
+    build_aquifer_index('CJDN', source, read_wells, index_dir)
+    spatial_index._loaded_indexes.clear()
+
+    index = load_aquifer_index('CJDN', source, read_wells, index_dir)
+    assert calls == ['CJDN']
+    assert isinstance(index.wells, np.memmap)
+    assert sorted(os.listdir(index_dir)) == ['CJDN']
+    assert sorted(os.listdir(os.path.join(index_dir, 'CJDN'))) == \
+        ['manifest.json', 'wells.npy']
+    np.testing.assert_array_equal(index.wells['WELLID'], [i[5] for i in rows])
+
+    #the tree answers radius queries like a brute-force search
+    xy = np.array([i[:2] for i in rows])
+    found = sorted(index.tree.query_ball_point([500, 500], 200))
+    expected = np.flatnonzero(np.hypot(xy[:, 0] - 500, xy[:, 1] - 500) <= 200)
+    np.testing.assert_array_equal(found, expected)
+
+    #the second load in the same process comes from memory
+    assert load_aquifer_index('CJDN', source, read_wells, index_dir) is index
+
+
+def test_stale_and_damaged_indexes_are_rebuilt(tmp_path):
+    index_dir = str(tmp_path/'index')
+    source = _source(tmp_path)
+    read_wells, calls, rows = _reader(50)
+    load_aquifer_index('CJDN', source, read_wells, index_dir)
+    spatial_index._loaded_indexes.clear()
+    load_aquifer_index('CJDN', source, read_wells, index_dir)
+    assert len(calls) == 1
+
+    _source(tmp_path, 'v2, a larger table')
+    load_aquifer_index('CJDN', source, read_wells, index_dir)
+    assert len(calls) == 2
+
+    spatial_index._loaded_indexes.clear()
+    with open(os.path.join(index_dir, 'CJDN', 'wells.npy'), 'wb') as outfile:
+        outfile.write(b'damaged')
+    index = load_aquifer_index('CJDN', source, read_wells, index_dir)
+    assert len(calls) == 3
+    assert len(index.wells) == 50
+
+
+def test_concurrent_builds(tmp_path):
+    index_dir = str(tmp_path/'index')
+    source = _source(tmp_path)
+    read_wells, calls, rows = _reader(2000)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda i: build_aquifer_index('CJDN', source,
+                                                        read_wells, index_dir),
+                          range(16)))
+    assert sorted(os.listdir(index_dir)) == ['CJDN']
+    spatial_index._loaded_indexes.clear()
+    index = load_aquifer_index('CJDN', source, read_wells, index_dir)
+    assert len(calls) == 16
+    assert len(index.wells) == 2000
+
+
+def test_empty_aquifer(tmp_path):
+    index_dir = str(tmp_path/'index')
+    source = _source(tmp_path)
+    build_aquifer_index('OPDC', source, lambda aquifer: [], index_dir)
+    spatial_index._loaded_indexes.clear()
+    index = load_aquifer_index('OPDC', source, lambda aquifer: [], index_dir)
+    assert len(index.wells) == 0
+    assert index.tree.query_ball_point([0, 0], 100) == []
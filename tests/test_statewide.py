@@ -0,0 +1,88 @@
+"""Tests for statewide."""
+import numpy as np
+import pytest
+import statewide
+from data_retrieve import find_wells, pump_log, aquifer_thickness,\
+storativity_calculations, data_organization
+from table_reader import SQLiteReader, set_reader
+from Transmissivity import transmissivity_calculations, conductivity_calculations
+
+
+def _live(target_well, radius, error_bounds):
+    """Runs the analyze_wells pipeline for one target."""
+    candidate_wells = find_wells(target_well, radius, error_bounds)
+    pump_log_results = pump_log(candidate_wells, error_bounds)
+    thickness_data = aquifer_thickness(candidate_wells, error_bounds)
+    confirmed_wells = data_organization(
+        candidate_wells, pump_log_results,
+        storativity_calculations(candidate_wells, thickness_data))
+    T = transmissivity_calculations(confirmed_wells)
+    return confirmed_wells, T, conductivity_calculations(confirmed_wells, T)
+
+
+def _sorted(confirmed_wells, T, K):
+    order = np.lexsort((T[:, 1], confirmed_wells['WELLID']))
+    return confirmed_wells[order], T[order], K[order]
+
+
+@pytest.fixture
+def store(tmp_path, sqlite_reader, index_dir):
+    store = str(tmp_path/'statewide.sqlite')
+    statewide.build_store(5, store)
+    return store
+
+
+def test_query_matches_pipeline(store):
+    for target_well, radius in [(5, 3000), (17, 1500), (2900, 5000)]:
+        expected = _sorted(*_live(target_well, radius, 5))
+        result = _sorted(*statewide.query_store(target_well, radius, 5, store))
+        assert len(expected[0]) > 0
+        np.testing.assert_array_equal(result[0], expected[0])
+        np.testing.assert_allclose(result[1], expected[1], rtol=1e-12)
+        np.testing.assert_allclose(result[2], expected[2], rtol=1e-12)
+
+
+def test_query_errors(store, tmp_path):
+    with pytest.raises(ValueError, match='error_bounds'):
+        statewide.query_store(5, 3000, 10, store)
+    with pytest.raises(ValueError, match='not in allwells'):
+        statewide.query_store(10**9, 3000, 5, store)
+    with pytest.raises(FileNotFoundError):
+        statewide.query_store(5, 3000, 5, str(tmp_path/'missing.sqlite'))
+
+
+def test_every_input_table_is_stamped(sqlite_reader, cwi_database, index_dir,
+                                     tmp_path):
+    #give every table its own stamp file, like the dbf next to the .gdb
+    stamp_files = {}
+    for name in statewide.INPUT_TABLES:
+        stamp_files[name] = str(tmp_path/f'{name}.stamp')
+        with open(stamp_files[name], 'w') as outfile:
+            outfile.write(name)
+
+    class SplitReader(SQLiteReader):
+        def source(self, table):
+            return stamp_files[self.table_name(table)]
+
+    set_reader(SplitReader(cwi_database))
+    store = str(tmp_path/'statewide.sqlite')
+    statewide.build_store(5, store, aquifers=['CJDN'])
+    statewide.query_store(5, 3000, 5, store)
+    for name in ['CWI_hydro', 'C5PL']:
+        with open(stamp_files[name], 'a') as outfile:
+            outfile.write('changed')
+        with pytest.raises(ValueError, match=name):
+            statewide.query_store(5, 3000, 5, store)
+
+
+def test_failed_build_keeps_old_store(store, monkeypatch):
+    before = statewide.query_store(5, 3000, 5, store)
+
+    def fail(aquifer, error_bounds, source):
+        raise RuntimeError(aquifer)
+
+    monkeypatch.setattr(statewide, '_aquifer_results', fail)
+    with pytest.raises(RuntimeError):
+        statewide.build_store(5, store)
+    after = statewide.query_store(5, 3000, 5, store)
+    np.testing.assert_array_equal(after[0], before[0])
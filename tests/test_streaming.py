@@ -0,0 +1,123 @@
+"""Tests for streaming."""
+import shutil
+import sqlite3
+import numpy as np
+import pytest
+from columnar import RESULT_FIELDS, read_results
+from data_location import allwells
+from data_retrieve import find_wells, locate_wells, pump_log,\
+aquifer_thickness, storativity_calculations, data_organization,\
+read_aquifer_wells
+from data_to_csv import CSV_HEADER, append_calculated_data_csv
+from spatial_index import load_aquifer_index
+from streaming import _write, calculation_batches, candidate_batches,\
+stream_aquifers, stream_target
+from table_reader import get_reader
+from Transmissivity import transmissivity_calculations, conductivity_calculations
+
+
+def test_append_calculated_data_csv_empty(tmp_path):
+    raw_csv_name = str(tmp_path/"empty.csv")
+    assert append_calculated_data_csv([], [], [], raw_csv_name, header=True) == 0
+    with open(raw_csv_name) as infile:
+        assert infile.read().strip() == ",".join(CSV_HEADER)
+
+
+def test_write_without_confirmed_wells(tmp_path):
+    #a search that finds no candidate wells yields no batches at all
+    results = calculation_batches([[]], error_bounds=5)
+    raw_csv_name, rows = _write(results, str(tmp_path/"none"), 'csv')
+    assert rows == 0
+    with open(raw_csv_name) as infile:
+        assert infile.read().strip() == ",".join(CSV_HEADER)
+
+
+def test_write_without_confirmed_wells_npz(tmp_path):
+    from columnar import read_results
+    file_name, rows = _write(iter([]), str(tmp_path/"none"), 'npz')
+    assert rows == 0
+    results = read_results(file_name)
+    assert len(results['WELLID']) == 0
+    assert results['T'].dtype == np.float64
+
+
+@pytest.fixture
+def split_reader(cwi_database, tmp_path):
+    """Reads a copy of the CWI tables where some WELLIDs have several
+    allwells rows, so a batch cut can fall inside one WELLID."""
+    import table_reader
+    database = str(tmp_path/'cwi.sqlite')
+    shutil.copy(cwi_database, database)
+    connection = sqlite3.connect(database)
+    for offset in [7, 19]:
+        connection.execute('INSERT INTO allwells SELECT UTME + ?, UTMN, '
+                           'AQUIFER, CASE_DEPTH, DEPTH_DRLL, CASE_DIAM, WELLID '
+                           'FROM allwells WHERE WELLID % 3 = 0', (offset,))
+    connection.commit()
+    connection.close()
+    previous = table_reader._reader
+    table_reader.set_reader(table_reader.SQLiteReader(database))
+    yield database
+    table_reader.set_reader(previous)
+
+
+def _live(target_well, radius, error_bounds):
+    """Runs the analyze_wells pipeline for one target."""
+    candidate_wells = find_wells(target_well, radius, error_bounds)
+    pump_log_results = pump_log(candidate_wells, error_bounds)
+    thickness_data = aquifer_thickness(candidate_wells, error_bounds)
+    confirmed_wells = data_organization(
+        candidate_wells, pump_log_results,
+        storativity_calculations(candidate_wells, thickness_data))
+    T = transmissivity_calculations(confirmed_wells)
+    K = conductivity_calculations(confirmed_wells, T)
+    return confirmed_wells, np.column_stack((T[:, :3], K[:, :3]))
+
+
+def _assert_same_rows(results, confirmed_wells, values):
+    order = np.lexsort((confirmed_wells['UTME'], values[:, 1],
+                        confirmed_wells['WELLID']))
+    confirmed_wells, values = confirmed_wells[order], values[order]
+    streamed = np.column_stack([results[i] for i in RESULT_FIELDS])
+    order = np.lexsort((results['UTME'], streamed[:, 1], results['WELLID']))
+    assert len(order) == len(confirmed_wells) > 0
+    for name in confirmed_wells.dtype.names:
+        np.testing.assert_array_equal(results[name][order],
+                                      confirmed_wells[name])
+    np.testing.assert_allclose(streamed[order], values, rtol=1e-12)
+
+
+def test_batches_keep_whole_wellids(split_reader, index_dir):
+    index = load_aquifer_index('CJDN', get_reader().source(allwells),
+                               read_aquifer_wells, index_dir=index_dir)
+    batches = list(candidate_batches(index, batch_size=7))
+    well_ids = [[row[5] for row in batch] for batch in batches]
+    assert sum(map(len, well_ids)) == len(index.wells)
+    #some cuts had to move past batch_size to keep a WELLID together
+    assert max(map(len, well_ids)) > 7
+    for before, after in zip(well_ids, well_ids[1:]):
+        assert before == sorted(before) and before[-1] < after[0]
+
+
+@pytest.mark.parametrize('batch_size', [7, 100000])
+def test_stream_target_matches_pipeline(split_reader, index_dir, tmp_path,
+                                        batch_size):
+    confirmed_wells, values = _live(30, 6000, 5)
+    assert len(np.unique(confirmed_wells['WELLID'])) < len(confirmed_wells)
+    file_name, rows = stream_target(30, 6000, 5, str(tmp_path/'target'),
+                                    batch_size)
+    assert rows == len(confirmed_wells)
+    _assert_same_rows(read_results(file_name), confirmed_wells, values)
+
+
+def test_stream_aquifers_matches_pipeline(split_reader, index_dir, tmp_path):
+    #a radius that covers the whole synthetic area selects the whole aquifer
+    target_wells = {}
+    for well_id, (_, _, aquifer) in locate_wells(list(range(1, 40))).items():
+        target_wells.setdefault(aquifer, well_id)
+    live = [_live(target_wells[i], 10**6, 5) for i in ['CJDN', 'QBAA']]
+    file_name, rows = stream_aquifers(['CJDN', 'QBAA'], 5,
+                                      str(tmp_path/'aquifers'), batch_size=11)
+    _assert_same_rows(read_results(file_name),
+                      np.concatenate([i[0] for i in live]),
+                      np.concatenate([i[1] for i in live]))
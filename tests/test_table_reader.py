@@ -0,0 +1,72 @@
+"""Tests for table_reader."""
+import random
+import sqlite3
+import time
+import pytest
+from data_location import allwells, CWIPL
+from table_reader import ArcpyReader, SQLiteReader, search_wellids, set_reader
+
+FIELDS = ['WELLID', 'UTME', 'UTMN', 'AQUIFER']
+
+
+def _direct(database, well_ids):
+    """Selects the rows of well_ids from allwells without search_wellids."""
+    connection = sqlite3.connect(database)
+    rows = connection.execute(f'SELECT {", ".join(FIELDS)} FROM allwells '
+                              'ORDER BY WELLID, rowid').fetchall()
+    connection.close()
+    well_ids = set(well_ids)
+    return [row for row in rows if row[0] in well_ids]
+
+
+@pytest.mark.parametrize('well_ids', [[17], [], list(range(2500, 0, -1)) + [3, 3]])
+def test_search_wellids_matches_direct_query(sqlite_reader, cwi_database,
+                                             well_ids):
+    rows = list(search_wellids(allwells, FIELDS, None, well_ids))
+    assert rows == _direct(cwi_database, well_ids)
+
+
+def test_search_wellids_where_clause(sqlite_reader, cwi_database):
+    rows = list(search_wellids(allwells, FIELDS, "AQUIFER = 'CJDN'",
+                               range(1, 1001), chunk_size=300))
+    assert rows == [row for row in _direct(cwi_database, range(1, 1001))
+                    if row[3] == 'CJDN']
+
+
+class SlowReader(SQLiteReader):
+    """Finishes the searches in a random order."""
+
+    def search(self, table, field_names, where_clause=None, parameters=()):
+        time.sleep(random.uniform(0, 0.01))
+        return super().search(table, field_names, where_clause, parameters)
+
+
+@pytest.mark.parametrize('max_workers', [2, 3, 8])
+def test_concurrent_search_matches_serial(sqlite_reader, cwi_database,
+                                          max_workers):
+    #C5PL has several rows for some wells; their order must be kept too
+    fields = ['WELLID', 'FLOW_RATE', 'DURATION', 'START_MEAS', 'PUMP_MEAS']
+    well_ids = list(range(3000, 0, -2))
+    reader = SlowReader(cwi_database)
+    reader.concurrent = False
+    set_reader(reader)
+    serial = list(search_wellids(CWIPL, fields, None, well_ids, chunk_size=40))
+    reader.concurrent = True
+    concurrent = list(search_wellids(CWIPL, fields, None, well_ids,
+                                     chunk_size=40, max_workers=max_workers))
+    assert len(serial) > len(set(row[0] for row in serial)) > 0
+    assert concurrent == serial
+    assert [row[0] for row in serial] == sorted(row[0] for row in serial)
+
+
+def test_wellid_clauses():
+    #a single WELLID used to become "WELLID in (17,)"
+    assert ArcpyReader.wellid_clause([17]) == ("WELLID in (17)", ())
+    assert SQLiteReader.wellid_clause([17]) == ("WELLID in (?)", (17,))
+    assert SQLiteReader.wellid_clause([3, 5]) == ("WELLID in (?, ?)", (3, 5))
+
+
+def test_opie_single_well(sqlite_reader, cwi_database):
+    from aquifer_values import opie
+    assert opie([(1e-4, 17)]) == [row[1:] + row[:1]
+                                  for row in _direct(cwi_database, [17])]
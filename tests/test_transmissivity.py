@@ -0,0 +1,150 @@
+"""Tests for Transmissivity."""
+import numpy as np
+import pytest
+from interval import Interval
+from lambert_w import lambertw_m1
+from Transmissivity import _row_quantiles, conductivity_calculations,\
+monte_carlo_calculations, transmissivity_arrays, transmissivity_calculations
+from well_batch import empty_well_batch
+
+
+def _wells(n, error_bounds=5, seed=0):
+    rng = np.random.default_rng(seed)
+    batch = empty_well_batch(n)
+    batch['WELLID'] = np.arange(n)
+    batch['AQUIFER'] = 'CJDN'
+    batch['SCREEN_LEN'] = rng.uniform(5, 60, n)
+    batch['RADIUS'] = rng.uniform(0.1, 0.5, n)
+    batch['DURATION'] = rng.uniform(0.05, 1, n)
+    batch['RATE'] = rng.uniform(500, 50000, n)
+    batch['RATE_MIN'] = batch['RATE']*0.9
+    batch['RATE_MAX'] = batch['RATE']*1.1
+    batch['DOWN'] = rng.uniform(5, 80, n)
+    batch['DOWN_MIN'] = batch['DOWN'] - error_bounds/2
+    batch['DOWN_MAX'] = batch['DOWN'] + error_bounds/2
+    batch['B'] = rng.uniform(50, 300, n)
+    batch['B_MIN'] = batch['B'] - error_bounds
+    batch['B_MAX'] = batch['B'] + error_bounds
+    batch['S_MIN'] = 3.9e-5*batch['B']
+    batch['S_MAX'] = 6.2e-5*batch['B']
+    return batch
+
+
+def _single(Q, t, s, L, rw, b, S):
+    """The Bradbury & Rothschild T of one well, written out by hand."""
+    Lb = min(L/b, 1)
+    G = 2.948 - 7.363*Lb + 11.447*Lb**2 - 4.675*Lb**3
+    sp = ((1 - Lb)/Lb)*(np.log(b/rw) - G)
+    W, _ = lambertw_m1((-16*np.pi/9)*np.exp(-2*sp)*s*rw**2*S/(Q*t))
+    return float(-(Q/(4*np.pi*s))*W)
+
+
+def test_bounds_are_ordered():
+    batch = _wells(500)
+    T = transmissivity_calculations(batch)
+    K = conductivity_calculations(batch, T)
+    assert np.isfinite(T).all()
+    assert (T[:, 0] <= T[:, 1]).all() and (T[:, 1] <= T[:, 2]).all()
+    assert (K[:, 0] <= K[:, 1]).all() and (K[:, 1] <= K[:, 2]).all()
+
+
+def test_conductivity_keeps_well_id():
+    #the fourth column is the Well ID, as in the original list of lists
+    batch = _wells(20)
+    batch['WELLID'] = np.arange(20) + 512000
+    T = transmissivity_calculations(batch)
+    K = conductivity_calculations(batch, T)
+    assert K.shape == (20, 4)
+    np.testing.assert_array_equal(K[:, 3], batch['WELLID'])
+    np.testing.assert_allclose(K[:, 1], T[:, 1]/batch['B'], rtol=1e-15)
+    assert conductivity_calculations(batch[:0], T[:0]).shape == (0, 4)
+
+
+def test_corners_and_nominal():
+    batch = _wells(5)
+    T = transmissivity_calculations(batch)
+    for i, well in enumerate(batch):
+        args = (well['DURATION'], None, well['SCREEN_LEN'], well['RADIUS'],
+                well['B'])
+        single = lambda Q, s, S: _single(Q, args[0], s, *args[2:], S)
+        #T increases with Q and decreases with s and S; the nominal T uses
+        #the geometric mean of the storage bounds
+        np.testing.assert_allclose(T[i], [
+            single(well['RATE_MIN'], well['DOWN_MAX'], well['S_MAX']),
+            single(well['RATE'], well['DOWN'],
+                   np.sqrt(well['S_MIN']*well['S_MAX'])),
+            single(well['RATE_MAX'], well['DOWN_MIN'], well['S_MIN'])],
+            rtol=1e-12)
+
+
+def test_arrays_match_calculations():
+    batch = _wells(200)
+    T = transmissivity_calculations(batch)
+    T_min, T_nominal, T_max = transmissivity_arrays(
+        batch['RATE_MIN'], batch['RATE'], batch['RATE_MAX'], batch['DURATION'],
+        batch['DOWN_MIN'], batch['DOWN'], batch['DOWN_MAX'],
+        batch['SCREEN_LEN'], batch['RADIUS'], batch['B'], batch['S_MIN'],
+        batch['S_MAX'])
+    np.testing.assert_array_equal(np.column_stack((T_min, T_nominal, T_max)), T)
+    #with a central storativity the nominal T sits inside its interval
+    assert (T_min < T_nominal).all() and (T_nominal < T_max).all()
+
+
+def test_zero_width_interval():
+    batch = _wells(50, error_bounds=0)
+    batch['RATE_MIN'] = batch['RATE_MAX'] = batch['RATE']
+    batch['S_MIN'] = batch['S_MAX']
+    T = transmissivity_calculations(batch)
+    np.testing.assert_array_equal(T[:, 0], T[:, 1])
+    np.testing.assert_array_equal(T[:, 2], T[:, 1])
+
+
+def test_monte_carlo_degenerate_intervals():
+    #every input is known exactly, so every sample is the nominal T
+    batch = _wells(40, error_bounds=0)
+    batch['RATE_MIN'] = batch['RATE_MAX'] = batch['RATE']
+    batch['S_MIN'] = batch['S_MAX']
+    T = transmissivity_calculations(batch)
+    K = conductivity_calculations(batch, T)
+    T_quantiles, K_quantiles = monte_carlo_calculations(batch, n_samples=50,
+                                                        seed=1)
+    np.testing.assert_allclose(T_quantiles, np.repeat(T[:, 1:2], 3, 1),
+                               rtol=1e-12)
+    np.testing.assert_allclose(K_quantiles, np.repeat(K[:, 1:2], 3, 1),
+                               rtol=1e-12)
+
+
+def test_monte_carlo_quantiles_are_ordered():
+    batch = _wells(30)
+    T = transmissivity_calculations(batch)
+    T_quantiles, K_quantiles = monte_carlo_calculations(
+        batch, n_samples=2000, quantiles=(0.05, 0.5, 0.95), seed=2)
+    assert (np.diff(T_quantiles, axis=1) > 0).all()
+    assert (np.diff(K_quantiles, axis=1) > 0).all()
+    #the median of a narrow uniform box is close to the central T
+    np.testing.assert_allclose(T_quantiles[:, 1], T[:, 1], rtol=0.05)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 250, 999, 10**6])
+def test_monte_carlo_independent_of_chunks(chunk_size):
+    batch = _wells(23)
+    batch['DOWN'][:3] = 0.5 #some samples have a drawdown that is not positive
+    expected = monte_carlo_calculations(batch, n_samples=100, seed=3)
+    result = monte_carlo_calculations(batch, n_samples=100, seed=3,
+                                      chunk_size=chunk_size)
+    np.testing.assert_array_equal(result[0], expected[0])
+    np.testing.assert_array_equal(result[1], expected[1])
+
+
+def test_row_quantiles_match_numpy():
+    rng = np.random.default_rng(4)
+    values = rng.lognormal(size=(60, 37))
+    values[rng.random(values.shape) < 0.3] = np.nan
+    values[5] = np.nan #a row without any value
+    values[6, 1:] = np.nan #a row with one value
+    quantiles = [0, 0.05, 0.5, 0.9, 1]
+    result = _row_quantiles(values, quantiles)
+    assert np.isnan(result[5]).all()
+    for row, expected in zip(np.delete(result, 5, 0), np.delete(values, 5, 0)):
+        np.testing.assert_allclose(row, np.quantile(
+            expected[~np.isnan(expected)], quantiles), rtol=1e-14)
@@ -0,0 +1,156 @@
+"""Tests for variogram."""
+import numpy as np
+import pytest
+from variogram import (compute_variogram, compute_variogram_resampled,
+                       compute_variogram_tiled)
+
+
+def _points(n, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(0, 1000, n)
+    y = rng.uniform(0, 1000, n)
+    z = np.sin(x/200) + rng.normal(scale=0.3, size=n)
+    return x, y, z
+
+
+def _per_point_loop(x, y, z, hmax, nh, nmin):
+    """The original double-counting loop over every point and neighbor."""
+    separ = np.zeros(nh)
+    gamma = np.zeros(nh)
+    count = np.zeros(nh, dtype=int)
+    for i in range(len(x)):
+        for j in range(len(x)):
+            h = np.hypot(x[j] - x[i], y[j] - y[i])
+            if j == i or h > hmax:
+                continue
+            k = int(np.floor(h/hmax*nh))
+            if k < nh:
+                separ[k] += h
+                gamma[k] += (z[j] - z[i])**2
+                count[k] += 1
+    for k in range(nh):
+        if count[k] >= 2*nmin:
+            separ[k] = separ[k]/count[k]
+            gamma[k] = 0.5*gamma[k]/count[k]
+        else:
+            separ[k] = np.nan
+            gamma[k] = np.nan
+    return separ, gamma, count//2
+
+
+def test_matches_per_point_loop():
+    x, y, z = _points(150, seed=5)
+    #coincident points and a pair exactly at hmax
+    x[1], y[1] = x[0], y[0]
+    x[3], y[3] = x[2] + 300, y[2]
+    for nmin in (1, 300):
+        expected = _per_point_loop(x, y, z, 300, 6, nmin)
+        result = compute_variogram(x, y, z, 300, 6, nmin, chunk_size=32)
+        np.testing.assert_allclose(result[0], expected[0], rtol=1e-12)
+        np.testing.assert_allclose(result[1], expected[1], rtol=1e-12)
+        np.testing.assert_array_equal(result[2], expected[2])
+
+
+def test_jackknife_matches_leave_one_out():
+    x, y, z = _points(40)
+    separ, gamma, count, bands = compute_variogram_resampled(
+        x, y, z, 500, 5, 1, method='jackknife', percentiles=(0, 100),
+        processes=1)
+    np.testing.assert_allclose(gamma, compute_variogram(x, y, z, 500, 5, 1)[1])
+    replicates = np.array([compute_variogram(np.delete(x, k), np.delete(y, k),
+                                             np.delete(z, k), 500, 5, 1)[1]
+                           for k in range(len(x))])
+    center = replicates.mean(axis=0)
+    replicates = center + np.sqrt(len(x) - 1)*(replicates - center)
+    np.testing.assert_allclose(bands, [replicates.min(axis=0),
+                                       replicates.max(axis=0)], rtol=1e-10)
+
+
+def test_bootstrap_does_not_depend_on_processes():
+    x, y, z = _points(200)
+    serial = compute_variogram_resampled(x, y, z, 500, 5, 5, nrep=100,
+                                         processes=1, seed=3)
+    parallel = compute_variogram_resampled(x, y, z, 500, 5, 5, nrep=100,
+                                           processes=2, seed=3)
+    np.testing.assert_array_equal(serial[3], parallel[3])
+    assert (serial[3][0] <= serial[3][1]).all()
+
+
+def test_unknown_method():
+    x, y, z = _points(10)
+    with pytest.raises(ValueError):
+        compute_variogram_resampled(x, y, z, 500, 5, 1, method='permutation')
+
+
+def test_tiled_matches_compute_variogram_exactly():
+    rng = np.random.default_rng(3)
+    x = rng.uniform(0, 2000, 600)
+    y = rng.uniform(0, 2000, 600)
+    z = np.sin(x/300) + rng.normal(size=600)
+    expected = compute_variogram(x, y, z, 400, 8, 1)
+    for processes in (1, 2):
+        result = compute_variogram_tiled(
+            x, y, z, 400, 8, 1, tile_size=500, processes=processes)
+        for a, b in zip(expected, result):
+            np.testing.assert_array_equal(a, b)
+
+
+def _sector_loop(x, y, z, hmax, nh, azimuths, atol, bandwidth):
+    """Bins every unique pair into each sector it falls in, one at a time."""
+    separ = np.zeros((nh, len(azimuths)))
+    gamma = np.zeros((nh, len(azimuths)))
+    count = np.zeros((nh, len(azimuths)), dtype=int)
+    for i in range(len(x)):
+        for j in range(i + 1, len(x)):
+            h = np.hypot(x[j] - x[i], y[j] - y[i])
+            k = int(np.floor(h/hmax*nh))
+            if k >= nh:
+                continue
+            azimuth = np.degrees(np.arctan2(x[j] - x[i], y[j] - y[i]))
+            for d, direction in enumerate(azimuths):
+                offset = abs(azimuth - direction) % 180
+                offset = min(offset, 180 - offset)
+                inside = offset <= atol and (
+                    bandwidth is None or h*np.sin(np.radians(offset)) <= bandwidth)
+                if inside or h == 0:
+                    separ[k, d] += h
+                    gamma[k, d] += (z[j] - z[i])**2
+                    count[k, d] += 1
+    with np.errstate(invalid='ignore'):
+        return separ/count, 0.5*gamma/count, count
+
+
+@pytest.mark.parametrize('bandwidth', [None, 60])
+def test_sector_assignment_matches_loop(bandwidth):
+    x, y, z = _points(120, seed=6)
+    x[1], y[1] = x[0], y[0] #coincident pairs go in every sector
+    azimuths = [0, 45, 90, 160]
+    expected = _sector_loop(x, y, z, 300, 5, azimuths, 22.5, bandwidth)
+    result = compute_variogram(x, y, z, 300, 5, 1, chunk_size=32,
+                               azimuths=azimuths, atol=22.5,
+                               bandwidth=bandwidth)
+    np.testing.assert_array_equal(result[2], expected[2])
+    np.testing.assert_allclose(result[0], expected[0], rtol=1e-12)
+    np.testing.assert_allclose(result[1], expected[1], rtol=1e-12)
+
+
+def test_anisotropic_field():
+    #z only changes from west to east
+    rng = np.random.default_rng(7)
+    x = rng.uniform(0, 1000, 400)
+    y = rng.uniform(0, 1000, 400)
+    z = x/100
+    separ, gamma, count = compute_variogram(x, y, z, 300, 6, 5,
+                                            azimuths=[0, 90], atol=10)
+    assert separ.shape == gamma.shape == count.shape == (6, 2)
+    #north-south pairs barely differ, east-west pairs differ by h/100
+    assert np.all(gamma[:, 0] < 0.05*gamma[:, 1])
+    #to within the spread of h and of the angle in each bin
+    np.testing.assert_allclose(gamma[:, 1], 0.5*(separ[:, 1]/100)**2, rtol=0.2)
+    assert np.all(np.diff(gamma[:, 1]) > 0)
+
+    #a full half-circle tolerance is the omni-directional variogram
+    omni = compute_variogram(x, y, z, 300, 6, 5)
+    wide = compute_variogram(x, y, z, 300, 6, 5, azimuths=[30], atol=90)
+    np.testing.assert_array_equal(wide[2][:, 0], omni[2])
+    np.testing.assert_allclose(wide[1][:, 0], omni[1], rtol=1e-12)
@@ -1,12 +1,17 @@
+import itertools
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from fractions import Fraction
 import numpy as np
 from scipy import spatial
 import progressbar
 
 
 #------------------------------------------------------------------------------
-def compute_variogram(x, y, z, hmax, nh, nmin):
+def compute_variogram(x, y, z, hmax, nh, nmin, chunk_size=4096,
+                      azimuths=None, atol=22.5, bandwidth=None):
     """
-    Compute the omni-directional experiement semi-variogram.
+    Compute the omni-directional or directional experiement semi-variogram.
 
     Arguments
     ---------
@@ -28,18 +33,47 @@ def compute_variogram(x, y, z, hmax, nh, nmin):
     nmin : int
         minimum number of pairs in a bin to be used.
 
+    chunk_size : int
+        number of points searched for neighbors at a time. This bounds the
+        memory used by the pair cloud.
+
+    azimuths : array_like, shape=(ndir,), optional
+        direction of each sector in degrees clockwise from north (the +y
+        axis). If None, the omni-directional variogram is computed.
+
+    atol : float
+        angular tolerance in degrees on either side of each azimuth.
+
+    bandwidth : float, optional
+        maximum distance of a pair's separation vector from the axis of a
+        sector. If None, only atol limits the sectors.
+
     Returns
     -------
     (separ, gamma, count) : tuple
-        separ : ndarray, shape=(nh, 1)
+        separ : ndarray, shape=(nh,) or (nh, ndir)
             matrix of average separation distances.
 
-        gamma : ndarray, shape=(nh, 1)
+        gamma : ndarray, shape=(nh,) or (nh, ndir)
             matrix of average semi-variogram values.
 
-        count : ndarray, shape=(nh, 1)
+        count : ndarray, shape=(nh,) or (nh, ndir)
             maxtrix of bin counts.
 
+        The second axis, one column per azimuth, is only present when
+        azimuths is given.
+
+    Notes
+    -----
+    Each unique pair of points is found once and the pairs are binned with
+    np.bincount, so there is no Python loop over points or pairs. The
+    separation and gamma sums are exact (see _exact_bincount) and rounded
+    once at the end, so they do not depend on the order of the pairs. All of the
+    direction sectors are binned from the same pass over the pairs. Pairs
+    are undirected, so an azimuth and its opposite (a and a+180) are the
+    same sector. Coincident points have no direction and are counted in
+    every sector.
+
     Author
     ------
     Dr. Randal J. Barnes
@@ -50,49 +84,642 @@ def compute_variogram(x, y, z, hmax, nh, nmin):
     -------
     22 May 2020
     """
-    # Build the KD Tree
-    tree = spatial.cKDTree(np.stack((x, y), 1))
+    ndir = 1 if azimuths is None else len(azimuths)
 
     # Initialize.
-    separ = np.zeros(shape=(nh,), dtype=float)
-    gamma = np.zeros(shape=(nh,), dtype=float)
-    count = np.zeros(shape=(nh,), dtype=int)
+    separ = {}
+    gamma = {}
+    count = np.zeros(shape=(nh, ndir), dtype=int)
 
     # Initialize the progress bar.
     bar = progressbar.ProgressBar(max_value=len(x))
     bar.update(0)
 
-    # Compute the cloud of points.
-    for i in range(len(x)):
-        xtarget = x[i]
-        ytarget = y[i]
+    # Bin every unique pair once, a chunk of points at a time.
+    for i, j, h, stop in _pair_chunks(x, y, hmax, chunk_size):
+        sums = _bin_pairs(x, y, z, i, j, h, hmax, nh, azimuths, atol,
+                          bandwidth)
+        _add_exact(separ, sums[0])
+        _add_exact(gamma, sums[1])
+        count += sums[2]
 
-        # This approach double counts, but this search is so much faster.
-        neighbors = tree.query_ball_point([xtarget, ytarget], hmax)
-        neighbors.remove(i)
+        # Update the progress bar.
+        bar.update(stop)
 
-        for j in neighbors:
-            h = np.hypot(x[j]-xtarget, y[j]-ytarget)
-            g = (z[j]-z[i])**2
+    # Compute the averages
+    separ = _exact_value(separ, nh*ndir).reshape(nh, ndir)
+    gamma = _exact_value(gamma, nh*ndir).reshape(nh, ndir)
+    separ, gamma = _averages(separ, gamma, count, nmin)
 
-            k = int(np.floor(h/hmax * nh))
-            if k < nh:
-                separ[k] += h
-                gamma[k] += g
-                count[k] += 1
+    if azimuths is None:
+        return(separ[:, 0], gamma[:, 0], count[:, 0])
+    return(separ, gamma, count)
 
-        # Update the progress bar.
-        bar.update(i+1)
 
-    # Compute the averages
-    for k in range(nh):
-        if count[k] >= 2*nmin:
-            separ[k] = separ[k]/count[k]
-            gamma[k] = 0.5*gamma[k]/count[k]
+#------------------------------------------------------------------------------
+def compute_variogram_tiled(x, y, z, hmax, nh, nmin, tile_size=None,
+                            processes=None, chunk_size=4096, azimuths=None,
+                            atol=22.5, bandwidth=None):
+    """
+    Compute the experiement semi-variogram over spatial tiles in a process
+    pool.
+
+    Arguments
+    ---------
+    x, y, z, hmax, nh, nmin, chunk_size, azimuths, atol, bandwidth :
+        same as compute_variogram.
+
+    tile_size : float, optional
+        width and height of the square tiles. Defaults to 8*hmax.
+
+    processes : int, optional
+        number of worker processes. Defaults to os.cpu_count(). With 1 the
+        tiles are computed in the calling process.
+
+    Returns
+    -------
+    (separ, gamma, count) : tuple
+        same as compute_variogram.
+
+    Notes
+    -----
+    The domain is split into square tiles. Each tile is sent to a worker
+    together with its halo, the points of the neighboring tiles within hmax
+    of the tile. A pair (i, j) with i < j is only counted by the tile that
+    holds point i, so every unique pair is counted exactly once. The
+    workers return exact partial sums (see _exact_bincount), so the result
+    is bit-for-bit the same as compute_variogram for any tile size and
+    number of processes, whatever order the tiles finish in.
+
+    Each worker only receives its own tile and halo, and at most
+    2*processes tiles are submitted at a time, so memory is set by the tile
+    size, not by the size of the whole data set.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    z = np.asarray(z, dtype=float)
+    if tile_size is None:
+        tile_size = 8*hmax
+    if processes is None:
+        processes = os.cpu_count() or 1
+    ndir = 1 if azimuths is None else len(azimuths)
+
+    separ = {}
+    gamma = {}
+    count = np.zeros(shape=(nh, ndir), dtype=int)
+
+    def add(sums):
+        _add_exact(separ, sums[0])
+        _add_exact(gamma, sums[1])
+        count[:] += sums[2]
+
+    tasks = (task + (hmax, nh, azimuths, atol, bandwidth, chunk_size)
+             for task in _tiles(x, y, z, hmax, tile_size))
+    if processes == 1:
+        for task in tasks:
+            add(_tile_sums(task))
+    else:
+        # Keep at most 2*processes tiles in flight.
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            pending = set()
+            for task in tasks:
+                if len(pending) >= 2*processes:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        add(future.result())
+                pending.add(executor.submit(_tile_sums, task))
+            for future in pending:
+                add(future.result())
+
+    separ = _exact_value(separ, nh*ndir).reshape(nh, ndir)
+    gamma = _exact_value(gamma, nh*ndir).reshape(nh, ndir)
+    separ, gamma = _averages(separ, gamma, count, nmin)
+
+    if azimuths is None:
+        return(separ[:, 0], gamma[:, 0], count[:, 0])
+    return(separ, gamma, count)
+
+
+#------------------------------------------------------------------------------
+def compute_variogram_resampled(x, y, z, hmax, nh, nmin, nrep=200,
+                                method='bootstrap', block_size=None,
+                                percentiles=(2.5, 97.5), processes=None,
+                                seed=None, chunk_size=4096, azimuths=None,
+                                atol=22.5, bandwidth=None):
+    """
+    Compute the experiement semi-variogram with resampled percentile bands.
+
+    Arguments
+    ---------
+    x, y, z, hmax, nh, nmin, chunk_size, azimuths, atol, bandwidth :
+        same as compute_variogram.
+
+    nrep : int
+        number of bootstrap replicates. Ignored by the jackknife, which has
+        one replicate per resampling unit.
+
+    method : str
+        'bootstrap' (draw units with replacement) or 'jackknife' (leave one
+        unit out).
+
+    block_size : float, optional
+        width and height of square spatial blocks used as the resampling
+        units. If None, every point is its own unit.
+
+    percentiles : sequence of float
+        percentiles of the replicate gamma values returned as bands.
+
+    processes : int, optional
+        number of worker processes for the bootstrap. Defaults to
+        os.cpu_count(). With 1 the replicates are computed in the calling
+        process.
+
+    seed : int, optional
+        seed of the bootstrap draws.
+
+    Returns
+    -------
+    (separ, gamma, count, bands) : tuple
+        separ, gamma, count : same as compute_variogram.
+
+        bands : ndarray, shape=(len(percentiles), nh) or
+            (len(percentiles), nh, ndir)
+            percentiles of gamma over the replicates. A replicate whose bin
+            has fewer than nmin weighted pairs is left out of that bin's
+            percentiles, and a bin is nan only when it is nan in every
+            replicate.
+
+    Notes
+    -----
+    The pairs are found and binned once. A bootstrap replicate only changes
+    the weight of each unit (how often it was drawn), and a pair's weight
+    is w[i]*w[j], so every replicate is three weighted np.bincount calls
+    over the same pair list. The replicates are drawn in blocks of 64, each
+    from its own child of the seed, so the result does not depend on the
+    number of processes and memory holds 64 weight vectors per process.
+
+    The jackknife leaves one unit out per replicate. All of its replicates
+    come from one pass over the pairs: the sums without unit k are the
+    totals minus the sums of the pairs touching k. Memory grows with
+    nunit*nh*ndir, not nunit**2, and processes is not used.
+
+    The jackknife replicates are inflated about their mean by sqrt(m - 1),
+    for m units, before the percentiles are taken, so the bands reflect the
+    jackknife variance.
+    """
+    if method not in ('bootstrap', 'jackknife'):
+        raise ValueError("method must be 'bootstrap' or 'jackknife'")
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    z = np.asarray(z, dtype=float)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    ndir = 1 if azimuths is None else len(azimuths)
+
+    # Resampling unit of every point.
+    if block_size is None:
+        unit = np.arange(len(x))
+    else:
+        column = np.floor((x - x.min())/block_size).astype(np.int64)
+        row = np.floor((y - y.min())/block_size).astype(np.int64)
+        unit = np.unique(np.stack((column, row), 1), axis=0,
+                         return_inverse=True)[1].ravel()
+    nunit = unit.max() + 1 if len(unit) else 0
+
+    # Find and bin every pair once.
+    parts = []
+    for i, j, h, stop in _pair_chunks(x, y, hmax, chunk_size):
+        pair, h, g, bins = _pair_bins(x, y, z, i, j, h, hmax, nh, azimuths,
+                                      atol, bandwidth)
+        parts.append((unit[i[pair]], unit[j[pair]], h, g, bins))
+    pairs = tuple(np.concatenate([part[k] for part in parts])
+                  for k in range(5)) if parts else \
+        (np.empty(0, int), np.empty(0, int), np.empty(0), np.empty(0),
+         np.empty(0, int))
+    size = nh*ndir
+
+    totals = _weighted_sums(pairs, np.ones(nunit), size)
+    separ, gamma = _averages(*(sums.reshape(nh, ndir) for sums in totals),
+                             nmin)
+    count = np.rint(totals[2]).astype(int).reshape(nh, ndir)
+
+    if method == 'jackknife':
+        replicates = _jackknife_gamma(pairs, totals, nunit, size, nmin)
+    else:
+        # Every block of 64 replicates draws its weights from its own seed.
+        seeds = np.random.SeedSequence(seed).spawn(-(-nrep//64))
+        blocks = [(child, min(64, nrep - 64*k), nunit, size, nmin)
+                  for k, child in enumerate(seeds)]
+        if processes == 1:
+            _set_resample_pairs(pairs)
+            replicates = list(map(_replicate_gamma, blocks))
         else:
-            separ[k] = np.nan
-            gamma[k] = np.nan
+            with ProcessPoolExecutor(max_workers=processes,
+                                     initializer=_set_resample_pairs,
+                                     initargs=(pairs,)) as executor:
+                replicates = list(executor.map(_replicate_gamma, blocks))
+        replicates = np.concatenate(replicates + [np.empty((0, size))])
+
+    if method == 'jackknife' and len(replicates) > 1:
+        center = np.nanmean(replicates, axis=0)
+        replicates = center + np.sqrt(len(replicates) - 1)*(replicates - center)
+    bands = np.nanpercentile(replicates, percentiles, axis=0) \
+        if len(replicates) else np.full((len(percentiles), size), np.nan)
+    bands = np.asarray(bands).reshape(len(percentiles), nh, ndir)
+
+    if azimuths is None:
+        return(separ[:, 0], gamma[:, 0], count[:, 0], bands[:, :, 0])
+    return(separ, gamma, count, bands)
+
+
+#------------------------------------------------------------------------------
+_resample_pairs = None
+
+
+def _set_resample_pairs(pairs):
+    """
+    Store the binned pair list in a worker process.
+    """
+    global _resample_pairs
+    _resample_pairs = pairs
+
+
+#------------------------------------------------------------------------------
+def _weighted_sums(pairs, weights, size):
+    """
+    Sum the binned pairs with the pair weights w[i]*w[j].
+
+    Returns
+    -------
+    (separ, gamma, count) : tuple
+        weighted sums for each flat bin, shape=(nh*ndir,).
+    """
+    ui, uj, h, g, bins = pairs
+    w = weights[ui]*weights[uj]
+    separ = np.bincount(bins, weights=w*h, minlength=size)
+    gamma = np.bincount(bins, weights=w*g, minlength=size)
+    count = np.bincount(bins, weights=w, minlength=size)
+    return(separ, gamma, count)
+
+
+#------------------------------------------------------------------------------
+def _replicate_gamma(task):
+    """
+    Compute the semi-variogram of a block of bootstrap replicates in a worker
+    process. The block's weights are drawn here from its own seed.
+    """
+    seed, nrows, nunit, size, nmin = task
+    rng = np.random.default_rng(seed)
+    weights = rng.multinomial(nunit, np.full(nunit, 1/nunit),
+                              size=nrows).astype(float)
+    gamma = np.empty((nrows, size))
+    for r, w in enumerate(weights):
+        sums = _weighted_sums(_resample_pairs, w, size)
+        gamma[r] = _averages(sums[0], sums[1], sums[2], nmin)[1]
+    return(gamma)
+
+
+#------------------------------------------------------------------------------
+def _jackknife_gamma(pairs, totals, nunit, size, nmin):
+    """
+    Compute every leave-one-unit-out semi-variogram in one pass.
+
+    The sums without unit k are the totals minus the sums of the pairs that
+    touch unit k, so no replicate weight vector is ever built.
+
+    Returns
+    -------
+    gamma : ndarray, shape=(nunit, nh*ndir)
+        semi-variogram of every replicate.
+    """
+    ui, uj, h, g, bins = pairs
+    same = ui == uj
+    cells = nunit*size
+
+    def touching(values):
+        sums = np.bincount(ui*size + bins, weights=values, minlength=cells)
+        sums += np.bincount(uj*size + bins, weights=values, minlength=cells)
+        sums -= np.bincount(ui[same]*size + bins[same], weights=values[same],
+                            minlength=cells)
+        return(sums.reshape(nunit, size))
+
+    separ = totals[0] - touching(h)
+    gamma = totals[1] - touching(g)
+    count = totals[2] - touching(np.ones(len(bins)))
+    return(_averages(separ, gamma, count, nmin)[1])
+
+
+#------------------------------------------------------------------------------
+def _tiles(x, y, z, hmax, tile_size):
+    """
+    Split the points into square tiles with an hmax halo.
+
+    Yields
+    ------
+    (index, x, y, z, nowner) : tuple
+        index : global indices of the tile's points followed by its halo.
+        x, y, z : the coordinates and values of those points.
+        nowner : number of points that belong to the tile itself.
+
+    Tiles are yielded in ascending (column, row) order.
+    """
+    if len(x) == 0:
+        return
+    column = np.floor((x - x.min())/tile_size).astype(np.int64)
+    row = np.floor((y - y.min())/tile_size).astype(np.int64)
+    order = np.lexsort((row, column))
+    keys, starts = np.unique(np.stack((column[order], row[order]), 1),
+                             axis=0, return_index=True)
+    stops = np.append(starts[1:], len(order))
+    members = {(a, b): order[start:stop] for (a, b), start, stop
+               in zip(keys.tolist(), starts, stops)}
 
-        count[k] /= 2           # Eliminate the double counting.
+    reach = int(np.ceil(hmax/tile_size))
+    for a, b in keys.tolist():
+        owner = members[(a, b)]
+        neighbors = [members[(a + da, b + db)]
+                     for da in range(-reach, reach + 1)
+                     for db in range(-reach, reach + 1)
+                     if (da or db) and (a + da, b + db) in members]
+        halo = np.concatenate(neighbors) if neighbors else owner[:0]
 
+        # Only keep the halo points within hmax of the tile.
+        x0 = x.min() + a*tile_size
+        y0 = y.min() + b*tile_size
+        near = ((x[halo] >= x0 - hmax) & (x[halo] <= x0 + tile_size + hmax) &
+                (y[halo] >= y0 - hmax) & (y[halo] <= y0 + tile_size + hmax))
+        index = np.concatenate((owner, halo[near]))
+        yield (index, x[index], y[index], z[index], len(owner))
+
+
+#------------------------------------------------------------------------------
+def _tile_sums(task):
+    """
+    Compute the partial variogram sums of one tile in a worker process.
+    """
+    (index, x, y, z, nowner, hmax, nh, azimuths, atol, bandwidth,
+     chunk_size) = task
+    xy = np.stack((x, y), 1)
+    tree = spatial.cKDTree(xy)
+    ndir = 1 if azimuths is None else len(azimuths)
+
+    separ = {}
+    gamma = {}
+    count = np.zeros(shape=(nh, ndir), dtype=int)
+    for start in range(0, nowner, chunk_size):
+        stop = min(start + chunk_size, nowner)
+        i, j = _neighbor_pairs(tree, xy, start, stop, hmax)
+
+        # Count each pair in the tile of its lower global index.
+        keep = index[j] > index[i]
+        i = i[keep]
+        j = j[keep]
+        h = np.hypot(x[j]-x[i], y[j]-y[i])
+        sums = _bin_pairs(x, y, z, i, j, h, hmax, nh, azimuths, atol,
+                          bandwidth)
+        _add_exact(separ, sums[0])
+        _add_exact(gamma, sums[1])
+        count += sums[2]
+    return(separ, gamma, count)
+
+
+#------------------------------------------------------------------------------
+def _neighbor_pairs(tree, xy, start, stop, hmax):
+    """
+    Find every point within hmax of the points start:stop.
+
+    Returns
+    -------
+    (i, j) : tuple
+        index arrays of the pairs, i in start:stop and j any point in tree
+        (including i itself).
+    """
+    neighbors = tree.query_ball_point(xy[start:stop], hmax)
+    lengths = np.fromiter(map(len, neighbors), dtype=np.intp,
+                          count=stop-start)
+    j = np.fromiter(itertools.chain.from_iterable(neighbors),
+                    dtype=np.intp, count=lengths.sum())
+    i = np.repeat(np.arange(start, stop), lengths)
+    return(i, j)
+
+
+#------------------------------------------------------------------------------
+def _bin_pairs(x, y, z, i, j, h, hmax, nh, azimuths, atol, bandwidth):
+    """
+    Sum the separations, squared differences and counts of pairs per bin.
+
+    Arguments
+    ---------
+    x, y, z : ndarray, shape=(n,)
+        coordinates and observed values.
+
+    i, j : ndarray of int
+        indices of the pairs.
+
+    h : ndarray of float
+        separation distance of each pair.
+
+    hmax, nh, azimuths, atol, bandwidth :
+        same as compute_variogram.
+
+    Returns
+    -------
+    (separ, gamma, count) : tuple
+        separ, gamma : exact sums for each flat lag bin and direction (see
+            _exact_bincount).
+
+        count : ndarray of int, shape=(nh, ndir)
+            number of pairs in each bin.
+    """
+    ndir = 1 if azimuths is None else len(azimuths)
+    pair, h, g, bins = _pair_bins(x, y, z, i, j, h, hmax, nh, azimuths, atol,
+                                  bandwidth)
+    size = nh*ndir
+    separ = _exact_bincount(bins, h, size)
+    gamma = _exact_bincount(bins, g, size)
+    count = np.bincount(bins, minlength=size).reshape(nh, ndir)
     return(separ, gamma, count)
+
+
+#------------------------------------------------------------------------------
+def _exact_bincount(bins, values, size):
+    """
+    Sum finite values per bin without any rounding.
+
+    Every value is split into its binary exponent e and its 53-bit integer
+    mantissa, and the mantissa into a high and a low part. The parts are
+    small enough that np.bincount adds up to 2**26 of them exactly in
+    float64.
+
+    Returns
+    -------
+    sums : dict
+        maps e to (hi, lo), int64 arrays of shape (size,). The exact sum of
+        bin k is the sum over e of (hi[k]*2**27 + lo[k])*2**(e - 53).
+    """
+    sums = {}
+    if len(values) == 0:
+        return(sums)
+    mantissa, exponent = np.frexp(values)
+    mantissa = np.ldexp(mantissa, 53)
+    hi = np.floor(np.ldexp(mantissa, -27))
+    lo = mantissa - np.ldexp(hi, 27)
+    emin = int(exponent.min())
+    erange = int(exponent.max()) - emin + 1
+    key = bins.astype(np.int64)*erange + (exponent - emin)
+    for start in range(0, len(key), 2**26):
+        part = slice(start, start + 2**26)
+        for k, parts in enumerate((hi, lo)):
+            total = np.bincount(key[part], weights=parts[part],
+                                minlength=size*erange)
+            total = total.reshape(size, erange).astype(np.int64)
+            for e in np.flatnonzero(total.any(axis=0)):
+                entry = sums.setdefault(emin + int(e),
+                                        (np.zeros(size, dtype=np.int64),
+                                         np.zeros(size, dtype=np.int64)))
+                entry[k][:] += total[:, e]
+    return(sums)
+
+
+#------------------------------------------------------------------------------
+def _add_exact(total, sums):
+    """
+    Add the exact sums of _exact_bincount into total, in place.
+    """
+    for e, (hi, lo) in sums.items():
+        if e in total:
+            total[e][0][:] += hi
+            total[e][1][:] += lo
+        else:
+            total[e] = (hi.copy(), lo.copy())
+
+
+#------------------------------------------------------------------------------
+def _exact_value(sums, size):
+    """
+    Round the exact sums of _exact_bincount to float once.
+
+    Returns
+    -------
+    value : ndarray, shape=(size,)
+        the correctly rounded sum of each bin.
+    """
+    value = np.zeros(size)
+    if not sums:
+        return(value)
+    emin = min(sums)
+    for k in range(size):
+        total = sum(((int(hi[k]) << 27) + int(lo[k])) << (e - emin)
+                    for e, (hi, lo) in sums.items())
+        value[k] = float(total*Fraction(2)**(emin - 53))
+    return(value)
+
+
+#------------------------------------------------------------------------------
+def _pair_bins(x, y, z, i, j, h, hmax, nh, azimuths, atol, bandwidth):
+    """
+    Assign pairs to their lag bin and direction sectors.
+
+    Arguments
+    ---------
+    same as _bin_pairs.
+
+    Returns
+    -------
+    (pair, h, g, bins) : tuple
+        pair : index into i, j of each binned entry. A pair appears once
+            per sector it falls in and not at all beyond hmax.
+
+        h, g : separation and squared difference of each entry.
+
+        bins : flat bin index, lag*ndir + sector.
+    """
+    k = np.floor(h/hmax * nh).astype(int)
+    pair = np.flatnonzero(k < nh)
+    i, j, h, k = i[pair], j[pair], h[pair], k[pair]
+    g = (z[j] - z[i])**2
+
+    if azimuths is None:
+        ndir = 1
+        d = np.zeros(len(k), dtype=int)
+    else:
+        # Assign each pair to every sector it falls in.
+        ndir = len(azimuths)
+        azimuth = np.degrees(np.arctan2(x[j]-x[i], y[j]-y[i]))
+        offset = np.abs(azimuth[:, None] - np.asarray(azimuths)[None, :]) % 180
+        offset = np.minimum(offset, 180 - offset)
+        member = offset <= atol
+        if bandwidth is not None:
+            member &= h[:, None]*np.sin(np.radians(offset)) <= bandwidth
+        member[h == 0] = True
+        sector, d = np.nonzero(member)
+        pair, h, g, k = pair[sector], h[sector], g[sector], k[sector]
+
+    return(pair, h, g, k*ndir + d)
+
+
+#------------------------------------------------------------------------------
+def _averages(separ, gamma, count, nmin):
+    """
+    Turn the binned sums into average separations and semi-variogram values.
+
+    Bins with fewer than nmin pairs are set to nan.
+    """
+    valid = count >= nmin
+    with np.errstate(invalid='ignore', divide='ignore'):
+        separ = np.where(valid, separ/count, np.nan)
+        gamma = np.where(valid, 0.5*gamma/count, np.nan)
+    return(separ, gamma)
+
+
+#------------------------------------------------------------------------------
+def _pair_chunks(x, y, hmax, chunk_size):
+    """
+    Generate every unique pair of points closer than hmax.
+
+    Arguments
+    ---------
+    x : ndarray, shape=(n,)
+        x coordinates.
+
+    y : ndarray, shape=(n,)
+        y coordinates.
+
+    hmax : float
+        maximum separation distance.
+
+    chunk_size : int
+        number of points searched at a time.
+
+    Yields
+    ------
+    (i, j, h, stop) : tuple
+        i, j : ndarray of int
+            indices of the pairs, with i < j.
+
+        h : ndarray of float
+            separation distance of each pair.
+
+        stop : int
+            number of points searched so far.
+
+    Notes
+    -----
+    Only the pairs of one chunk of points are held in memory at a time, so
+    peak memory is set by chunk_size and the point density, not by n.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    xy = np.stack((x, y), 1)
+    tree = spatial.cKDTree(xy)
+
+    for start in range(0, len(x), chunk_size):
+        stop = min(start + chunk_size, len(x))
+        i, j = _neighbor_pairs(tree, xy, start, stop, hmax)
+
+        # Keep each pair once (this also drops the point itself).
+        keep = j > i
+        i = i[keep]
+        j = j[keep]
+        h = np.hypot(x[j]-x[i], y[j]-y[i])
+        yield i, j, h, stop
@@ -0,0 +1,211 @@
+"""Columnar container for the wells that make it through data_organization.
+
+A WellBatch is a NumPy structured array with one record per confirmed well
+and one named field per column. It replaces the nested [[row],[item],[data]]
+lists that used to be passed between data_organization,
+transmissivity_calculations, conductivity_calculations, calculated_data_to_csv
+and the plot_spacial_* functions, so every stage can read a column directly
+(batch['UTME']) instead of rebuilding it with a list comprehension.
+
+Functions
+---------
+empty_well_batch: Allocates a WellBatch with a given number of wells.
+
+as_well_batch: Returns its input if it is already a WellBatch, otherwise
+    converts a nested confirmed_wells list into a WellBatch.
+
+gather_well_batch: Builds a WellBatch from the candidate_wells, pump_log and
+    thickness_storativity_data lists and the row numbers matched by a join.
+
+well_interval: Returns the <name>_MIN, <name>, <name>_MAX fields of a
+    WellBatch as an Interval.
+
+storage_interval: Returns the storage coefficient fields of a WellBatch as
+    an Interval.
+
+Notes
+-----
+    The fields of a WellBatch and their units are:
+    UTME, UTMN = UTM coordinates (m)
+    AQUIFER = Aquifer code
+    SCREEN_LEN = Screen Length (ft)
+    RADIUS = Casing Radius (ft)
+    WELLID = Well ID
+    RATE_MIN, RATE, RATE_MAX = Pump Rate (ft^3/day)
+    DURATION = Duration of Test (days)
+    DOWN_MIN, DOWN, DOWN_MAX = Drawdown (ft)
+    B_MIN, B, B_MAX = Aquifer Thickness (ft)
+    S_MIN, S_MAX = Storage Coefficient (-)
+
+-------------------------------------------------------------------------------
+"""
+import numpy as np
+from interval import Interval
+
+WELL_BATCH_DTYPE = np.dtype([
+    ('UTME', np.float64),
+    ('UTMN', np.float64),
+    ('AQUIFER', 'U4'),
+    ('SCREEN_LEN', np.float64),
+    ('RADIUS', np.float64),
+    ('WELLID', np.int64),
+    ('RATE_MIN', np.float64),
+    ('RATE', np.float64),
+    ('RATE_MAX', np.float64),
+    ('DURATION', np.float64),
+    ('DOWN_MIN', np.float64),
+    ('DOWN', np.float64),
+    ('DOWN_MAX', np.float64),
+    ('B_MIN', np.float64),
+    ('B', np.float64),
+    ('B_MAX', np.float64),
+    ('S_MIN', np.float64),
+    ('S_MAX', np.float64)
+    ])
+
+#(field, list, position) of every field in a confirmed_wells triple
+CONFIRMED_WELLS_LAYOUT = (
+    ('UTME', 0, 0),
+    ('UTMN', 0, 1),
+    ('AQUIFER', 0, 2),
+    ('SCREEN_LEN', 0, 3),
+    ('RADIUS', 0, 4),
+    ('WELLID', 0, 5),
+    ('RATE_MIN', 1, 0),
+    ('RATE', 1, 1),
+    ('RATE_MAX', 1, 2),
+    ('DURATION', 1, 3),
+    ('DOWN_MIN', 1, 4),
+    ('DOWN', 1, 5),
+    ('DOWN_MAX', 1, 6),
+    ('B_MIN', 2, 0),
+    ('B', 2, 1),
+    ('B_MAX', 2, 2),
+    ('S_MIN', 2, 3),
+    ('S_MAX', 2, 4)
+    )
+
+def empty_well_batch(n):
+    """Allocates a zero filled WellBatch.
+
+    Parameters
+    ----------
+    n: int
+        Number of wells in the batch.
+
+    Returns
+    -------
+    batch: ndarray[WELL_BATCH_DTYPE]
+        A WellBatch with n records.
+    """
+    return np.zeros(n, dtype=WELL_BATCH_DTYPE)
+
+def as_well_batch(confirmed_wells):
+    """Converts confirmed_wells into a WellBatch.
+
+    Parameters
+    ----------
+    confirmed_wells: WellBatch or list[list1, list2, list3]
+        Either a WellBatch, which is returned unchanged, or the nested list
+        built by data_organization.
+
+        list1 = list[UTME (int), UTMN (int), AQUIFER (str), Screen Length (float),
+                     Casing Radius (ft), Well ID (int)]
+
+        list 2 = list[Pump Rate min/raw/max (float), Duration (float),
+                      Drawdown min/raw/max (float), Well ID (int)]
+
+        list 3 = list[aquifer thickness min/raw/max (float),
+                      miniumum storage coefficent (float), maximum storage
+                      coefficent (float), and Well ID (int)]
+
+    Returns
+    -------
+    batch: ndarray[WELL_BATCH_DTYPE]
+        One record for every entry in confirmed_wells.
+    """
+    if isinstance(confirmed_wells, np.ndarray) and \
+       confirmed_wells.dtype == WELL_BATCH_DTYPE:
+        return confirmed_wells
+    batch = empty_well_batch(len(confirmed_wells))
+    for field, part, position in CONFIRMED_WELLS_LAYOUT:
+        batch[field] = [i[part][position] for i in confirmed_wells]
+    return batch
+
+def gather_well_batch(candidate_wells, pump_log_results,
+                      thickness_storativity_data, candidate_rows, pump_rows,
+                      thickness_rows):
+    """Builds a WellBatch from the rows selected by a join.
+
+    Parameters
+    ----------
+    candidate_wells, pump_log_results, thickness_storativity_data: list
+        The three lists joined by data_organization.
+
+    candidate_rows, pump_rows, thickness_rows: list[int]
+        Row numbers into each of the three lists. Record i of the WellBatch
+        combines candidate_wells[candidate_rows[i]],
+        pump_log_results[pump_rows[i]] and
+        thickness_storativity_data[thickness_rows[i]].
+
+    Returns
+    -------
+    batch: ndarray[WELL_BATCH_DTYPE]
+        One record for every joined row.
+
+    Notes
+    -----
+    Each column of the three lists is converted to an array once and then
+    indexed with the row numbers, so the cost is linear in the size of the
+    inputs and the output.
+    """
+    sources = (candidate_wells, pump_log_results, thickness_storativity_data)
+    rows = (np.asarray(candidate_rows, dtype=np.intp),
+            np.asarray(pump_rows, dtype=np.intp),
+            np.asarray(thickness_rows, dtype=np.intp))
+    batch = empty_well_batch(len(rows[0]))
+    if len(batch) == 0:
+        return batch
+    for field, part, position in CONFIRMED_WELLS_LAYOUT:
+        column = np.array([i[position] for i in sources[part]],
+                          dtype=WELL_BATCH_DTYPE[field])
+        batch[field] = column[rows[part]]
+    return batch
+
+def well_interval(batch, name):
+    """Returns three fields of a WellBatch as an Interval.
+
+    Parameters
+    ----------
+    batch: WellBatch
+        The wells.
+
+    name: str
+        'RATE', 'DOWN' or 'B'.
+
+    Returns
+    -------
+    interval: Interval
+        [batch[name + '_MIN'], batch[name], batch[name + '_MAX']].
+    """
+    return Interval(batch[name + '_MIN'], batch[name], batch[name + '_MAX'])
+
+def storage_interval(batch):
+    """Returns the storage coefficient of a WellBatch as an Interval.
+
+    Parameters
+    ----------
+    batch: WellBatch
+        The wells.
+
+    Returns
+    -------
+    interval: Interval
+        [S_MIN, sqrt(S_MIN*S_MAX), S_MAX]. A WellBatch has no nominal
+        storage coefficient, so the geometric mean of the bounds is used,
+        the center of the range on the log scale that storativity is
+        reported on. The original calculation used S_MAX, which put the
+        nominal T at the low end of its interval.
+    """
+    return Interval(batch['S_MIN'], np.sqrt(batch['S_MIN']*batch['S_MAX']),
+                    batch['S_MAX'])